@@ -1,7 +1,11 @@
 from domain.entities.creature import Creature
 from domain.entities.enemy import Enemy
 from domain.entities.spell import Spell
+from domain.entities.dice import Dice
 from domain.entities.grimoire import Grimoire
+from domain.entities.creature_pool import CreaturePool, CreatureHandle
+from domain.entities.effects import CompositeEffect, register_effect
 from domain.enums.spell_type import SpellType
 
-__all__ = ["Creature", "Enemy", "Spell", "Grimoire", "SpellType"]
\ No newline at end of file
+__all__ = ["Creature", "Enemy", "Spell", "Dice", "Grimoire", "CreaturePool", "CreatureHandle",
+           "CompositeEffect", "register_effect", "SpellType"]
\ No newline at end of file
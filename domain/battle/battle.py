@@ -1,45 +1,175 @@
-import time
+import copy
+import random
+import secrets
+import uuid
 from typing import Any
 
+from loguru import logger
+
 from domain.entities.character import Character
+from domain.entities.dice import Dice
 from domain.entities.enemy import Enemy
 from domain.entities.grimoire import Grimoire
 from domain.enums.spell_type import SpellType
+from domain.battle.policies import ActionPolicy, HumanPolicy, FirstDamageSpellPolicy
+from domain.battle.presenters import ConsolePresenter, SilentPresenter
+from domain.battle import rules
+from domain.battle.results import TurnResult, BattleResult
+from domain.battle.snapshot import copy_rng, restore_battle, rolls_dice, snapshot_battle
+from domain.battle.speculation import EnemyActionSpeculator
+from domain.battle.status_effects import StatusEffects, StatusKind
+from domain.battle.targeting import TargetSide, target_side
 from config.settings import settings
-from loguru import logger
-from utils.input_utils import input_with_log
 from utils.ascii_art import BattleVisuals
-from services.dm_service import DungeonMasterService
+from services.dm_cache import CachedDungeonMasterService
+from services.dm_service import DungeonMasterService, InvalidEnemyTurn
 from services.dm_events import apply_event
+from services.local_narrator import LocalNarrator, NarrationRacer
+
+
+# Совмещённый ход врага ушёл в DM, но ответа нет (таймаут, сеть): реакцию на этот ход
+# у DM повторно не спрашиваем — он только что не ответил
+_NO_DM_ANSWER: dict = {}
 
 
 class Battle:
-    def __init__(self, player: Character, enemy: Enemy, grimoire: Grimoire, dm: DungeonMasterService | None = None):
+    def __init__(
+            self,
+            player: Character,
+            enemy: Enemy,
+            grimoire: Grimoire,
+            dm: DungeonMasterService | None = None,
+            player_policy: ActionPolicy | None = None,
+            enemy_policy: ActionPolicy | None = None,
+            presenter: Any = None,
+            max_rounds: int | None = None,
+            speculate_enemy: bool = False,
+            coalesce_dm_turn: bool = False,
+            stream_narration: bool = False,
+            battle_id: str | None = None,
+            narration_deadline_s: float | None = None,
+            basic_attack: int | str | Dice = 10,
+            seed: int | None = None,
+            journal=None,
+    ):
+        """
+        :param player_policy: Кто выбирает действия игрока (по умолчанию — человек в консоли)
+        :param enemy_policy: Fallback-логика врага, когда DM отключен или ошибся
+        :param presenter: Вывод боя (ConsolePresenter с паузами или SilentPresenter для headless)
+        :param max_rounds: Лимит раундов; по достижении бой заканчивается ничьей
+        :param speculate_enemy: Пока DM описывает ход игрока, параллельно спрашивать его о ходе врага
+        :param coalesce_dm_turn: Ход врага одним запросом к DM (действие + нарратив + событие)
+        :param stream_narration: Печатать нарратив DM по мере генерации, а не после полного ответа
+        :param battle_id: Ключ боя для памяти DM (по умолчанию — случайный)
+        :param narration_deadline_s: Сколько ждать реакцию DM; не успел, ошибся или отключен —
+            ход описывает локальный генератор (None — ждать сколько угодно, без локального текста)
+        :param basic_attack: Урон базовой атаки: число или выражение бросков ("1d8+2")
+        :param seed: Зерно генератора бросков боя (None — случайное); сохраняется в self.seed,
+            с тем же зерном и теми же ходами бой повторяется бросок в бросок
+        :param journal: Куда писать журнал боя (domain/battle/journal.py: BattleJournal) или None
+        """
         self.player = player
         self.enemy = enemy
         self.grimoire = grimoire
         self.round_number = 0
-        self.basic_attack_damage = 10
+        # Для бросков basic_attack_damage — среднее: его видят подсказки, предсказания и DM
+        self.basic_attack_dice = None if isinstance(basic_attack, int) else Dice.parse(basic_attack)
+        self.basic_attack_damage = (
+            basic_attack if self.basic_attack_dice is None else round(self.basic_attack_dice.clamped_mean)
+        )
+        self.seed = seed if seed is not None else secrets.randbits(63)
+        self.rng = random.Random(self.seed)
+        self.journal = journal
         self.dm = dm  # ← Новое: DM сервис (может быть None)
+        self.player_policy = player_policy or HumanPolicy()
+        self.enemy_policy = enemy_policy or FirstDamageSpellPolicy()
+        self.presenter = presenter or ConsolePresenter()
+        self.max_rounds = max_rounds
+        self.turns: list[TurnResult] = []
+        self.coalesce_dm_turn = coalesce_dm_turn
+        self.stream_narration = stream_narration
+        self.battle_id = battle_id or uuid.uuid4().hex
+        # Длительные эффекты (яд, регенерация, щиты, оглушение) тикают на границе раунда
+        self.statuses = StatusEffects()
+        self.statuses.attach(player)
+        self.statuses.attach(enemy)
+        self.local_narrator = LocalNarrator() if narration_deadline_s is not None else None
+        self.narration_racer = None
+        if dm is not None and narration_deadline_s is not None:
+            self.narration_racer = NarrationRacer(dm, deadline_s=narration_deadline_s)
+        self.speculator = None
+        if dm is not None and speculate_enemy:
+            # Спекулятивные запросы идут без battle_id: память DM не должна видеть
+            # ответ, который не пригодится (и к моменту запроса она ещё без реакции на ход игрока)
+            request = dm.play_enemy_turn if coalesce_dm_turn else dm.choose_enemy_action
+            self.speculator = EnemyActionSpeculator(request)
+
+    def snapshot(self, include_rng: bool | None = None) -> bytes:
+        """Бинарный снимок состояния (domain/battle/snapshot.py); include_rng=None — если бой бросает кости"""
+        return snapshot_battle(self, include_rng)
+
+    def restore(self, data: bytes) -> None:
+        """Вернуть бой к снимку: дальше он идёт так же, как шёл бы от момента снимка"""
+        restore_battle(self, data)
+
+    def fork(
+            self,
+            player_policy: ActionPolicy | None = None,
+            enemy_policy: ActionPolicy | None = None,
+            seed: int | None = None,
+    ) -> 'Battle':
+        """
+        Ветка боя в памяти — для поиска, «что если» и анализа: копируются только существа,
+        их эффекты и история ходов, гримуар делится копией при записи (Grimoire.fork).
+        Ветка идёт без DM, журнала, вывода и спекуляций; стратегии по умолчанию общие с боем.
+
+        :param player_policy: Стратегия игрока в ветке (HumanPolicy в ветке спросила бы консоль)
+        :param enemy_policy: Стратегия врага в ветке
+        :param seed: Своё зерно бросков ветки; None — ветка продолжает генератор боя с текущего места
+        """
+        branch = copy.copy(self)
+        branch.player, branch.enemy = copy.copy(self.player), copy.copy(self.enemy)
+        branch.grimoire = self.grimoire.fork()
+        if getattr(self.enemy, "grimoire", None) is self.grimoire:
+            branch.enemy.grimoire = branch.grimoire
+        branch.statuses = self.statuses.fork([(self.player, branch.player), (self.enemy, branch.enemy)])
+        branch.turns = self.turns.copy()
+        if seed is not None:
+            branch.seed, branch.rng = seed, random.Random(seed)
+        elif rolls_dice(self):
+            branch.rng = copy_rng(self.rng)
+        # без костей генератор не тратится — ветка может делить его с боем
+        branch.player_policy = player_policy or self.player_policy
+        branch.enemy_policy = enemy_policy or self.enemy_policy
+        branch.presenter = SilentPresenter()
+        branch.dm = branch.journal = branch.speculator = branch.narration_racer = branch.local_narrator = None
+        return branch
 
     def _available_spells(self, caster):
         """возвращает список заклинаний, которые кастер может применить (по мане)"""
-        return [s for s in self.grimoire.spell_list if s.mana_cost <= caster.current_mana]
+        return self.grimoire.affordable_spells(caster.current_mana)
 
     def _can_cast(self, caster) -> bool:
         """проверяет, может ли кастер применить хотя бы одно заклинание"""
-        return any(s.mana_cost <= caster.current_mana for s in self.grimoire.spell_list)
+        return self.grimoire.can_cast(caster.current_mana)
 
     def _cast_spell_for(self, caster, spell_name: str, caster_is_player: bool):
         """применяет заклинание от имени кастера к выбранной цели"""
         target = self._get_target(spell_name, caster_is_player=caster_is_player)
-        self.grimoire.cast_spell(spell_name, caster, target)
+        spell = self.grimoire.get_spell_by_name(spell_name)
+        power = rules.cast_spell(spell, caster, target, self.rng)
+        logger.info(
+            f'{caster.name}: каст спелла {spell.name} ✨ (сила {power}) → {target.name}, '
+            f'hp: {target.current_hp}, мана: {target.current_mana}; маны у кастера: {caster.current_mana}'
+        )
 
     def _basic_attack(self, attacker, defender):
         """выполняет базовую атаку атакующего по защищающемуся"""
-        logger.info(BattleVisuals.attack_animation(attacker.name, defender.name, self.basic_attack_damage))
-        time.sleep(0.5)
-        defender.take_damage(self.basic_attack_damage)
+        damage = rules.roll_basic_attack(self.basic_attack_dice, self.basic_attack_damage, self.rng)
+        if self.presenter.enabled:
+            self.presenter.show(BattleVisuals.attack_animation(attacker.name, defender.name, damage), 0.5)
+        dealt = rules.hit(defender, damage)
+        logger.info(f'{defender.name} получил урон {dealt}, осталось hp: {defender.current_hp}')
 
     def _get_battle_state(self, last_action: dict) -> dict:
         """
@@ -53,82 +183,200 @@ class Battle:
         """
         return {
             "round": self.round_number,
-            "player": {
-                "name": self.player.name,
-                "current_hp": self.player.current_hp,
-                "max_hp": self.player.max_hp,
-                "current_mana": self.player.current_mana,
-                "max_mana": self.player.max_mana,
-            },
-            "enemy": {
-                "name": self.enemy.name,
-                "current_hp": self.enemy.current_hp,
-                "max_hp": self.enemy.max_hp,
-                "current_mana": self.enemy.current_mana,
-                "max_mana": self.enemy.max_mana,
-            },
+            "player": self._side_state(self.player),
+            "enemy": self._side_state(self.enemy),
             "last_action": last_action,
         }
 
-    def run(self):
-        while settings.MIN_HP < self.player.current_hp and settings.MIN_HP < self.enemy.current_hp:
-            self.round_number += 1
+    def _side_state(self, creature) -> dict:
+        side = {
+            "name": creature.name,
+            "current_hp": creature.current_hp,
+            "max_hp": creature.max_hp,
+            "current_mana": creature.current_mana,
+            "max_mana": creature.max_mana,
+        }
+        # ключ только при активных эффектах — иначе состояние (и промпт, и ключи кэша) как раньше
+        statuses = self.statuses.describe(creature)
+        if statuses:
+            side["statuses"] = statuses
+        return side
+
+    def _dm_available(self) -> bool:
+        """DM подключен и его провайдер не помечен нездоровым (circuit breaker)"""
+        return self.dm is not None and self.dm.is_available()
+
+    def _cached_dm_response(self, kind: str, battle_state: dict, actor: str = "enemy",
+                            allowed_actions: dict | None = None) -> dict | None:
+        """Ответ из кэша DM без запроса к нему — пока сам DM недоступен"""
+        if not isinstance(self.dm, CachedDungeonMasterService):
+            return None
+        return self.dm.cached(kind, battle_state, actor, allowed_actions, battle_id=self.battle_id)
+
+    def _local_narration(self, turn: TurnResult) -> str:
+        """Описание хода локальным генератором (микросекунды, без сети)"""
+        spell_name = turn.action.get("spell_name")
+        spell = self.grimoire.get_spell_by_name(spell_name) if spell_name else None
+        power = spell.power if spell is not None else self.basic_attack_damage
+        return self.local_narrator.narrate(
+            self._get_battle_state(turn.action), turn.actor, spell.spell_type if spell else None, power
+        )
+
+    def _dm_react(self, turn: TurnResult, last_action: dict, ask_dm: bool = True) -> None:
+        """
+        Реакция DM на ход: нарратив + бонусное событие (если DM подключен и доступен).
+        ask_dm=False — к DM не обращаться: ответ из кэша DM или локальный текст (если он включён).
+        """
+        if not ask_dm or not self._dm_available():
+            dm_resp = self._cached_dm_response("react", self._get_battle_state(last_action), turn.actor)
+            if dm_resp is None and self.local_narrator is not None:
+                dm_resp = {"narration": self._local_narration(turn)}
+            self._apply_dm_response(turn, dm_resp)
+            return
 
-            logger.info(BattleVisuals.round_header(self.round_number))
-            time.sleep(1)
+        battle_state = self._get_battle_state(last_action)
+        streaming = self.stream_narration and self.presenter.enabled
+
+        if self.narration_racer is not None:
+            # Реакция DM наперегонки с дедлайном: не успел — сразу локальный текст
+            local = lambda: self._local_narration(turn)
+            if streaming:
+                self.presenter.stream("💬 ")
+                dm_resp, _ = self.narration_racer.react_stream(
+                    battle_state, turn.actor, self.presenter.stream, local, battle_id=self.battle_id
+                )
+                self.presenter.stream("\n")
+                self._apply_dm_response(turn, dm_resp, narration_shown=True)
+            else:
+                dm_resp, _ = self.narration_racer.react(battle_state, turn.actor, local, battle_id=self.battle_id)
+                self._apply_dm_response(turn, dm_resp)
+            return
 
-            # PLAYER TURN
-            last_action = self._player_turn()
+        if streaming:
+            # Нарратив печатается по токенам, пока ответ ещё генерируется
+            self.presenter.stream("💬 ")
+            dm_resp = self.dm.react_to_action_stream(
+                battle_state, turn.actor, on_narration=self.presenter.stream, battle_id=self.battle_id
+            )
+            self.presenter.stream("\n")
+            self._apply_dm_response(turn, dm_resp, narration_shown=True)
+            return
 
-            # ✨ DM REACT на ход игрока
-            if self.dm is not None:
-                battle_state = self._get_battle_state(last_action)
-                dm_resp = self.dm.react_to_action(battle_state, actor="player")
+        dm_resp = self.dm.react_to_action(battle_state, actor=turn.actor, battle_id=self.battle_id)
+        self._apply_dm_response(turn, dm_resp)
 
-                if dm_resp:
-                    if dm_resp.get("narration"):
-                        logger.info(f"💬 {dm_resp['narration']}")
-                        time.sleep(1)
+    def _apply_dm_response(self, turn: TurnResult, dm_resp: dict | None, narration_shown: bool = False) -> None:
+        """Показывает нарратив DM и применяет его бонусное событие"""
+        if not dm_resp:
+            return
 
-                    if dm_resp.get("event"):
-                        apply_event(dm_resp["event"], self.player, self.enemy)
-                        time.sleep(0.5)
+        if dm_resp.get("narration"):
+            turn.narration = dm_resp["narration"]
+            if narration_shown:
+                self.presenter.pause(1)
+            else:
+                self.presenter.show(f"💬 {dm_resp['narration']}", 1)
+
+        if dm_resp.get("event"):
+            turn.event = dm_resp["event"]
+            apply_event(dm_resp["event"], self.player, self.enemy)
+            if self.journal is not None:
+                self.journal.event(self, turn.actor, dm_resp["event"])
+            self.presenter.pause(0.5)
+
+    def _show_status(self, final_pause: float) -> None:
+        if not self.presenter.enabled:
+            return
+        self.presenter.show(BattleVisuals.creature_status_box(self.player), 0.5)
+        self.presenter.show(BattleVisuals.creature_status_box(self.enemy), final_pause)
 
-            logger.info(BattleVisuals.creature_status_box(self.player))
-            time.sleep(0.5)
-            logger.info(BattleVisuals.creature_status_box(self.enemy))
-            time.sleep(1)
+    def _someone_down(self) -> bool:
+        return self.player.current_hp <= settings.MIN_HP or self.enemy.current_hp <= settings.MIN_HP
 
-            time.sleep(2)
+    def _is_over(self) -> bool:
+        if self._someone_down():
+            return True
+        return self.max_rounds is not None and self.round_number >= self.max_rounds
+
+    def _advance_statuses(self) -> None:
+        """Граница раунда: тики и истечения длительных эффектов"""
+        for effect, amount in self.statuses.advance(self.round_number):
+            if self.presenter.enabled:
+                icon = "☠️" if effect.kind == StatusKind.DOT else "💚"
+                self.presenter.show(f"{icon} {effect.target.name}: {effect.kind.value} {amount}", 0.5)
+
+    def run(self) -> BattleResult:
+        try:
+            return self._run_rounds()
+        finally:
+            if self.journal is not None:
+                self.journal.flush()  # оборванный бой тоже остаётся в журнале
+            if self.speculator is not None:
+                self.speculator.close()
+            if self.narration_racer is not None:
+                self.narration_racer.close()
+            if self.dm is not None:
+                self.dm.end_battle(self.battle_id)
 
-            if self.enemy.current_hp <= settings.MIN_HP:
-                break
+    def _run_rounds(self) -> BattleResult:
+        if self.journal is not None:
+            self.journal.begin(self)
 
-            # ENEMY TURN
-            self._enemy_turn()
+        while not self._is_over():
+            self.round_number += 1
 
-            # ✨ DM REACT на ход врага
-            if self.dm is not None:
-                battle_state = self._get_battle_state({})
-                dm_resp = self.dm.react_to_action(battle_state, actor="enemy")
+            if self.presenter.enabled:
+                self.presenter.show(BattleVisuals.round_header(self.round_number), 1)
 
-                if dm_resp:
-                    if dm_resp.get("narration"):
-                        logger.info(f"💬 {dm_resp['narration']}")
-                        time.sleep(1)
+            self._advance_statuses()
+            if self.journal is not None:
+                self.journal.round(self)
+            if self._someone_down():
+                break
 
-                    if dm_resp.get("event"):
-                        apply_event(dm_resp["event"], self.player, self.enemy)
-                        time.sleep(0.5)
+            # PLAYER TURN
+            last_action = self._player_turn()
+            player_turn = TurnResult(self.round_number, "player", last_action)
+            self.turns.append(player_turn)
+            if self.journal is not None:
+                self.journal.action(self, "player", last_action)
 
-            logger.info(BattleVisuals.creature_status_box(self.player))
-            time.sleep(0.5)
-            logger.info(BattleVisuals.creature_status_box(self.enemy))
-            time.sleep(3)
+            # ✨ DM REACT на ход игрока (пропуск хода оглушённым не комментирует)
+            if last_action["type"] != "stunned":
+                if self.speculator is not None and self.enemy.current_hp > settings.MIN_HP and self._dm_available():
+                    self._speculate_enemy_action()
+                self._dm_react(player_turn, last_action)
 
-            time.sleep(2)
+            self._show_status(1)
+            self.presenter.pause(2)
+
+            if self.enemy.current_hp <= settings.MIN_HP:
+                break
+
+            # ENEMY TURN
+            enemy_action, reaction = self._enemy_turn()
+            enemy_turn = TurnResult(self.round_number, "enemy", enemy_action)
+            self.turns.append(enemy_turn)
+            if self.journal is not None:
+                self.journal.action(self, "enemy", enemy_action)
+
+            if reaction is _NO_DM_ANSWER:
+                self._dm_react(enemy_turn, enemy_action, ask_dm=False)
+            elif reaction is not None:
+                # Совмещённый ход: нарратив уже показан вместе с действием, осталось событие
+                enemy_turn.narration = reaction["narration"]
+                self._apply_dm_response(enemy_turn, {"event": reaction.get("event")})
+            elif enemy_action["type"] != "stunned":
+                # ✨ DM REACT на ход врага: в состоянии его действие — для промпта и памяти DM
+                self._dm_react(enemy_turn, enemy_action)
+
+            self._show_status(3)
+            self.presenter.pause(2)
 
         self._show_result()
+        if self.journal is not None:
+            self.journal.end(self, self._winner())
+        return BattleResult(self._winner(), self.round_number, self.turns)
 
     def _get_target(self, spell_name: str, caster_is_player: bool):
         """Определить цель спелла"""
@@ -137,10 +385,8 @@ class Battle:
         if spell is None:
             raise ValueError(f"Спелл {spell_name} отсутствует в гримуаре!")
 
-        if spell.spell_type == SpellType.HEAL:  # Healing
-            return self.player if caster_is_player else self.enemy
-        else:
-            return self.enemy if caster_is_player else self.player
+        caster, opponent = (self.player, self.enemy) if caster_is_player else (self.enemy, self.player)
+        return caster if target_side(spell.spell_type) == TargetSide.ALLY else opponent
 
     def _player_turn(self) -> dict:
         """
@@ -148,60 +394,40 @@ class Battle:
 
         Returns:
             dict с информацией о действии {"type": "...", "spell_name": "..."} для DM
+            ({"type": "stunned"} — ход пропущен из-за оглушения)
         """
-        logger.info(f"🧙 Ход {self.player.name}:\n")
-        time.sleep(1)
-
-        while True:
-            available = self._available_spells(self.player)
-            # input_with_log - кастомный input()
-            action_choice = input_with_log(
-                f"\n{self.player.name}, выбери действие:\n"
-                f"  1. Базовая атака ({self.basic_attack_damage} урона)\n"
-                f"  2. Заклинание\n"
-                f"Ввод: "
-            ).strip()
-            time.sleep(0.5)
-
-            if action_choice == '1':
-                self._basic_attack(self.player, self.enemy)
-                return {"type": "basic_attack"}
-
-            if action_choice != '2':
-                logger.info("❌ Неверный выбор!")
-                time.sleep(0.5)
-                continue
-
-            if not available:
-                logger.info(f"⚠️  {self.player.name} не может кастовать (нет маны)!\n")
-                time.sleep(0.5)
-                continue
-
-            for i, spell in enumerate(available, 1):
-                logger.info(f"  {i}. {spell.name} (мана: {spell.mana_cost}, сила: {spell.power})")
-                time.sleep(0.5)
-
-            while True:
-                # кастомный input()
-                choice = input_with_log(f"\n{self.player.name}, выбери спелл (номер): ").strip()
-
-                try:
-                    idx = int(choice) - 1
-                    spell_name = available[idx].name
-
-                    # Кастуй спелл
-                    self._cast_spell_for(self.player, spell_name, caster_is_player=True)
-                    return {"type": "cast_spell", "spell_name": spell_name}
-                except (ValueError, IndexError):
-                    logger.info("❌ Неверный выбор!")
-                    time.sleep(1)
+        self.presenter.show(f"🧙 Ход {self.player.name}:\n", 1)
+
+        if self.statuses.consume_stun(self.player):
+            self.presenter.show(f"💫 {self.player.name} оглушён и пропускает ход", 1)
+            return {"type": "stunned"}
+
+        available = self._available_spells(self.player)
+        action = self.player_policy.choose_action(self, self.player, available)
+
+        if action.get("type") == "basic_attack":
+            self._basic_attack(self.player, self.enemy)
+            return {"type": "basic_attack"}
+
+        spell_name = action.get("spell_name")
+        if action.get("type") != "cast_spell" or spell_name not in [s.name for s in available]:
+            raise ValueError(f"Недопустимое действие игрока: {action}")
+
+        # Кастуй спелл
+        self._cast_spell_for(self.player, spell_name, caster_is_player=True)
+        return {"type": "cast_spell", "spell_name": spell_name}
+
+    def _speculate_enemy_action(self) -> None:
+        """
+        Ход игрока сделан: пока DM описывает его, в фоне уже выбирается ход врага.
+        Событие реакции ещё может сдвинуть HP/ману — ключ совпадения грубый (см. speculation.py)
+        """
+        allowed_actions = self._get_allowed_actions_for_enemy(self._get_enemy_available_spells())
+        self.speculator.start([(self._get_battle_state({}), allowed_actions)])
 
     def _get_enemy_available_spells(self) -> list:
         """Возвращает список доступных для врага damage-спеллов"""
-        return [
-            s for s in self.grimoire.spell_list
-            if s.spell_type == SpellType.DAMAGE and s.mana_cost <= self.enemy.current_mana
-        ]
+        return self.grimoire.affordable_spells(self.enemy.current_mana, SpellType.DAMAGE)
 
     def _get_allowed_actions_for_enemy(self, damage_spells: list) -> dict:
         """Формирует структуру доступных действий для DM"""
@@ -215,7 +441,21 @@ class Battle:
             }
         return allowed_actions
 
-    def _try_dm_enemy_action(self, damage_spells: list) -> bool:
+    def _request_enemy_decision(self, request, battle_state: dict, allowed_actions: dict,
+                                remember: bool = False) -> dict | None:
+        """
+        Берёт заранее посчитанный ответ DM, если он есть, иначе спрашивает сейчас.
+        remember: записать спекулятивный ответ в память боя (он шёл без battle_id)
+        """
+        speculative = self.speculator.take(battle_state, allowed_actions) if self.speculator else None
+        if speculative is not None:
+            dm_resp = speculative.result()
+            if remember:
+                self.dm.remember(self.battle_id, battle_state, "enemy", dm_resp)
+            return dm_resp
+        return request(battle_state, allowed_actions, battle_id=self.battle_id)
+
+    def _try_dm_enemy_action(self, damage_spells: list) -> tuple[dict, dict | None] | None:
         """
         Пытается получить действие врага от DM.
 
@@ -223,67 +463,127 @@ class Battle:
             damage_spells: Список доступных damage-спеллов
 
         Returns:
-            True если действие было выполнено, False если нужен fallback
+            (выполненное действие, реакция DM из совмещённого ответа или None),
+            (None, _NO_DM_ANSWER) — на совмещённый ход DM не ответил, нужен fallback без DM,
+            или None если нужен fallback
         """
         if self.dm is None:
-            return False
+            return None
 
         allowed_actions = self._get_allowed_actions_for_enemy(damage_spells)
         battle_state = self._get_battle_state({})
-        dm_resp = self.dm.choose_enemy_action(battle_state, allowed_actions)
 
+        if not self._dm_available():
+            # breaker разомкнут: только то, что DM уже отвечал в похожей позиции
+            kind = "turn" if self.coalesce_dm_turn else "choose"
+            dm_resp = self._cached_dm_response(kind, battle_state, allowed_actions=allowed_actions)
+            action = self._execute_dm_enemy_action(dm_resp, damage_spells)
+            if action is None:
+                return None
+            return action, dm_resp if self.coalesce_dm_turn else None
+
+        if self.coalesce_dm_turn:
+            try:
+                dm_resp = self._request_enemy_decision(
+                    self.dm.play_enemy_turn, battle_state, allowed_actions, remember=True
+                )
+            except InvalidEnemyTurn:
+                # Ответ пришёл, но не прошёл валидацию — обычный ход в два запроса
+                dm_resp = self.dm.choose_enemy_action(battle_state, allowed_actions, battle_id=self.battle_id)
+            else:
+                if dm_resp is None:
+                    # Ответа нет вовсе: ещё два запроса к тому же DM только удлинят ход
+                    return None, _NO_DM_ANSWER
+                action = self._execute_dm_enemy_action(dm_resp, damage_spells)
+                return (action, dm_resp) if action is not None else None
+        else:
+            dm_resp = self._request_enemy_decision(self.dm.choose_enemy_action, battle_state, allowed_actions)
+
+        action = self._execute_dm_enemy_action(dm_resp, damage_spells)
+        return (action, None) if action is not None else None
+
+    def _execute_dm_enemy_action(self, dm_resp: dict | None, damage_spells: list) -> dict | None:
+        """Выполняет действие, выбранное DM; None — если оно недопустимо"""
         if not dm_resp or not dm_resp.get("action"):
-            return False
+            return None
 
         action = dm_resp["action"]
         narration = dm_resp.get("narration", "")
 
         # Выполняем выбранное действие
         if action.get("type") == "basic_attack":
-            logger.info(f"💬 {narration}")
-            time.sleep(0.5)
+            self.presenter.show(f"💬 {narration}", 0.5)
             self._basic_attack(self.enemy, self.player)
-            return True
+            return {"type": "basic_attack"}
 
         elif action.get("type") == "cast_spell":
             spell_name = action.get("spell_name")
             # Валидируем что спелл доступен
             if spell_name in [s.name for s in damage_spells]:
-                logger.info(f"💬 {narration}")
-                time.sleep(0.5)
-                logger.info(f"🤖 {self.enemy.name} кастует {spell_name}!\n")
-                time.sleep(1)
+                self.presenter.show(f"💬 {narration}", 0.5)
+                self.presenter.show(f"🤖 {self.enemy.name} кастует {spell_name}!\n", 1)
                 self._cast_spell_for(self.enemy, spell_name, caster_is_player=False)
-                return True
+                return {"type": "cast_spell", "spell_name": spell_name}
+
+        return None
 
-        return False
+    def _enemy_turn(self) -> tuple[dict, dict | None]:
+        """
+        Выполняет ход врага с опциональной помощью DM.
+
+        Returns:
+            (действие, реакция DM если она пришла в совмещённом ответе)
+        """
+        self.presenter.show(f"👹 Ход {self.enemy.name}:\n", 1)
 
-    def _enemy_turn(self):
-        """Выполняет ход врага с опциональной помощью DM"""
-        logger.info(f"👹 Ход {self.enemy.name}:\n")
-        time.sleep(1)
+        if self.statuses.consume_stun(self.enemy):
+            if self.speculator is not None:
+                self.speculator.discard()
+            self.presenter.show(f"💫 {self.enemy.name} оглушён и пропускает ход", 1)
+            return {"type": "stunned"}, None
 
         damage_spells = self._get_enemy_available_spells()
 
         # Попытка получить действие от DM
-        if self._try_dm_enemy_action(damage_spells):
-            return
+        dm_result = self._try_dm_enemy_action(damage_spells)
+        reaction = None
+        if dm_result is not None:
+            if dm_result[0] is not None:
+                return dm_result
+            reaction = dm_result[1]
 
-        # FALLBACK: стандартная логика если DM отключен или ошибка
-        if damage_spells:
-            spell_name = damage_spells[0].name
-            logger.info(f"🤖 {self.enemy.name} кастует {spell_name}!\n")
-            time.sleep(1)
+        # FALLBACK: стратегия врага если DM отключен или ошибка
+        action = self.enemy_policy.choose_action(self, self.enemy, damage_spells)
+
+        if action.get("type") == "cast_spell":
+            spell_name = action.get("spell_name")
+            if spell_name not in [s.name for s in damage_spells]:
+                raise ValueError(f"Недопустимое действие врага: {action}")
+            self.presenter.show(f"🤖 {self.enemy.name} кастует {spell_name}!\n", 1)
             self._cast_spell_for(self.enemy, spell_name, caster_is_player=False)
-            return
+            return {"type": "cast_spell", "spell_name": spell_name}, reaction
 
         self._basic_attack(self.enemy, self.player)
+        return {"type": "basic_attack"}, reaction
+
+    def _winner(self) -> str:
+        if self.enemy.current_hp <= settings.MIN_HP:
+            return "player"
+        if self.player.current_hp <= settings.MIN_HP:
+            return "enemy"
+        return "draw"
 
     def _show_result(self):
-        if self.player.current_hp > 0:
-            logger.info(BattleVisuals.victory_banner())
+        if not self.presenter.enabled:
+            return
+
+        winner = self._winner()
+        if winner == "player":
+            self.presenter.show(BattleVisuals.victory_banner())
+        elif winner == "enemy":
+            self.presenter.show(BattleVisuals.defeat_banner())
         else:
-            logger.info(BattleVisuals.defeat_banner())
+            self.presenter.show(BattleVisuals.draw_banner())
 
-        logger.info(BattleVisuals.creature_status_box(self.player))
-        logger.info(BattleVisuals.creature_status_box(self.enemy))
+        self.presenter.show(BattleVisuals.creature_status_box(self.player))
+        self.presenter.show(BattleVisuals.creature_status_box(self.enemy))
@@ -0,0 +1,112 @@
+"""
+Headless-режим: бой без консоли, пауз и input().
+Нужен для баланса и регрессионных прогонов — тысячи боёв в секунду.
+"""
+from contextlib import contextmanager
+
+from loguru import logger
+
+from domain.battle.battle import Battle
+from domain.battle.policies import ActionPolicy
+from domain.battle.presenters import SilentPresenter
+from domain.battle.results import BattleResult
+from domain.entities.character import Character
+from domain.entities.enemy import Enemy
+from domain.entities.grimoire import Grimoire
+
+# Модули, которые логируют каждый удар/каст. В headless-режиме их вывод только тормозит
+NOISY_MODULES = ("domain", "services")
+
+
+def _activation(name: str) -> tuple[bool, list[tuple[str, bool]]]:
+    """
+    Как loguru сейчас настроен для пакета: (включён ли он, явные настройки его подмодулей).
+    logger.disable(name) стирает настройки подмодулей, поэтому их надо запомнить заранее.
+    Публичного чтения активации у loguru нет — берём из logger._core.
+    """
+    prefix = name + "."
+    entries = logger._core.activation_list
+    enabled = next((status for module, status in entries if prefix[:len(module)] == module), True)
+    nested = [(module[:-1], status) for module, status in entries if module.startswith(prefix) and module != prefix]
+    return enabled, nested
+
+
+@contextmanager
+def muted_logging(modules: tuple[str, ...] = NOISY_MODULES):
+    """Временно глушит loguru для перечисленных пакетов; на выходе возвращает их прежние настройки"""
+    saved = [(name, *_activation(name)) for name in modules]
+    for name in modules:
+        logger.disable(name)
+    try:
+        yield
+    finally:
+        for name, enabled, nested in reversed(saved):
+            if enabled:
+                logger.enable(name)
+            # от внешних пакетов к вложенным — как их и настраивали
+            for module, status in sorted(nested, key=lambda entry: entry[0].count(".")):
+                (logger.enable if status else logger.disable)(module)
+
+
+def run_headless(
+        player: Character,
+        enemy: Enemy,
+        grimoire: Grimoire,
+        player_policy: ActionPolicy,
+        enemy_policy: ActionPolicy | None = None,
+        dm=None,
+        max_rounds: int | None = 1000,
+        seed: int | None = None,
+) -> BattleResult:
+    """
+    Прогоняет один бой без вывода и пауз.
+
+    Args:
+        player_policy: Стратегия игрока (HumanPolicy здесь не имеет смысла)
+        enemy_policy: Fallback-стратегия врага (по умолчанию — первый damage-спелл)
+        dm: DM сервис или None (для чистой скорости — None)
+        max_rounds: Защита от бесконечного боя (например, оба только лечатся)
+        seed: Зерно бросков костей (для спеллов с выражениями вроде "3d6+2")
+
+    Returns:
+        BattleResult с победителем, числом раундов и списком ходов
+    """
+    battle = Battle(
+        player,
+        enemy,
+        grimoire,
+        dm=dm,
+        player_policy=player_policy,
+        enemy_policy=enemy_policy,
+        presenter=SilentPresenter(),
+        max_rounds=max_rounds,
+        seed=seed,
+    )
+    with muted_logging():
+        return battle.run()
+
+
+if __name__ == "__main__":
+    import time
+
+    from domain import Spell, SpellType
+    from domain.battle.policies import RandomPolicy
+
+    fireball = Spell("Fireball", 30, 3, SpellType.DAMAGE, 20)
+    healing = Spell("Healing", 20, 2, SpellType.HEAL, 25)
+
+    n_battles = 2000
+    wins = 0
+    started = time.perf_counter()
+    for seed in range(n_battles):
+        grimoire = Grimoire([fireball, healing])
+        result = run_headless(
+            Character(60, 100, "Артур"),
+            Enemy(50, 80, "Темный маг1", grimoire),
+            grimoire,
+            player_policy=RandomPolicy(seed),
+        )
+        wins += result.winner == "player"
+    elapsed = time.perf_counter() - started
+
+    print(f"✅ {n_battles} боёв за {elapsed:.2f} c ({n_battles / elapsed:.0f} боёв/с), побед игрока: {wins}")
@@ -0,0 +1,97 @@
+"""
+Двоичная куча с картой позиций: кроме push/pop умеет убрать или перевзвесить
+произвольный элемент за O(log n) — без ленивого удаления и мусора в куче.
+"""
+from typing import Any, Hashable
+
+
+class IndexedHeap:
+    """Минимальная куча элементов (hashable) по ключу; элемент в куче не больше одного раза"""
+
+    def __init__(self):
+        self._heap: list[tuple[Any, Hashable]] = []
+        self._pos: dict[Hashable, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def __contains__(self, item: Hashable) -> bool:
+        return item in self._pos
+
+    def key(self, item: Hashable) -> Any:
+        return self._heap[self._pos[item]][0]
+
+    def peek(self) -> tuple[Any, Hashable] | None:
+        """(ключ, элемент) с минимальным ключом или None"""
+        return self._heap[0] if self._heap else None
+
+    def push(self, item: Hashable, key: Any) -> None:
+        """Добавить элемент или обновить его ключ"""
+        position = self._pos.get(item)
+        if position is not None:
+            self._reposition(position, key)
+            return
+        self._heap.append((key, item))
+        self._pos[item] = len(self._heap) - 1
+        self._sift_up(len(self._heap) - 1)
+
+    update = push
+
+    def pop(self) -> tuple[Any, Hashable]:
+        """Снять минимальный (ключ, элемент)"""
+        if not self._heap:
+            raise IndexError('Куча пуста')
+        return self._take(0)
+
+    def remove(self, item: Hashable) -> bool:
+        """Убрать элемент; False — его не было"""
+        position = self._pos.get(item)
+        if position is None:
+            return False
+        self._take(position)
+        return True
+
+    def _take(self, position: int) -> tuple[Any, Hashable]:
+        entry = self._heap[position]
+        last = self._heap.pop()
+        del self._pos[entry[1]]
+        if position < len(self._heap):
+            self._heap[position] = last
+            self._pos[last[1]] = position
+            self._sift_down(self._sift_up(position))
+        return entry
+
+    def _reposition(self, position: int, key: Any) -> None:
+        item = self._heap[position][1]
+        self._heap[position] = (key, item)
+        self._sift_down(self._sift_up(position))
+
+    def _swap(self, a: int, b: int) -> None:
+        heap = self._heap
+        heap[a], heap[b] = heap[b], heap[a]
+        self._pos[heap[a][1]] = a
+        self._pos[heap[b][1]] = b
+
+    def _sift_up(self, position: int) -> int:
+        heap = self._heap
+        while position:
+            parent = (position - 1) >> 1
+            if heap[position][0] < heap[parent][0]:
+                self._swap(position, parent)
+                position = parent
+            else:
+                break
+        return position
+
+    def _sift_down(self, position: int) -> int:
+        heap = self._heap
+        size = len(heap)
+        while True:
+            smallest = position
+            for child in (2 * position + 1, 2 * position + 2):
+                if child < size and heap[child][0] < heap[smallest][0]:
+                    smallest = child
+            if smallest == position:
+                return position
+            self._swap(position, smallest)
+            position = smallest
@@ -0,0 +1,507 @@
+"""
+Журнал боя: компактная бинарная запись всего, что меняло состояние, и её воспроизведение.
+
+Файл только дописывается. Каждый бой в нём — заголовок (зерно бросков, лимит раундов,
+базовая атака, существа, гримуар) и записи фиксированного размера: начало раунда, действие,
+событие DM (вход apply_event), конец боя. В каждой записи — HP и мана обеих сторон после
+неё: по ним воспроизведение сверяется бит в бит.
+
+Воспроизведение прогоняет записи через то же ядро правил, что и Battle (rules.py: броски —
+тем же зерном, эффекты; плюс таймеры статусов, apply_event), но без DM, логов и пауз. Если после изменения
+правил исход записи другой — это расхождение: так перепроверяются архивы боёв.
+
+Запись: Battle(..., journal=BattleJournal("battles.journal"))
+Проверка архива: python -m domain.battle.journal battles.journal
+"""
+import struct
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import BinaryIO, Iterator
+
+from loguru import logger
+
+from services.dm_events import apply_event
+from services.json_protocol import clamp_int
+from domain.battle.battle import Battle
+from domain.battle.headless import muted_logging
+from domain.battle.presenters import SilentPresenter
+from domain.battle import rules
+from domain.battle.targeting import TargetSide, target_side
+from domain.entities.character import Character
+from domain.entities.effects import DEFAULT_EFFECTS
+from domain.entities.enemy import Enemy
+from domain.entities.grimoire import Grimoire
+from domain.entities.spell import Spell
+from domain.enums.spell_type import SpellType
+
+MAGIC = b"DNDJ"
+_MAGIC_START = MAGIC[0]
+FORMAT_VERSION = 1
+
+# Виды записей
+ROUND, BASIC_ATTACK, CAST_SPELL, STUNNED, EVENT, END = range(1, 7)
+# Стороны
+PLAYER, ENEMY = 0, 1
+# Цель события, которое apply_event отверг бы (неизвестный тип/цель, нецелые дельты)
+INVALID_TARGET = 0xFFFF
+WINNERS = ("draw", "player", "enemy")
+ACTORS = ("player", "enemy")
+
+_FRAME = struct.Struct("<4sHI")  # magic, версия, длина заголовка
+# kind, actor, arg (спелл/цель события), a, b (раунд / дельты / победитель+раунды), HP и мана сторон
+_RECORD = struct.Struct("<BBHii4h")
+_HEADER = struct.Struct("<qiB")  # зерно, лимит раундов (-1 — нет), число спеллов
+_CREATURE = struct.Struct("<4h")  # max_hp, max_mana, hp, mana
+_SPELL = struct.Struct("<HBBB")  # стоимость, уровень, индекс типа, свой обработчик
+_STRING = struct.Struct("<H")
+_SPELL_TYPES = list(SpellType)
+_I32 = (-2 ** 31, 2 ** 31 - 1)
+
+
+class JournalError(ValueError):
+    """Журнал повреждён или другой версии"""
+
+
+def _pack_str(text: str) -> bytes:
+    data = text.encode()
+    return _STRING.pack(len(data)) + data
+
+
+def _read_str(view: memoryview, offset: int) -> tuple[str, int]:
+    (size,), offset = _STRING.unpack_from(view, offset), offset + _STRING.size
+    return bytes(view[offset:offset + size]).decode(), offset + size
+
+
+def _power_text(spell: Spell) -> str:
+    return str(spell.dice) if spell.dice is not None else str(spell.power)
+
+
+@lru_cache(maxsize=1024)
+def _parse_power(text: str) -> int | str:
+    try:
+        return int(text)
+    except ValueError:
+        return text
+
+
+@dataclass(frozen=True)
+class CreatureRecord:
+    name: str
+    max_hp: int
+    max_mana: int
+    hp: int
+    mana: int
+
+
+@dataclass(frozen=True)
+class SpellRecord:
+    name: str
+    mana_cost: int
+    level: int
+    spell_type: SpellType
+    power: int | str
+    custom_effect: bool
+
+
+@dataclass
+class JournalHeader:
+    """Всё, что нужно, чтобы начать бой заново"""
+    battle_id: str
+    seed: int
+    max_rounds: int | None
+    basic_attack: int | str
+    player: CreatureRecord
+    enemy: CreatureRecord
+    spells: list[SpellRecord]
+
+    def pack(self) -> bytes:
+        parts = [
+            _HEADER.pack(self.seed, -1 if self.max_rounds is None else self.max_rounds, len(self.spells)),
+            _pack_str(self.battle_id),
+            _pack_str(str(self.basic_attack)),
+        ]
+        for creature in (self.player, self.enemy):
+            parts.append(_pack_str(creature.name))
+            parts.append(_CREATURE.pack(creature.max_hp, creature.max_mana, creature.hp, creature.mana))
+        for spell in self.spells:
+            parts.append(_pack_str(spell.name))
+            parts.append(_SPELL.pack(
+                spell.mana_cost, spell.level, _SPELL_TYPES.index(spell.spell_type), spell.custom_effect
+            ))
+            parts.append(_pack_str(str(spell.power)))
+        return b"".join(parts)
+
+    @classmethod
+    def unpack(cls, view: memoryview) -> "JournalHeader":
+        seed, max_rounds, n_spells = _HEADER.unpack_from(view, 0)
+        offset = _HEADER.size
+        battle_id, offset = _read_str(view, offset)
+        basic_attack, offset = _read_str(view, offset)
+        creatures = []
+        for _ in range(2):
+            name, offset = _read_str(view, offset)
+            creatures.append(CreatureRecord(name, *_CREATURE.unpack_from(view, offset)))
+            offset += _CREATURE.size
+        # гримуар — хвост заголовка
+        spells = _unpack_spells(bytes(view[offset:]), n_spells)
+        return cls(
+            battle_id, seed, None if max_rounds < 0 else max_rounds, _parse_power(basic_attack),
+            creatures[0], creatures[1], list(spells),
+        )
+
+
+@lru_cache(maxsize=256)
+def _unpack_spells(data: bytes, n_spells: int) -> tuple[SpellRecord, ...]:
+    """Гримуар заголовка; в архиве он у тысяч боёв один и тот же — разбирается один раз"""
+    view = memoryview(data)
+    offset = 0
+    spells = []
+    for _ in range(n_spells):
+        name, offset = _read_str(view, offset)
+        cost, level, type_index, custom = _SPELL.unpack_from(view, offset)
+        offset += _SPELL.size
+        power, offset = _read_str(view, offset)
+        spells.append(SpellRecord(name, cost, level, _SPELL_TYPES[type_index], _parse_power(power), bool(custom)))
+    return tuple(spells)
+
+
+class BattleJournal:
+    """
+    Писатель журнала для Battle. Записи копятся в буфере и дописываются в файл в конце
+    каждого раунда — при падении теряется не больше текущего раунда.
+    Один журнал можно передавать в несколько боёв подряд: они лягут в файл друг за другом.
+    """
+
+    def __init__(self, path: str | None = None, stream: BinaryIO | None = None):
+        """
+        :param path: Файл журнала (открывается на дозапись)
+        :param stream: Или готовый бинарный поток (например, BytesIO)
+        """
+        if (path is None) == (stream is None):
+            raise ValueError('Нужен либо path, либо stream')
+        self._stream = stream if stream is not None else open(path, "ab")
+        self._owns_stream = stream is None
+        self._buffer = bytearray()
+        self._spell_index: dict[str, int] = {}
+        self.records = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _record(self, battle, kind: int, actor: int = 0, arg: int = 0, a: int = 0, b: int = 0) -> None:
+        player, enemy = battle.player, battle.enemy
+        self._buffer += _RECORD.pack(
+            kind, actor, arg, a, b, player.current_hp, player.current_mana, enemy.current_hp, enemy.current_mana
+        )
+        self.records += 1
+
+    def begin(self, battle) -> None:
+        """Заголовок боя: пишется до первого раунда"""
+        spells = battle.grimoire.spell_list
+        self._spell_index = {spell.name: i for i, spell in enumerate(spells)}
+        basic_attack = battle.basic_attack_damage if battle.basic_attack_dice is None else str(battle.basic_attack_dice)
+        header = JournalHeader(
+            battle_id=battle.battle_id,
+            seed=battle.seed,
+            max_rounds=battle.max_rounds,
+            basic_attack=basic_attack,
+            player=CreatureRecord(battle.player.name, battle.player.max_hp, battle.player.max_mana,
+                                  battle.player.current_hp, battle.player.current_mana),
+            enemy=CreatureRecord(battle.enemy.name, battle.enemy.max_hp, battle.enemy.max_mana,
+                                 battle.enemy.current_hp, battle.enemy.current_mana),
+            spells=[
+                SpellRecord(s.name, s.mana_cost, s.level, s.spell_type, _parse_power(_power_text(s)),
+                            s.effect is not DEFAULT_EFFECTS.get(s.spell_type))
+                for s in spells
+            ],
+        ).pack()
+        self._buffer += _FRAME.pack(MAGIC, FORMAT_VERSION, len(header)) + header
+
+    def round(self, battle) -> None:
+        """Начало раунда (после тиков длительных эффектов)"""
+        self.flush()
+        self._record(battle, ROUND, a=battle.round_number)
+
+    def action(self, battle, actor: str, action: dict) -> None:
+        """Выполненное действие стороны"""
+        side = ACTORS.index(actor)
+        kind = action["type"]
+        if kind == "basic_attack":
+            self._record(battle, BASIC_ATTACK, side)
+        elif kind == "cast_spell":
+            self._record(battle, CAST_SPELL, side, self._spell_index[action["spell_name"]])
+        elif kind == "stunned":
+            self._record(battle, STUNNED, side)
+        else:
+            raise ValueError(f'Неизвестное действие для журнала: {action}')
+
+    def event(self, battle, actor: str, event: dict) -> None:
+        """Событие DM после хода actor — в том виде, в каком его получил apply_event"""
+        target, hp_delta, mana_delta = INVALID_TARGET, 0, 0
+        raw_hp, raw_mana = event.get("hp_delta", 0), event.get("mana_delta", 0)
+        if (event.get("type") == "modify_stats" and event.get("target") in ACTORS
+                and isinstance(raw_hp, int) and isinstance(raw_mana, int)):
+            target = ACTORS.index(event["target"])
+            # apply_event всё равно зажмёт дельты до MAX_*_DELTA — в int32 они помещаются без потерь
+            hp_delta, mana_delta = clamp_int(raw_hp, *_I32), clamp_int(raw_mana, *_I32)
+        self._record(battle, EVENT, ACTORS.index(actor), target, hp_delta, mana_delta)
+
+    def end(self, battle, winner: str) -> None:
+        self._record(battle, END, a=WINNERS.index(winner), b=battle.round_number)
+        self.flush()
+
+    def flush(self) -> None:
+        if self._buffer:
+            self._stream.write(self._buffer)
+            self._stream.flush()
+            self._buffer.clear()
+
+    def close(self) -> None:
+        self.flush()
+        if self._owns_stream:
+            self._stream.close()
+
+
+# ---------- чтение ----------
+
+@dataclass
+class JournalBattle:
+    """Один бой из журнала: заголовок и сырые записи (по _RECORD.size байт)"""
+    header: JournalHeader
+    records: memoryview
+
+    def __len__(self) -> int:
+        return len(self.records) // _RECORD.size
+
+    @property
+    def complete(self) -> bool:
+        """Бой дописан до конца (а не оборван падением)"""
+        return len(self) > 0 and self.records[(len(self) - 1) * _RECORD.size] == END
+
+
+def _torn_tail(offset: int, reason: str) -> None:
+    logger.warning(f'Журнал оборван на смещении {offset}: {reason} — хвост пропущен')
+
+
+def read_journal(data: bytes) -> Iterator[JournalBattle]:
+    """
+    Бои журнала по порядку. Последний может быть недописан (complete=False), а бой,
+    от которого при падении успела записаться только часть заголовка, пропускается.
+
+    Raises:
+        JournalError: Повреждение не в хвосте файла или другая версия журнала
+    """
+    view = memoryview(data)
+    offset = 0
+    while offset < len(view):
+        if len(view) - offset < _FRAME.size:
+            if not MAGIC.startswith(bytes(view[offset:offset + len(MAGIC)])):
+                raise JournalError(f'Нет заголовка боя на смещении {offset}')
+            _torn_tail(offset, 'недописанная рамка заголовка')
+            return
+        magic, version, header_size = _FRAME.unpack_from(view, offset)
+        if magic != MAGIC:
+            raise JournalError(f'Нет заголовка боя на смещении {offset}')
+        if version != FORMAT_VERSION:
+            raise JournalError(f'Версия журнала {version} не поддерживается (ожидалась {FORMAT_VERSION})')
+        if len(view) - offset - _FRAME.size < header_size:
+            _torn_tail(offset, f'от заголовка боя записано меньше {header_size} Б')
+            return
+        try:
+            header = JournalHeader.unpack(view[offset + _FRAME.size:offset + _FRAME.size + header_size])
+        except (struct.error, UnicodeDecodeError, IndexError) as exc:
+            if offset + _FRAME.size + header_size == len(view):
+                _torn_tail(offset, f'заголовок последнего боя не читается ({exc})')
+                return
+            raise JournalError(f'Заголовок боя на смещении {offset} повреждён: {exc}') from exc
+        offset += _FRAME.size + header_size
+
+        start = offset
+        # записи до END или до следующего заголовка/конца файла (бой оборвался);
+        # вид записи не бывает b"D", так что MAGIC сверяется целиком только после первого байта
+        last = len(view) - _RECORD.size
+        while offset <= last:
+            kind = view[offset]
+            if kind == _MAGIC_START and view[offset:offset + len(MAGIC)] == MAGIC:
+                break
+            offset += _RECORD.size
+            if kind == END:
+                break
+        yield JournalBattle(header, view[start:offset])
+        # вид записи не бывает b"D" — начало MAGIC в хвосте значит рамку следующего боя
+        if 0 < len(view) - offset < _RECORD.size and not MAGIC.startswith(bytes(view[offset:offset + len(MAGIC)])):
+            _torn_tail(offset, 'недописанная запись')
+            return
+
+
+def read_journal_file(path: str) -> list[JournalBattle]:
+    with open(path, "rb") as f:
+        return list(read_journal(f.read()))
+
+
+# ---------- воспроизведение ----------
+
+@dataclass
+class Mismatch:
+    """Запись, после которой состояние разошлось с журналом"""
+    record: int
+    round_number: int
+    kind: int
+    expected: tuple[int, int, int, int]
+    actual: tuple[int, int, int, int]
+
+
+@dataclass
+class ReplayResult:
+    battle: Battle  # в состоянии на момент остановки
+    records: int
+    mismatches: list[Mismatch] = field(default_factory=list)
+    winner: str | None = None  # из записи END, если до неё дошли
+
+    @property
+    def ok(self) -> bool:
+        return not self.mismatches
+
+
+def _build_grimoire(header: JournalHeader) -> Grimoire:
+    custom = [s.name for s in header.spells if s.custom_effect]
+    if custom:
+        raise ValueError(f'Спеллы со своими эффектами требуют переданного гримуара: {custom}')
+    return Grimoire([Spell(s.name, s.mana_cost, s.level, s.spell_type, s.power) for s in header.spells])
+
+
+def build_battle(header: JournalHeader, grimoire: Grimoire | None = None) -> Battle:
+    """
+    Бой в начальном состоянии из заголовка.
+
+    Args:
+        grimoire: Гримуар со своими обработчиками эффектов — они в журнал не пишутся;
+            без них спеллы собираются со встроенными эффектами
+    """
+    if grimoire is None:
+        grimoire = _build_grimoire(header)
+    elif [s.name for s in grimoire.spell_list] != [s.name for s in header.spells]:
+        raise ValueError('Гримуар не совпадает с записанным в журнале')
+
+    player = Character(header.player.max_mana, header.player.max_hp, header.player.name)
+    enemy = Enemy(header.enemy.max_mana, header.enemy.max_hp, header.enemy.name, grimoire)
+    for creature, record in ((player, header.player), (enemy, header.enemy)):
+        creature.current_hp, creature.current_mana = record.hp, record.mana
+    return Battle(
+        player, enemy, grimoire,
+        presenter=SilentPresenter(),
+        max_rounds=header.max_rounds,
+        battle_id=header.battle_id,
+        basic_attack=header.basic_attack,
+        seed=header.seed,
+    )
+
+
+def replay(journal_battle: JournalBattle, until_round: int | None = None,
+           grimoire: Grimoire | None = None, stop_on_mismatch: bool = False) -> ReplayResult:
+    """
+    Прогоняет записи через правила Battle.
+
+    Args:
+        until_round: Остановиться в начале этого раунда (после его тиков) — состояние
+            боя на любой раунд; None — до конца
+        stop_on_mismatch: Прервать на первом расхождении
+
+    Returns:
+        ReplayResult: battle — восстановленный бой, mismatches — расхождения с журналом
+    """
+    with muted_logging():
+        return _replay(journal_battle, until_round, grimoire, stop_on_mismatch)
+
+
+def verify(battles: list[JournalBattle],
+           grimoire: Grimoire | None = None) -> Iterator[tuple[JournalBattle, ReplayResult]]:
+    """
+    Перепроверка архива: каждый бой до конца. Логи глушатся один раз на весь архив,
+    гримуар собирается один раз на набор спеллов (боёв с одним гримуаром обычно много)
+    """
+    grimoires: dict[tuple[SpellRecord, ...], Grimoire] = {}
+    with muted_logging():
+        for journal_battle in battles:
+            battle_grimoire = grimoire
+            if battle_grimoire is None:
+                spells = tuple(journal_battle.header.spells)
+                if spells not in grimoires:
+                    grimoires[spells] = _build_grimoire(journal_battle.header)
+                battle_grimoire = grimoires[spells]
+            yield journal_battle, _replay(journal_battle, None, battle_grimoire, False)
+
+
+def _replay(journal_battle: JournalBattle, until_round: int | None, grimoire: Grimoire | None,
+            stop_on_mismatch: bool) -> ReplayResult:
+    battle = build_battle(journal_battle.header, grimoire)
+    # Атаки и касты — прямо через ядро правил (rules.py), без логов Battle: их здесь сотни тысяч
+    spells = battle.grimoire.spell_list
+    on_self = [target_side(spell.spell_type) == TargetSide.ALLY for spell in spells]
+    dice, fixed_damage, rng = battle.basic_attack_dice, battle.basic_attack_damage, battle.rng
+    player, enemy = sides = (battle.player, battle.enemy)
+    result = ReplayResult(battle, 0)
+
+    hit, roll_basic_attack, cast_spell = rules.hit, rules.roll_basic_attack, rules.cast_spell
+    advance_statuses = battle.statuses.advance
+
+    # виды — по частоте в типичном журнале: атаки и касты, затем раунды
+    index = -1
+    records = enumerate(_RECORD.iter_unpack(journal_battle.records))
+    for index, (kind, actor, arg, a, b, player_hp, player_mana, enemy_hp, enemy_mana) in records:
+        if kind == BASIC_ATTACK:
+            hit(sides[1 - actor], roll_basic_attack(dice, fixed_damage, rng))
+        elif kind == CAST_SPELL:
+            cast_spell(spells[arg], sides[actor], sides[actor if on_self[arg] else 1 - actor], rng)
+        elif kind == ROUND:
+            battle.round_number = a
+            advance_statuses(a)  # тики без вывода: _advance_statuses только добавил бы показ
+        elif kind == STUNNED:
+            battle.statuses.consume_stun(sides[actor])
+        elif kind == EVENT:
+            if arg != INVALID_TARGET:
+                event = {"type": "modify_stats", "target": ACTORS[arg], "hp_delta": a, "mana_delta": b}
+                apply_event(event, player, enemy)
+        elif kind == END:
+            result.winner = WINNERS[a]
+        else:
+            raise JournalError(f'Неизвестный вид записи {kind} (запись {index})')
+
+        if (player.current_hp != player_hp or enemy.current_hp != enemy_hp
+                or player.current_mana != player_mana or enemy.current_mana != enemy_mana):
+            expected = (player_hp, player_mana, enemy_hp, enemy_mana)
+            actual = (player.current_hp, player.current_mana, enemy.current_hp, enemy.current_mana)
+            result.mismatches.append(Mismatch(index, battle.round_number, kind, expected, actual))
+            if stop_on_mismatch:
+                break
+        if until_round is not None and kind == ROUND and a >= until_round:
+            break
+    result.records = index + 1
+    return result
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Перепроверка архива журналов боёв")
+    parser.add_argument("paths", nargs="+")
+    args = parser.parse_args()
+
+    for path in args.paths:
+        started = time.perf_counter()
+        battles = read_journal_file(path)
+        records = diverged = 0
+        for journal_battle, result in verify(battles):
+            records += result.records
+            if not result.ok:
+                diverged += 1
+                first = result.mismatches[0]
+                print(f"❌ {journal_battle.header.battle_id}: раунд {first.round_number}, "
+                      f"запись {first.record}: ожидалось {first.expected}, получилось {first.actual}")
+        elapsed = time.perf_counter() - started
+        print(f"{path}: боёв {len(battles)}, разошлось {diverged}, записей {records} "
+              f"({records / elapsed:,.0f} записей/с)")
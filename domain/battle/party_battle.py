@@ -0,0 +1,202 @@
+"""
+Бой команд: отряд против орды, от пары до сотен бойцов.
+
+Очередь ходов — куча инициативы по времени следующего действия: боец со скоростью s
+ходит раз в 1/s раунда (раунд — единица времени, в нём бойцы со скоростью 1 ходят по
+разу). Погибший убирается из кучи и индексов целей за O(log n), цели берутся из индексов
+команд (targeting.TeamIndex), поэтому стоимость хода не растёт с числом бойцов.
+
+DM здесь не участвует: бой рассчитан на headless-симуляции больших сражений.
+"""
+import itertools
+import math
+import random
+from loguru import logger
+
+from config.settings import settings
+from domain.battle.indexed_heap import IndexedHeap
+from domain.battle.policies import ActionPolicy, FirstDamageSpellPolicy
+from domain.battle.presenters import SilentPresenter
+from domain.battle.results import BattleResult, TurnResult
+from domain.battle.status_effects import StatusEffects
+from domain.battle.targeting import TargetSide, TeamIndex, target_side
+from domain.entities.creature import Creature
+from domain.entities.grimoire import Grimoire
+
+
+class Combatant:
+    """Участник боя команд"""
+
+    __slots__ = ("id", "creature", "team", "speed", "policy")
+
+    def __init__(self, id: int, creature: Creature, team: str, speed: float, policy: ActionPolicy):
+        self.id = id
+        self.creature = creature
+        self.team = team
+        self.speed = speed
+        self.policy = policy
+
+    def __repr__(self):
+        return f'Combatant: (id={self.id}, name={self.creature.name}, team={self.team})'
+
+    @property
+    def alive(self) -> bool:
+        return self.creature.current_hp > settings.MIN_HP
+
+
+class PartyBattle:
+    """Бой нескольких команд с очередью инициативы"""
+
+    def __init__(
+            self,
+            grimoire: Grimoire,
+            presenter=None,
+            max_rounds: int | None = 1000,
+            basic_attack_damage: int = 10,
+            seed: int | None = None,
+    ):
+        """
+        :param grimoire: Общий гримуар всех бойцов
+        :param presenter: Вывод боя (по умолчанию SilentPresenter)
+        :param max_rounds: Лимит раундов; по достижении бой заканчивается ничьей
+        :param seed: Зерно бросков костей спеллов
+        """
+        self.grimoire = grimoire
+        self.presenter = presenter or SilentPresenter()
+        self.max_rounds = max_rounds
+        self.basic_attack_damage = basic_attack_damage
+        self.round_number = 0
+        self.rng = random.Random(seed)
+        self.turns: list[TurnResult] = []
+        self.statuses = StatusEffects()
+        self.teams: dict[str, TeamIndex] = {}
+        self._initiative = IndexedHeap()
+        self._by_creature: dict[int, Combatant] = {}
+        self._ids = itertools.count()
+
+    def add(
+            self,
+            creature: Creature,
+            team: str,
+            policy: ActionPolicy | None = None,
+            speed: float = 1.0,
+    ) -> Combatant:
+        """
+        Добавить бойца до начала боя.
+
+        :param team: Название команды (союзники — одна команда)
+        :param policy: Стратегия (по умолчанию — первый damage-спелл)
+        :param speed: Действий за раунд
+        """
+        if speed <= 0:
+            raise ValueError('Скорость бойца должна быть положительной')
+        combatant = Combatant(next(self._ids), creature, team, speed, policy or FirstDamageSpellPolicy())
+        self.teams.setdefault(team, TeamIndex()).add(combatant)
+        self._by_creature[id(creature)] = combatant
+        self.statuses.attach(creature)
+        # более быстрые ходят первыми при равном времени, дальше — порядок добавления
+        self._initiative.push(combatant, (0.0, -speed, combatant.id))
+        return combatant
+
+    # ---------- цели ----------
+
+    def _foes(self, team: str):
+        return (index for name, index in self.teams.items() if name != team and len(index))
+
+    def _pick_foe(self, combatant: Combatant) -> Combatant | None:
+        """Самый слабый противник среди всех чужих команд"""
+        candidates = [index.lowest_hp() for index in self._foes(combatant.team)]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda c: (c.creature.current_hp, c.id))
+
+    def _pick_ally(self, combatant: Combatant) -> Combatant:
+        """Самый раненый союзник (или сам боец, если раненых нет)"""
+        return self.teams[combatant.team].most_wounded() or combatant
+
+    def _get_target(self, combatant: Combatant, spell_name: str | None) -> Combatant | None:
+        """Цель действия: обобщение Battle._get_target на команды"""
+        spell = self.grimoire.get_spell_by_name(spell_name) if spell_name else None
+        if spell_name and spell is None:
+            raise ValueError(f"Спелл {spell_name} отсутствует в гримуаре!")
+        side = target_side(spell.spell_type if spell else None)
+        return self._pick_ally(combatant) if side == TargetSide.ALLY else self._pick_foe(combatant)
+
+    # ---------- учёт HP ----------
+
+    def _touched(self, combatant: Combatant) -> None:
+        """HP бойца изменилось: обновить индексы, убрать погибшего"""
+        team = self.teams[combatant.team]
+        if combatant.alive:
+            team.refresh(combatant)
+            return
+        team.remove(combatant)
+        self._initiative.remove(combatant)
+        if self.presenter.enabled:
+            self.presenter.show(f"💀 {combatant.creature.name} ({combatant.team}) пал")
+
+    def _advance_statuses(self) -> None:
+        for effect, _ in self.statuses.advance(self.round_number):
+            combatant = self._by_creature.get(id(effect.target))
+            if combatant is not None and combatant in self.teams[combatant.team].weakest:
+                self._touched(combatant)
+
+    # ---------- ход ----------
+
+    def _act(self, combatant: Combatant) -> dict:
+        creature = combatant.creature
+        if self.statuses.consume_stun(creature):
+            return {"type": "stunned"}
+
+        available = self.grimoire.affordable_spells(creature.current_mana)
+        action = combatant.policy.choose_action(self, creature, available)
+        spell_name = action.get("spell_name") if action.get("type") == "cast_spell" else None
+        if spell_name is not None and spell_name not in [s.name for s in available]:
+            raise ValueError(f"Недопустимое действие {creature.name}: {action}")
+
+        target = self._get_target(combatant, spell_name)
+        if target is None:
+            return {"type": "idle"}
+        if spell_name is None:
+            target.creature.take_damage(self.basic_attack_damage)
+            result = {"type": "basic_attack", "target": target.creature.name}
+        else:
+            self.grimoire.cast_spell(spell_name, creature, target.creature, self.rng)
+            result = {"type": "cast_spell", "spell_name": spell_name, "target": target.creature.name}
+        self._touched(target)
+        return result
+
+    def _standing_teams(self) -> list[str]:
+        return [name for name, index in self.teams.items() if len(index)]
+
+    def run(self) -> BattleResult:
+        """
+        Returns:
+            BattleResult: winner — название победившей команды или "draw";
+            в turns actor — имя бойца, в action — ещё и "target"
+        """
+        if len(self.teams) < 2:
+            raise ValueError('Для боя нужно хотя бы две команды')
+
+        while len(self._standing_teams()) > 1 and len(self._initiative):
+            (time, _, _), combatant = self._initiative.pop()
+            round_number = math.floor(time) + 1
+            if round_number > self.round_number:
+                if self.max_rounds is not None and round_number > self.max_rounds:
+                    break
+                self.round_number = round_number
+                self._advance_statuses()
+                if not combatant.alive:
+                    continue  # погиб от тика в начале раунда
+
+            action = self._act(combatant)
+            self.turns.append(TurnResult(self.round_number, combatant.creature.name, action))
+            if combatant.alive:
+                self._initiative.push(combatant, (time + 1 / combatant.speed, -combatant.speed, combatant.id))
+            else:
+                self._touched(combatant)
+
+        standing = self._standing_teams()
+        winner = standing[0] if len(standing) == 1 else "draw"
+        logger.debug(f"Бой команд окончен: {winner}, раундов {self.round_number}, ходов {len(self.turns)}")
+        return BattleResult(winner, self.round_number, self.turns)
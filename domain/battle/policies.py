@@ -0,0 +1,138 @@
+"""Стратегии выбора действия в бою: живой игрок, скрипты и простые ИИ для headless-симуляций"""
+import random
+import time
+from abc import ABC, abstractmethod
+
+from loguru import logger
+
+from domain.entities.spell import Spell
+from domain.enums.spell_type import SpellType
+from utils.input_utils import input_with_log
+
+
+def basic_attack_action() -> dict:
+    return {"type": "basic_attack"}
+
+
+def cast_spell_action(spell_name: str) -> dict:
+    return {"type": "cast_spell", "spell_name": spell_name}
+
+
+class ActionPolicy(ABC):
+    """
+    Базовая стратегия выбора действия.
+
+    Стратегия получает бой, кастера и список спеллов, которые кастер может применить
+    прямо сейчас, и возвращает действие в том же формате, что уходит в DM:
+    {"type": "basic_attack"} или {"type": "cast_spell", "spell_name": "..."}
+    """
+
+    @abstractmethod
+    def choose_action(self, battle, caster, available_spells: list[Spell]) -> dict:
+        ...
+
+
+class HumanPolicy(ActionPolicy):
+    """Интерактивный выбор через консоль (поведение оригинального CLI)"""
+
+    def choose_action(self, battle, caster, available_spells: list[Spell]) -> dict:
+        while True:
+            # input_with_log - кастомный input()
+            action_choice = input_with_log(
+                f"\n{caster.name}, выбери действие:\n"
+                f"  1. Базовая атака ({battle.basic_attack_damage} урона)\n"
+                f"  2. Заклинание\n"
+                f"Ввод: "
+            ).strip()
+            time.sleep(0.5)
+
+            if action_choice == '1':
+                return basic_attack_action()
+
+            if action_choice != '2':
+                logger.info("❌ Неверный выбор!")
+                time.sleep(0.5)
+                continue
+
+            if not available_spells:
+                logger.info(f"⚠️  {caster.name} не может кастовать (нет маны)!\n")
+                time.sleep(0.5)
+                continue
+
+            for i, spell in enumerate(available_spells, 1):
+                logger.info(f"  {i}. {spell.name} (мана: {spell.mana_cost}, сила: {spell.power})")
+                time.sleep(0.5)
+
+            while True:
+                # кастомный input()
+                choice = input_with_log(f"\n{caster.name}, выбери спелл (номер): ").strip()
+
+                try:
+                    idx = int(choice) - 1
+                    return cast_spell_action(available_spells[idx].name)
+                except (ValueError, IndexError):
+                    logger.info("❌ Неверный выбор!")
+                    time.sleep(1)
+
+
+class BasicAttackPolicy(ActionPolicy):
+    """Всегда бьёт базовой атакой"""
+
+    def choose_action(self, battle, caster, available_spells: list[Spell]) -> dict:
+        return basic_attack_action()
+
+
+class FirstDamageSpellPolicy(ActionPolicy):
+    """Первый доступный damage-спелл, иначе базовая атака (fallback-логика врага)"""
+
+    def choose_action(self, battle, caster, available_spells: list[Spell]) -> dict:
+        for spell in available_spells:
+            if spell.spell_type == SpellType.DAMAGE:
+                return cast_spell_action(spell.name)
+        return basic_attack_action()
+
+
+class PriorityPolicy(ActionPolicy):
+    """Первый доступный спелл из списка приоритетов, иначе базовая атака"""
+
+    def __init__(self, spell_names: list[str]):
+        self.spell_names = list(spell_names)
+
+    def choose_action(self, battle, caster, available_spells: list[Spell]) -> dict:
+        available_names = {s.name for s in available_spells}
+        for name in self.spell_names:
+            if name in available_names:
+                return cast_spell_action(name)
+        return basic_attack_action()
+
+
+class ScriptedPolicy(ActionPolicy):
+    """
+    Проигрывает заранее заданную последовательность действий (для регрессионных сценариев).
+    Когда сценарий закончился — базовая атака.
+    """
+
+    def __init__(self, actions: list[dict]):
+        self.actions = list(actions)
+        self._position = 0
+
+    def choose_action(self, battle, caster, available_spells: list[Spell]) -> dict:
+        if self._position >= len(self.actions):
+            return basic_attack_action()
+        action = self.actions[self._position]
+        self._position += 1
+        return action
+
+
+class RandomPolicy(ActionPolicy):
+    """Равновероятный выбор между базовой атакой и доступными спеллами"""
+
+    def __init__(self, seed: int | None = None):
+        self.seed = seed
+        self.rng = random.Random(seed)
+
+    def choose_action(self, battle, caster, available_spells: list[Spell]) -> dict:
+        choice = self.rng.randrange(len(available_spells) + 1)
+        if choice == 0:
+            return basic_attack_action()
+        return cast_spell_action(available_spells[choice - 1].name)
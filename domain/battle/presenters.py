@@ -0,0 +1,39 @@
+"""Вывод боя: консоль с паузами для живого игрока или тишина для headless-симуляций"""
+import sys
+import time
+
+from loguru import logger
+
+
+class ConsolePresenter:
+    """Пишет в лог и выдерживает паузы, чтобы человек успевал читать"""
+
+    enabled = True
+
+    def show(self, text: str, delay: float = 0) -> None:
+        logger.info(text)
+        if delay:
+            time.sleep(delay)
+
+    def pause(self, delay: float) -> None:
+        time.sleep(delay)
+
+    def stream(self, text: str) -> None:
+        """Печатает кусок текста без перевода строки (для потокового нарратива)"""
+        sys.stderr.write(text)
+        sys.stderr.flush()
+
+
+class SilentPresenter:
+    """Ничего не выводит и не спит — бой идёт со скоростью CPU"""
+
+    enabled = False
+
+    def show(self, text: str, delay: float = 0) -> None:
+        pass
+
+    def pause(self, delay: float) -> None:
+        pass
+
+    def stream(self, text: str) -> None:
+        pass
@@ -0,0 +1,20 @@
+"""Результаты боя, которые движок отдаёт вместо печати"""
+from dataclasses import dataclass, field
+
+
+@dataclass
+class TurnResult:
+    """Один ход: кто, что сделал и чем ответил DM"""
+    round: int
+    actor: str  # "player" | "enemy"
+    action: dict
+    narration: str | None = None
+    event: dict | None = None
+
+
+@dataclass
+class BattleResult:
+    """Итог боя"""
+    winner: str  # "player" | "enemy" | "draw"
+    rounds: int
+    turns: list[TurnResult] = field(default_factory=list)
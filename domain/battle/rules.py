@@ -0,0 +1,106 @@
+"""
+Ядро правил боя: базовая атака и каст заклинания без логов и вывода.
+
+Battle зовёт его на каждом ходе и сам пишет итог действия в лог; воспроизведение
+журнала (journal.py) зовёт напрямую. На сотнях тысяч записей вызов loguru — даже
+заглушённого, с уже отформатированной f-строкой — стоит дороже самих правил.
+
+Встроенные эффекты (effects.DEFAULT_EFFECTS) применяются здесь же, без take_*:
+бросков и зажимов столько же, итог бит в бит тот же. Свои обработчики и существа,
+переопределившие take_*, идут через обычные вызовы — с их логикой и логами.
+"""
+import random
+
+from domain.entities import effects
+from domain.entities.character import Character
+from domain.entities.creature import Creature
+from domain.entities.dice import Dice
+from domain.entities.spell import Spell
+
+# Опыт игроку за каст — как в Grimoire.cast_spell
+EXPERIENCE_PER_CAST = 10
+
+_TAKE_METHODS = ("take_damage", "take_hp", "take_mana")
+_plain_types: dict[type, bool] = {}
+
+
+def _plain(creature) -> bool:
+    """take_* у класса существа — базовые из Creature (решение кэшируется на класс)"""
+    cls = type(creature)
+    plain = _plain_types.get(cls)
+    if plain is None:
+        plain = _plain_types[cls] = all(
+            getattr(cls, name, None) is getattr(Creature, name) for name in _TAKE_METHODS
+        )
+    return plain
+
+
+def hit(target, damage: int) -> int:
+    """
+    Урон по цели: щиты принимают его первыми, остаток уходит в HP.
+
+    Returns:
+        int: Урон, дошедший до HP
+    """
+    if not _plain(target):
+        target.take_damage(damage)
+        return damage
+    if target.statuses is not None:
+        damage = target.statuses.absorb(damage)
+    target.current_hp -= damage
+    return damage
+
+
+def _heal(target: Creature, amount: int) -> None:
+    target.current_hp += amount
+
+
+def _restore_mana(target: Creature, amount: int) -> None:
+    target.current_mana += amount
+
+
+def _burn_mana(target: Creature, amount: int) -> None:
+    target.current_mana -= amount
+
+
+# Встроенный обработчик → то же действие без лога
+_QUIET_EFFECTS = {
+    effects.damage: hit,
+    effects.heal: _heal,
+    effects.restore_mana: _restore_mana,
+    effects.burn_mana: _burn_mana,
+}
+
+
+def roll_basic_attack(dice: Dice | None, fixed_damage: int, rng: random.Random) -> int:
+    """Урон базовой атаки: бросок (не меньше 0 — "1d4-2" не лечит цель) или фиксированное значение"""
+    return fixed_damage if dice is None else max(0, dice.roll(rng))
+
+
+def apply_spell(spell: Spell, target, power: int) -> None:
+    """Эффект заклинания заданной силы"""
+    quiet = _QUIET_EFFECTS.get(spell.effect)
+    if quiet is None or not _plain(target):
+        spell.effect(target, power)
+    else:
+        quiet(target, power)
+
+
+def cast_spell(spell: Spell, caster: Creature, target, rng: random.Random | None = None) -> int:
+    """
+    Каст: списать ману, бросить силу, применить эффект, начислить опыт игроку.
+
+    Returns:
+        int: Выпавшая сила заклинания
+
+    Raises:
+        ValueError: Не хватает маны
+    """
+    if spell.mana_cost > caster.current_mana:
+        raise ValueError(f'Текущий остаток маны:{caster.current_mana}, стоимость спелла:{spell.mana_cost}')
+    caster.current_mana -= spell.mana_cost
+    power = spell.roll_power(rng)
+    apply_spell(spell, target, power)
+    if isinstance(caster, Character):
+        caster.experience += EXPERIENCE_PER_CAST
+    return power
@@ -0,0 +1,243 @@
+"""
+Поисковая стратегия: expectimax по состояниям (HP, мана, остаток раундов) дуэли.
+
+Модель хода — те же правила, что у BatchSimulator: базовая атака, списание маны,
+DAMAGE бьёт противника, HEAL лечит себя, MANA меняет ману противника, зажим в [MIN, max].
+Ход противника — узел случая (равновероятно по его действиям) или минимум (minimax).
+Позиции мемоизируются в таблице транспозиций, глубина растёт итеративно, пока не
+кончится бюджет времени: в ответ идёт лучший ход последней полностью просчитанной глубины.
+
+Не моделируются событие DM, длительные эффекты и заклинания со своими обработчиками
+(domain/entities/effects.py) — такие спеллы стратегия не выбирает. Броски костей
+(Spell с выражением) просчитываются по среднему — Spell.power.
+"""
+import time
+
+from config.settings import settings
+from domain.battle.policies import (
+    ActionPolicy,
+    FirstDamageSpellPolicy,
+    basic_attack_action,
+    cast_spell_action,
+)
+from domain.entities.effects import DEFAULT_EFFECTS
+from domain.entities.spell import Spell
+from domain.enums.spell_type import SpellType
+
+BASIC_ATTACK = -1
+WIN = 1.0
+TEMPO = 1e-3
+MAX_DEPTH = 64
+_CHECK_EVERY = 256  # узлов между проверками часов
+
+
+class _OutOfTime(Exception):
+    pass
+
+
+class SearchPolicy(ActionPolicy):
+    """Expectimax/minimax с таблицей транспозиций и итеративным углублением под бюджет времени"""
+
+    def __init__(
+            self,
+            budget_ms: float = 20.0,
+            opponent: str = "expectimax",
+            own_types: set[SpellType] | None = None,
+            max_depth: int = MAX_DEPTH,
+            table_size: int = 200_000,
+    ):
+        """
+        :param budget_ms: Время на выбор хода
+        :param opponent: "expectimax" (противник ходит равновероятно) или "minimax" (худший случай)
+        :param own_types: Какие типы спеллов кастер может применять в просчёте; None — любые
+            (врагу Battle в любом случае доступны только DAMAGE)
+        :param max_depth: Потолок глубины в полуходах
+        :param table_size: Сколько позиций держать в таблице (переполнилась — очищается)
+        """
+        if opponent not in ("expectimax", "minimax"):
+            raise ValueError(f'Неизвестная модель противника: {opponent}')
+        self.budget_ms = budget_ms
+        self.opponent = opponent
+        self.own_types = own_types
+        self.max_depth = max_depth
+        self.table_size = table_size
+        self._fallback = FirstDamageSpellPolicy()
+        self._model = None
+        self._table: dict[tuple, tuple[int, float, int]] = {}
+
+        self.decisions = 0
+        self.nodes = 0
+        self.table_lookups = 0
+        self.table_hits = 0
+        self.search_time_s = 0.0
+        self.depth_total = 0
+        self.last_depth = 0
+
+    # ---------- модель ----------
+
+    def _prepare(self, battle, caster) -> bool:
+        """Числа для просчёта из текущего боя; False — бой не дуэль, искать не по чему"""
+        player, enemy = getattr(battle, "player", None), getattr(battle, "enemy", None)
+        if player is None or enemy is None or caster not in (player, enemy):
+            return False
+        opponent = enemy if caster is player else player
+        spells = [s for s in battle.grimoire.spell_list if s.effect is DEFAULT_EFFECTS.get(s.spell_type)]
+        # Врагу Battle доступны только DAMAGE-спеллы (как и в compile_policy из simulation/batch.py) —
+        # и когда он кастер, и когда его ход моделируется как ход противника
+        def castable(side) -> list[int]:
+            return [i for i, s in enumerate(spells) if side is not enemy or s.spell_type == SpellType.DAMAGE]
+
+        self._spells: list[Spell] = spells
+        self._own_indices = [
+            i for i in castable(caster) if self.own_types is None or spells[i].spell_type in self.own_types
+        ]
+        self._opponent_indices = castable(opponent)
+        self._max = ((caster.max_hp, caster.max_mana), (opponent.max_hp, opponent.max_mana))
+        self._basic = battle.basic_attack_damage
+        self._start = (caster.current_hp, caster.current_mana, opponent.current_hp, opponent.current_mana)
+        if battle.max_rounds is None:
+            self._rounds_left = None
+        else:
+            # полуходов до конца лимита, включая текущий: игрок ходит первым в раунде
+            rounds = battle.max_rounds - battle.round_number
+            self._rounds_left = 2 * rounds + (2 if caster is player else 1)
+        # Таблица привязана к параметрам модели — при их смене сбрасывается
+        model = (
+            tuple(id(s) for s in spells), self._max, self._basic,
+            tuple(self._own_indices), tuple(self._opponent_indices),
+        )
+        if self._model != model:
+            self._model = model
+            self._table = {}
+        return True
+
+    def _actions(self, mana: int, own: bool) -> list[int]:
+        indices = self._own_indices if own else self._opponent_indices
+        return [BASIC_ATTACK] + [i for i in indices if self._spells[i].mana_cost <= mana]
+
+    def _apply(self, state: tuple, action: int, own: bool) -> tuple:
+        """state = (hp, mana кастера, hp, mana противника) — всегда с точки зрения кастера"""
+        hp, mana, opp_hp, opp_mana = state
+        (max_hp, max_mana), (opp_max_hp, opp_max_mana) = self._max if own else self._max[::-1]
+        if not own:
+            hp, mana, opp_hp, opp_mana = opp_hp, opp_mana, hp, mana
+
+        if action == BASIC_ATTACK:
+            opp_hp = max(settings.MIN_HP, opp_hp - self._basic)
+        else:
+            spell = self._spells[action]
+            mana = max(settings.MIN_MANA, mana - spell.mana_cost)
+            if spell.spell_type == SpellType.DAMAGE:
+                opp_hp = max(settings.MIN_HP, min(opp_hp - spell.power, opp_max_hp))
+            elif spell.spell_type == SpellType.HEAL:
+                hp = max(settings.MIN_HP, min(hp + spell.power, max_hp))
+            elif spell.spell_type == SpellType.MANA:
+                opp_mana = max(settings.MIN_MANA, min(opp_mana + spell.power, opp_max_mana))
+
+        if not own:
+            hp, mana, opp_hp, opp_mana = opp_hp, opp_mana, hp, mana
+        return hp, mana, opp_hp, opp_mana
+
+    def _evaluate(self, state: tuple) -> float:
+        """Оценка нетерминальной позиции для кастера в (-1, 1)"""
+        hp, mana, opp_hp, opp_mana = state
+        (max_hp, max_mana), (opp_max_hp, opp_max_mana) = self._max
+        health = hp / max_hp - opp_hp / opp_max_hp
+        resources = (mana / max_mana if max_mana else 0.0) - (opp_mana / opp_max_mana if opp_max_mana else 0.0)
+        return 0.8 * (0.9 * health + 0.1 * resources)
+
+    # ---------- поиск ----------
+
+    def _search(self, state: tuple, own: bool, depth: int, plies_left: int | None) -> tuple[float, int]:
+        """(ценность для кастера, лучший ход) — ход имеет смысл только при own"""
+        self.nodes += 1
+        if self.nodes % _CHECK_EVERY == 0 and time.perf_counter() > self._deadline:
+            raise _OutOfTime
+
+        hp, _, opp_hp, _ = state
+        # исход ближе к корню (больше depth в запасе) весомее: победа — быстрее, поражение — позже
+        if opp_hp <= settings.MIN_HP:
+            return WIN + TEMPO * depth, BASIC_ATTACK
+        if hp <= settings.MIN_HP:
+            return -WIN - TEMPO * depth, BASIC_ATTACK
+        if plies_left == 0:
+            return 0.0, BASIC_ATTACK  # ничья по лимиту раундов
+        if depth == 0:
+            return self._evaluate(state), BASIC_ATTACK
+
+        key = (state, own, plies_left)
+        self.table_lookups += 1
+        cached = self._table.get(key)
+        if cached is not None and cached[0] >= depth:
+            self.table_hits += 1
+            return cached[1], cached[2]
+
+        mana = state[1] if own else state[3]
+        next_plies = None if plies_left is None else plies_left - 1
+        # лучший ход прошлой итерации — первым (порядок важен только для стабильности выбора)
+        actions = self._actions(mana, own)
+        if cached is not None and cached[2] in actions:
+            actions.remove(cached[2])
+            actions.insert(0, cached[2])
+
+        values = [(self._search(self._apply(state, action, own), not own, depth - 1, next_plies)[0], action)
+                  for action in actions]
+        if own:
+            value, best = max(values, key=lambda pair: pair[0])
+        elif self.opponent == "minimax":
+            value, best = min(values, key=lambda pair: pair[0])
+        else:
+            value, best = sum(v for v, _ in values) / len(values), BASIC_ATTACK
+
+        if len(self._table) >= self.table_size:
+            self._table.clear()
+        self._table[key] = (depth, value, best)
+        return value, best
+
+    def _search_root(self, actions: list[int], depth: int) -> int:
+        """Корень — только действия, которые бой реально разрешает кастеру сейчас"""
+        next_plies = None if self._rounds_left is None else self._rounds_left - 1
+        values = [
+            (self._search(self._apply(self._start, action, True), False, depth - 1, next_plies)[0], action)
+            for action in actions
+        ]
+        return max(values, key=lambda pair: pair[0])[1]
+
+    def choose_action(self, battle, caster, available_spells: list[Spell]) -> dict:
+        if not self._prepare(battle, caster):
+            return self._fallback.choose_action(battle, caster, available_spells)
+
+        started = time.perf_counter()
+        self._deadline = started + self.budget_ms / 1000
+        allowed = {s.name for s in available_spells}
+        actions = [BASIC_ATTACK] + [i for i, s in enumerate(self._spells) if s.name in allowed]
+        best = BASIC_ATTACK
+        self.last_depth = 0
+        try:
+            for depth in range(1, self.max_depth + 1):
+                best = self._search_root(actions, depth)
+                self.last_depth = depth
+                # прошлый лучший ход — первым: при равных оценках выбор стабилен
+                actions.remove(best)
+                actions.insert(0, best)
+        except _OutOfTime:
+            pass
+        elapsed = time.perf_counter() - started
+
+        self.decisions += 1
+        self.search_time_s += elapsed
+        self.depth_total += self.last_depth
+        if best == BASIC_ATTACK:
+            return basic_attack_action()
+        return cast_spell_action(self._spells[best].name)
+
+    def stats(self) -> dict:
+        return {
+            "decisions": self.decisions,
+            "nodes": self.nodes,
+            "nodes_per_second": self.nodes / self.search_time_s if self.search_time_s else 0.0,
+            "table_hit_rate": self.table_hits / self.table_lookups if self.table_lookups else 0.0,
+            "table_size": len(getattr(self, "_table", {})),
+            "mean_depth": self.depth_total / self.decisions if self.decisions else 0.0,
+            "mean_ms": 1000 * self.search_time_s / self.decisions if self.decisions else 0.0,
+        }
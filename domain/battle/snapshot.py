@@ -0,0 +1,210 @@
+"""
+Снимки боя: компактное бинарное состояние Battle, из которого бой продолжается бит в бит.
+
+В снимке — номер раунда, обе стороны (HP, мана, уровень, опыт, эффекты и их таймеры; остаток
+щита — сила его эффекта), набор спеллов гримуара по именам и, если бой бросает кости,
+состояние генератора бросков.
+Формат — struct с версией в начале: старый снимок новой версией кода не прочитается
+молча неправильно, а даст SnapshotError.
+
+Не входят в снимок: стратегии (их состояние — например, генератор RandomPolicy — у них),
+DM и его память, журнал, вывод. Сами TurnResult тоже: хранится только их число, и
+восстановление в тот же бой обрезает историю ходов до момента снимка.
+
+Для ветвления в памяти снимок не нужен — Battle.fork() копирует бой без сериализации.
+"""
+import random
+import struct
+
+from domain.battle.status_effects import StatusEffect, StatusKind
+
+MAGIC = b"DNDS"
+FORMAT_VERSION = 2  # 2: запас щитов не отдельным полем, а остатком в каждом щите
+
+_WITH_RNG = 1
+
+_FRAME = struct.Struct("<4sHB")  # magic, версия, флаги
+_STATE = struct.Struct("<iiII")  # раунд, раунд эффектов, последний id эффекта, число ходов
+_CREATURE = struct.Struct("<5hiH")  # max_hp, max_mana, hp, mana, уровень, опыт (-1 — нет), число эффектов
+_EFFECT = struct.Struct("<IBiii")  # id, вид, сила, раунд истечения, ходов оглушения
+_TIMERS = struct.Struct("<I")
+_TIMER = struct.Struct("<iBI")  # раунд, действие, id эффекта
+_STRING = struct.Struct("<H")
+_RNG = struct.Struct("<625IBd")  # состояние Mersenne Twister (версия 3), есть ли gauss_next, gauss_next
+
+_KINDS = list(StatusKind)
+_ACTIONS = ("tick", "expire")
+_SEPARATOR = "\0"
+
+
+class SnapshotError(ValueError):
+    """Снимок повреждён, другой версии или не подходит к этому бою"""
+
+
+def _pack_str(text: str) -> bytes:
+    data = text.encode()
+    return _STRING.pack(len(data)) + data
+
+
+def _read_str(view: memoryview, offset: int) -> tuple[str, int]:
+    (size,), offset = _STRING.unpack_from(view, offset), offset + _STRING.size
+    return bytes(view[offset:offset + size]).decode(), offset + size
+
+
+def rolls_dice(battle) -> bool:
+    """Тратит ли бой генератор бросков (иначе его состояние не влияет на исход)"""
+    return battle.basic_attack_dice is not None or any(s.dice is not None for s in battle.grimoire.spell_list)
+
+
+def _pack_creature(parts: list, creature) -> None:
+    statuses = creature.statuses
+    effects = list(statuses.effects.values()) if statuses is not None else []
+    parts.append(_CREATURE.pack(
+        creature.max_hp, creature.max_mana, creature.current_hp, creature.current_mana, creature.level,
+        getattr(creature, "experience", -1), len(effects),
+    ))
+    for effect in effects:
+        parts.append(_EFFECT.pack(
+            effect.id, _KINDS.index(effect.kind), effect.power, effect.expires_round, effect.turns_left
+        ))
+        parts.append(_pack_str(effect.source))
+
+
+def snapshot_battle(battle, include_rng: bool | None = None) -> bytes:
+    """
+    Снять состояние боя.
+
+    Args:
+        battle: Battle
+        include_rng: Сохранить генератор бросков (~2.5 КБ); None — только если бой бросает кости
+
+    Returns:
+        Байты снимка для restore_battle
+    """
+    if include_rng is None:
+        include_rng = rolls_dice(battle)
+    statuses = battle.statuses
+    parts = [
+        _FRAME.pack(MAGIC, FORMAT_VERSION, _WITH_RNG if include_rng else 0),
+        _STATE.pack(battle.round_number, statuses.round, statuses.last_id, len(battle.turns)),
+        # имена спеллов одной строкой: при восстановлении в тот же гримуар сравниваются целиком
+        _pack_str(_SEPARATOR.join(spell.name for spell in battle.grimoire.spell_list)),
+    ]
+    _pack_creature(parts, battle.player)
+    _pack_creature(parts, battle.enemy)
+
+    timers = statuses.timers()
+    parts.append(_TIMERS.pack(len(timers)))
+    for timer_round, action, effect in timers:
+        parts.append(_TIMER.pack(timer_round, _ACTIONS.index(action), effect.id))
+
+    if include_rng:
+        _, internal, gauss = battle.rng.getstate()
+        parts.append(_RNG.pack(*internal, gauss is not None, gauss or 0.0))
+    return b"".join(parts)
+
+
+def _unpack_creature(view: memoryview, offset: int, creature, effects: dict) -> tuple[tuple, list, int]:
+    """Прочитать сторону, ничего не меняя: (статы, эффекты, смещение)"""
+    stats = _CREATURE.unpack_from(view, offset)
+    offset += _CREATURE.size
+    own = []
+    for _ in range(stats[-1]):
+        effect_id, kind, power, expires_round, turns_left = _EFFECT.unpack_from(view, offset)
+        source, offset = _read_str(view, offset + _EFFECT.size)
+        effect = StatusEffect(effect_id, _KINDS[kind], creature, power, expires_round, source, turns_left)
+        effects[effect_id] = effect
+        own.append(effect)
+    return stats, own, offset
+
+
+def _apply_creature(creature, book, stats: tuple, effects: list[StatusEffect]) -> None:
+    max_hp, max_mana, hp, mana, level, experience, _ = stats
+    creature.max_hp, creature.max_mana = max_hp, max_mana
+    creature.current_hp, creature.current_mana = hp, mana
+    creature.level = level
+    if experience >= 0 and hasattr(creature, "experience"):
+        creature.experience = experience
+    book.attach(creature)
+    for effect in effects:
+        creature.statuses.effects[effect.id] = effect
+
+
+def _grimoire_for(battle, joined: str):
+    """Гримуар снимка из спеллов текущего (None — набор и так совпадает)"""
+    grimoire = battle.grimoire
+    if _SEPARATOR.join(spell.name for spell in grimoire.spell_list) == joined:
+        return None
+    names = joined.split(_SEPARATOR) if joined else []
+    missing = [name for name in names if name not in grimoire]
+    if missing:
+        raise SnapshotError(f'В гримуаре боя нет спеллов снимка: {missing}')
+    restored = grimoire.fork()
+    for spell in grimoire.spell_list:
+        restored.remove_spell(spell.name)
+    for name in names:
+        restored.add_spell(grimoire.get_spell_by_name(name))
+    return restored
+
+
+def restore_battle(battle, data: bytes) -> None:
+    """
+    Вернуть бой в состояние снимка (на месте: те же существа, стратегии и вывод).
+
+    Снимок подходит бою с теми же спеллами; спеллы, добавленные после снимка, убираются.
+    Снимок сначала читается целиком — испорченный не меняет бой вовсе.
+
+    Raises:
+        SnapshotError: Чужой формат, другая версия, обрезанные данные или нет нужных спеллов
+    """
+    view = memoryview(data)
+    try:
+        magic, version, flags = _FRAME.unpack_from(view, 0)
+        if magic != MAGIC:
+            raise SnapshotError('Это не снимок боя')
+        if version != FORMAT_VERSION:
+            raise SnapshotError(f'Версия снимка {version} не поддерживается (ожидается {FORMAT_VERSION})')
+        round_number, status_round, last_id, n_turns = _STATE.unpack_from(view, _FRAME.size)
+        names, offset = _read_str(view, _FRAME.size + _STATE.size)
+
+        effects: dict[int, StatusEffect] = {}
+        player_stats, player_effects, offset = _unpack_creature(view, offset, battle.player, effects)
+        enemy_stats, enemy_effects, offset = _unpack_creature(view, offset, battle.enemy, effects)
+
+        (n_timers,), offset = _TIMERS.unpack_from(view, offset), offset + _TIMERS.size
+        timers = []
+        for _ in range(n_timers):
+            timer_round, action, effect_id = _TIMER.unpack_from(view, offset)
+            offset += _TIMER.size
+            timers.append((timer_round, _ACTIONS[action], effects[effect_id]))
+
+        rng_state = None
+        if flags & _WITH_RNG:
+            *internal, has_gauss, gauss = _RNG.unpack_from(view, offset)
+            offset += _RNG.size
+            rng_state = (3, tuple(internal), gauss if has_gauss else None)
+    except (struct.error, UnicodeDecodeError, IndexError, KeyError) as exc:
+        raise SnapshotError(f'Снимок повреждён: {exc}') from exc
+    if offset != len(data):
+        raise SnapshotError(f'Лишние байты в конце снимка: {len(data) - offset}')
+    grimoire = _grimoire_for(battle, names)
+
+    if grimoire is not None:
+        if getattr(battle.enemy, "grimoire", None) is battle.grimoire:
+            battle.enemy.grimoire = grimoire
+        battle.grimoire = grimoire
+    book = battle.statuses
+    _apply_creature(battle.player, book, player_stats, player_effects)
+    _apply_creature(battle.enemy, book, enemy_stats, enemy_effects)
+    book.load(status_round, last_id, timers)
+    if rng_state is not None:
+        battle.rng.setstate(rng_state)
+    battle.round_number = round_number
+    del battle.turns[n_turns:]
+
+
+def copy_rng(rng: random.Random) -> random.Random:
+    """Независимая копия генератора в том же состоянии"""
+    clone = random.Random.__new__(random.Random)
+    clone.setstate(rng.getstate())
+    return clone
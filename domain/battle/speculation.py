@@ -0,0 +1,118 @@
+"""
+Спекулятивный выбор действия врага.
+
+Ход игрока сделан, DM описывает его (react) — а ответ врага в это время уже выбирается
+в фоне, под состояние сразу после хода игрока. К ходу врага событие реакции могло
+чуть сдвинуть HP/ману, поэтому готовый ответ берётся, если реальное состояние попало
+в те же полосы; иначе он отменяется — и ход врага ждёт LLM как обычно.
+
+Цена промаха: отменённый запрос, который уже летит, обрывается (клиент читает его стримом
+и закрывает соединение), но входные токены промпта и всё, что провайдер успел сгенерировать
+до обрыва, уже оплачены. До первого токена обрыв не срабатывает — такой запрос дожидается
+начала ответа. Так что каждая спекуляция — это почти целый промпт, даже если не пригодилась.
+"""
+import json
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from loguru import logger
+
+
+def _band(current: int, maximum: int, bands: int) -> int:
+    if maximum <= 0:
+        return 0
+    return min(bands - 1, current * bands // maximum)
+
+
+def _state_key(battle_state: dict, allowed_actions: dict, bands: int) -> str:
+    """
+    Ключ совпадения. Точные HP/ману до хода врага не угадать: броски, щиты и событие
+    реакции DM на ход игрока. Поэтому, как в кэше DM (services/dm_cache.py), они режутся
+    на полосы, а от эффектов остаются только виды. Доступные врагу действия — точно:
+    иначе готовый ответ мог бы выбрать то, что врагу уже нельзя.
+    """
+    sides = []
+    for side in ("player", "enemy"):
+        state = battle_state[side]
+        sides.append([
+            state["name"],
+            _band(state["current_hp"], state["max_hp"], bands),
+            _band(state["current_mana"], state["max_mana"], bands),
+            sorted({status["kind"] for status in state.get("statuses", ())}),
+        ])
+    return json.dumps([battle_state.get("round"), sides, allowed_actions], sort_keys=True, ensure_ascii=False)
+
+
+class EnemyActionSpeculator:
+    """Фоновые запросы выбора хода врага под предсказанные состояния боя"""
+
+    def __init__(self, request, max_speculations: int = 4, bands: int = 5):
+        """
+        :param request: Запрос к DM (battle_state, allowed_actions, cancel=threading.Event) -> dict | None:
+            choose_enemy_action или совмещённый play_enemy_turn
+        :param max_speculations: Сколько состояний просчитывать одновременно
+        :param bands: На сколько полос резать доли HP/маны в ключе совпадения (5 → шаг 20%)
+        """
+        self.request = request
+        self.max_speculations = max_speculations
+        self.bands = bands
+        self._executor = ThreadPoolExecutor(max_workers=max_speculations, thread_name_prefix="dm-speculation")
+        self._pending: dict[str, tuple[Future, threading.Event]] = {}
+        self.launched = 0
+        self.hits = 0
+        self.misses = 0
+
+    def start(self, candidates: list[tuple[dict, dict]]) -> None:
+        """
+        Запускает запросы для кандидатов (battle_state, allowed_actions).
+        Кандидаты идут в порядке вероятности; лишние сверх max_speculations отбрасываются.
+        Кандидаты из одних и тех же полос считаются одним запросом.
+        """
+        self.discard()
+        for battle_state, allowed_actions in candidates:
+            if len(self._pending) >= self.max_speculations:
+                break
+            key = _state_key(battle_state, allowed_actions, self.bands)
+            if key in self._pending:
+                continue
+            cancel = threading.Event()
+            future = self._executor.submit(self.request, battle_state, allowed_actions, cancel=cancel)
+            self._pending[key] = (future, cancel)
+            self.launched += 1
+
+    def take(self, battle_state: dict, allowed_actions: dict) -> Future | None:
+        """
+        Забирает запрос, совпавший с реальным состоянием; остальные отменяются.
+
+        Returns:
+            Future с ответом DM или None (промах — нужен обычный запрос)
+        """
+        taken = self._pending.pop(_state_key(battle_state, allowed_actions, self.bands), None)
+        self.discard()
+        if taken is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return taken[0]
+
+    @property
+    def hit_rate(self) -> float:
+        """Доля ходов врага, для которых готовый ответ пригодился"""
+        taken = self.hits + self.misses
+        return self.hits / taken if taken else 0.0
+
+    def discard(self) -> None:
+        """Отменяет остальные запросы: не начатые не уйдут вовсе, летящие оборвутся (см. цену в модуле)"""
+        for future, cancel in self._pending.values():
+            cancel.set()
+            future.cancel()
+        self._pending.clear()
+
+    def close(self) -> None:
+        self.discard()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        if self.launched:
+            logger.debug(
+                f"Спекуляция DM: запущено {self.launched}, попаданий {self.hits}, промахов {self.misses} "
+                f"({self.hit_rate:.0%})"
+            )
@@ -0,0 +1,259 @@
+"""
+Длительные эффекты: урон во времени, регенерация, щиты и оглушение.
+
+Эффекты хранятся в колесе таймеров (timer_wheel.py) по номеру раунда, поэтому на границе
+раунда обрабатывается только то, что наступило именно сейчас, — без обхода всех эффектов
+всех существ. Продолжительность считается в раундах после текущего:
+
+- DOT / REGEN с силой p и длительностью d: в начале каждого из следующих d раундов
+  цель получает take_damage(p) / take_hp(p), после последнего тика эффект снимается;
+- SHIELD: поглощает до p урона до начала раунда r + d + 1; урон первым принимает щит,
+  который истечёт раньше. Сила щита — его остаток: истекая, он уносит только то, что
+  от него осталось, а DM видит в описании остаток, а не исходный запас;
+- STUN: цель пропускает следующие d своих ходов (считается по ходам, а не по раундам,
+  чтобы не зависеть от того, кто ходит в раунде первым).
+"""
+from dataclasses import dataclass
+from enum import Enum
+
+from loguru import logger
+
+from domain.battle.timer_wheel import TimerWheel
+from domain.entities.creature import Creature
+
+_TICK = "tick"
+_EXPIRE = "expire"
+
+
+class StatusKind(Enum):
+    """Виды длительных эффектов"""
+    DOT = 'dot'
+    REGEN = 'regen'
+    SHIELD = 'shield'
+    STUN = 'stun'
+
+
+@dataclass(eq=False)
+class StatusEffect:
+    """Один наложенный эффект"""
+    id: int
+    kind: StatusKind
+    target: Creature
+    power: int  # у SHIELD — остаток щита
+    expires_round: int  # для STUN не используется — там счётчик ходов
+    source: str = ""
+    turns_left: int = 0  # только для STUN
+
+    def describe(self, current_round: int) -> dict:
+        """Краткое описание для состояния боя (уходит в DM)"""
+        if self.kind == StatusKind.STUN:
+            return {"kind": self.kind.value, "turns_left": self.turns_left}
+        return {"kind": self.kind.value, "power": self.power, "rounds_left": self.expires_round - current_round}
+
+
+class ActiveStatuses:
+    """Эффекты на одном существе: щиты, оглушение и список активных эффектов"""
+
+    __slots__ = ("book", "effects")
+
+    def __init__(self, book: 'StatusEffects'):
+        self.book = book
+        self.effects: dict[int, StatusEffect] = {}
+
+    @property
+    def stunned(self) -> bool:
+        return any(effect.kind == StatusKind.STUN for effect in self.effects.values())
+
+    @property
+    def shield(self) -> int:
+        """Общий запас щитов: сумма остатков"""
+        return sum(effect.power for effect in self.effects.values() if effect.kind == StatusKind.SHIELD)
+
+    def absorb(self, damage: int) -> int:
+        """Щиты принимают урон на себя, раньше истекающий — первым; возвращает, сколько прошло дальше"""
+        if damage <= 0 or not self.effects:
+            return damage
+        shields = sorted(
+            (effect for effect in self.effects.values() if effect.kind == StatusKind.SHIELD),
+            key=lambda effect: (effect.expires_round, effect.id),
+        )
+        for shield in shields:
+            absorbed = min(shield.power, damage)
+            shield.power -= absorbed
+            damage -= absorbed
+            if shield.power <= 0:
+                self.book._remove(shield)  # пробитый щит снимается, его таймер истечения ничего не сделает
+            if damage == 0:
+                break
+        return damage
+
+
+class StatusEffects:
+    """Длительные эффекты всех существ боя"""
+
+    def __init__(self, wheel_slots: int = 64):
+        """
+        :param wheel_slots: Корзин на уровне колеса таймеров
+        """
+        self.round = 0
+        self.last_id = 0
+        self._wheel = TimerWheel(slots=wheel_slots)
+
+    def attach(self, creature: Creature) -> None:
+        """Подключить существо к подсистеме (иначе на него нельзя наложить эффект)"""
+        creature.statuses = ActiveStatuses(self)
+
+    def apply(self, target: Creature, kind: StatusKind, power: int, duration: int, source: str = "") -> StatusEffect:
+        """
+        Наложить эффект.
+
+        Args:
+            target: Существо, подключённое через attach
+            kind: Вид эффекта
+            power: Урон/лечение за тик или запас щита (для STUN не используется)
+            duration: Раундов (для STUN — пропускаемых ходов)
+            source: Откуда эффект (имя заклинания) — для логов и DM
+        """
+        if target.statuses is None:
+            raise ValueError(f'{target.name} не участвует в бою с длительными эффектами')
+        if duration < 1:
+            raise ValueError('Длительность эффекта должна быть положительной')
+
+        self.last_id += 1
+        effect = StatusEffect(self.last_id, kind, target, power, self.round + duration, source)
+        target.statuses.effects[effect.id] = effect
+        if kind in (StatusKind.DOT, StatusKind.REGEN):
+            self._wheel.schedule(self.round + 1, (_TICK, effect))
+        elif kind == StatusKind.SHIELD:
+            self._wheel.schedule(self.round + duration + 1, (_EXPIRE, effect))
+        else:
+            effect.turns_left = duration
+        logger.info(f'{target.name}: наложен эффект {kind.value} ({power}) на {duration}')
+        return effect
+
+    def _remove(self, effect: StatusEffect) -> None:
+        statuses = effect.target.statuses
+        if statuses is None or statuses.effects.pop(effect.id, None) is None:
+            return
+        logger.info(f'{effect.target.name}: эффект {effect.kind.value} закончился')
+
+    def advance(self, round_number: int) -> list[tuple[StatusEffect, int]]:
+        """
+        Граница раунда: тики и истечения, наступившие к round_number.
+
+        Returns:
+            [(эффект, сколько урона/лечения он дал в этот раз)] — для вывода боя
+        """
+        self.round = round_number
+        report = []
+        for action, effect in self._wheel.advance(round_number):
+            if action == _EXPIRE:
+                self._remove(effect)
+                continue
+            if effect.id not in effect.target.statuses.effects:
+                continue  # эффект сняли раньше срока
+            if effect.kind == StatusKind.DOT:
+                effect.target.take_damage(effect.power)
+            else:
+                effect.target.take_hp(effect.power)
+            report.append((effect, effect.power))
+            if round_number < effect.expires_round:
+                self._wheel.schedule(round_number + 1, (_TICK, effect))
+            else:
+                self._remove(effect)
+        return report
+
+    def consume_stun(self, creature: Creature) -> bool:
+        """Ход существа: True — оно оглушено и ход пропускает (оглушение тратит один ход)"""
+        statuses = creature.statuses
+        if statuses is None:
+            return False
+        stun = next((effect for effect in statuses.effects.values() if effect.kind == StatusKind.STUN), None)
+        if stun is None:
+            return False
+        stun.turns_left -= 1
+        if stun.turns_left <= 0:
+            self._remove(stun)
+        return True
+
+    def describe(self, creature: Creature) -> list[dict]:
+        """Активные эффекты существа для состояния боя"""
+        if creature.statuses is None:
+            return []
+        return [effect.describe(self.round) for effect in creature.statuses.effects.values()]
+
+    def pending(self) -> int:
+        """Сколько таймеров ждёт в колесе"""
+        return len(self._wheel)
+
+    def timers(self) -> list[tuple[int, str, StatusEffect]]:
+        """
+        Ждущие таймеры в порядке срабатывания: (раунд, "tick"|"expire", эффект).
+        Таймеры эффектов, снятых раньше срока (пробитый щит), пропускаются — они бы ничего не сделали.
+        """
+        return [
+            (round_number, action, effect) for round_number, (action, effect) in self._wheel.entries()
+            if effect.id in effect.target.statuses.effects
+        ]
+
+    def load(self, round_number: int, last_id: int, timers: list[tuple[int, str, StatusEffect]]) -> None:
+        """
+        Состояние из снимка или ветки: эффекты уже лежат на подключённых существах,
+        таймеры ставятся заново в прежнем порядке срабатывания.
+        """
+        self.round = round_number
+        self.last_id = last_id
+        self._wheel = TimerWheel(slots=self._wheel.slots, start_round=round_number)
+        for timer_round, action, effect in timers:
+            self._wheel.schedule(timer_round, (action, effect))
+
+    def fork(self, pairs: list[tuple[Creature, Creature]]) -> 'StatusEffects':
+        """
+        Копия для ветки боя: pairs — (существо, его копия в ветке). Копии подключаются к
+        новой книге с копиями эффектов; исходные существа и эффекты не меняются.
+        """
+        book = StatusEffects(wheel_slots=self._wheel.slots)
+        clones: dict[int, StatusEffect] = {}
+        for original, clone in pairs:
+            book.attach(clone)
+            if original.statuses is None:
+                continue
+            for effect in original.statuses.effects.values():
+                clones[effect.id] = clone.statuses.effects[effect.id] = StatusEffect(
+                    effect.id, effect.kind, clone, effect.power, effect.expires_round, effect.source, effect.turns_left
+                )
+        # таймеры уже снятых эффектов ничего бы не сделали — в ветку их не переносим
+        timers = [(r, action, clones[e.id]) for r, action, e in self.timers() if e.id in clones]
+        book.load(self.round, self.last_id, timers)
+        return book
+
+
+class ApplyStatus:
+    """
+    Обработчик заклинания (см. domain/entities/effects.py), накладывающий эффект:
+    Spell("Poison", 15, 2, SpellType.DAMAGE, 4, effect=ApplyStatus(StatusKind.DOT, 3))
+    Сила заклинания становится силой эффекта. Цель должна быть подключена к StatusEffects.
+    """
+
+    __slots__ = ("kind", "duration")
+
+    def __init__(self, kind: StatusKind, duration: int):
+        self.kind = kind
+        self.duration = duration
+
+    def __call__(self, target: Creature, power: int) -> None:
+        statuses = target.statuses
+        if statuses is None:
+            raise ValueError(f'{target.name} не участвует в бою с длительными эффектами')
+        statuses.book.apply(target, self.kind, power, self.duration)
+
+    def __eq__(self, other):
+        if not isinstance(other, ApplyStatus):
+            return NotImplemented
+        return (self.kind, self.duration) == (other.kind, other.duration)
+
+    def __hash__(self):
+        return hash((self.kind, self.duration))
+
+    def __repr__(self):
+        return f'ApplyStatus({self.kind}, {self.duration})'
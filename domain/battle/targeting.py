@@ -0,0 +1,63 @@
+"""
+Выбор цели: на кого летит заклинание и кого из команды выбрать.
+
+Правило «лечение — на своих, остальное — на противника» вынесено в target_side, чтобы
+им пользовались и дуэль (Battle), и бои команд (PartyBattle). Внутри команды цель берётся
+из индексов, которые обновляются точечно при изменении HP, а не пересчитываются каждый ход.
+"""
+from enum import Enum
+
+from domain.battle.indexed_heap import IndexedHeap
+from domain.enums.spell_type import SpellType
+
+
+class TargetSide(Enum):
+    ALLY = 'ally'
+    FOE = 'foe'
+
+
+def target_side(spell_type: SpellType | None) -> TargetSide:
+    """На чью сторону действует заклинание (None — базовая атака)"""
+    return TargetSide.ALLY if spell_type == SpellType.HEAL else TargetSide.FOE
+
+
+class TeamIndex:
+    """
+    Индексы живых бойцов одной команды:
+    - weakest: по текущему HP — кого добивать;
+    - wounded: по доле HP, только раненые — кого лечить.
+    Боец — любой hashable объект с полями id и creature.
+    """
+
+    def __init__(self):
+        self.weakest = IndexedHeap()
+        self.wounded = IndexedHeap()
+
+    def __len__(self) -> int:
+        return len(self.weakest)
+
+    def add(self, combatant) -> None:
+        self.refresh(combatant)
+
+    def refresh(self, combatant) -> None:
+        """Пересчитать ключи после изменения HP бойца (O(log n))"""
+        creature = combatant.creature
+        self.weakest.push(combatant, (creature.current_hp, combatant.id))
+        if creature.current_hp < creature.max_hp:
+            self.wounded.push(combatant, (creature.current_hp / creature.max_hp, combatant.id))
+        else:
+            self.wounded.remove(combatant)
+
+    def remove(self, combatant) -> None:
+        self.weakest.remove(combatant)
+        self.wounded.remove(combatant)
+
+    def lowest_hp(self):
+        """Боец с наименьшим HP или None"""
+        top = self.weakest.peek()
+        return top[1] if top else None
+
+    def most_wounded(self):
+        """Боец с наименьшей долей HP среди раненых или None"""
+        top = self.wounded.peek()
+        return top[1] if top else None
@@ -0,0 +1,113 @@
+"""
+Иерархическое колесо таймеров по номеру раунда.
+
+Уровень L — slots корзин по slots**L раундов. Событие кладётся на нижний уровень, чей
+горизонт его покрывает; когда младшее колесо делает оборот, соответствующая корзина
+старшего уровня пересыпается вниз. Всё, что дальше горизонта старшего уровня, ждёт в куче.
+
+advance() стоит O(событий, наступивших в пройденных раундах) плюс амортизированные
+пересыпания — без обхода всех ждущих таймеров. Корзины выделяются при первой постановке:
+пустое колесо (бой без длительных эффектов, ветка боя) почти ничего не стоит.
+"""
+import heapq
+import itertools
+from typing import Any
+
+
+class TimerWheel:
+    """Таймеры «сработать в раунде N»; внутри раунда — в порядке постановки"""
+
+    def __init__(self, slots: int = 64, levels: int = 3, start_round: int = 0):
+        """
+        :param slots: Корзин на уровне
+        :param levels: Сколько уровней (горизонт колёс — slots**levels раундов)
+        :param start_round: Текущий раунд на момент создания
+        """
+        if slots < 2 or levels < 1:
+            raise ValueError('Колесу нужно хотя бы 2 корзины и 1 уровень')
+        self.slots = slots
+        self.levels = levels
+        self.now = start_round
+        # уровень колеса выделяется при первой постановке на него
+        self._wheels: list[list[list[tuple[int, int, Any]]] | None] = [None] * levels
+        self._overflow: list[tuple[int, int, Any]] = []
+        self._seq = itertools.count()
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def schedule(self, round_number: int, item: Any) -> None:
+        """Поставить item на раунд round_number (строго в будущем)"""
+        if round_number <= self.now:
+            raise ValueError(f'Раунд {round_number} уже наступил (сейчас {self.now})')
+        self._place((round_number, next(self._seq), item))
+        self._size += 1
+
+    def entries(self) -> list[tuple[int, Any]]:
+        """Все ждущие события в порядке срабатывания: [(раунд, item)]"""
+        if not self._size:
+            return []
+        pending = list(self._overflow)
+        for wheel in self._wheels:
+            if wheel is not None:
+                pending.extend(entry for bucket in wheel if bucket for entry in bucket)
+        pending.sort(key=lambda entry: (entry[0], entry[1]))
+        return [(round_number, item) for round_number, _, item in pending]
+
+    def _place(self, entry: tuple[int, int, Any]) -> None:
+        round_number = entry[0]
+        for level in range(self.levels):
+            # на уровне level событие лежит, пока старшие «цифры» раунда совпадают с текущими
+            if round_number // self.slots ** (level + 1) == self.now // self.slots ** (level + 1):
+                wheel = self._wheels[level]
+                if wheel is None:
+                    wheel = self._wheels[level] = [[] for _ in range(self.slots)]
+                wheel[(round_number // self.slots ** level) % self.slots].append(entry)
+                return
+        heapq.heappush(self._overflow, entry)
+
+    def _cascade(self) -> None:
+        """
+        Оборот младшего колеса: пересыпать наступившие корзины старших уровней вниз.
+        Сверху вниз — иначе пересыпанное со старшего уровня застрянет в уже пройденной корзине.
+        """
+        aligned = 1
+        while aligned < self.levels and self.now % self.slots ** (aligned + 1) == 0:
+            aligned += 1
+        if aligned == self.levels:
+            horizon = self.slots ** self.levels
+            while self._overflow and self._overflow[0][0] // horizon == self.now // horizon:
+                self._place(heapq.heappop(self._overflow))
+        for level in range(min(aligned, self.levels - 1), 0, -1):
+            if self._wheels[level] is None:
+                continue
+            bucket = self._wheels[level][(self.now // self.slots ** level) % self.slots]
+            entries = bucket[:]
+            bucket.clear()
+            for entry in entries:
+                self._place(entry)
+
+    def advance(self, round_number: int) -> list[Any]:
+        """
+        Довести колесо до раунда round_number.
+
+        Returns:
+            Наступившие события (по раундам, внутри раунда — в порядке постановки)
+        """
+        if not self._size:
+            # пусто — пересыпать нечего, просто сдвигаем время
+            self.now = max(self.now, round_number)
+            return []
+        due: list[Any] = []
+        while self.now < round_number:
+            self.now += 1
+            if self.now % self.slots == 0:
+                self._cascade()
+            bucket = self._wheels[0][self.now % self.slots] if self._wheels[0] is not None else None
+            if bucket:
+                bucket.sort(key=lambda entry: entry[1])
+                due.extend(item for _, _, item in bucket)
+                self._size -= len(bucket)
+                bucket.clear()
+        return due
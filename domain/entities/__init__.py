@@ -1,6 +1,10 @@
 from .creature import Creature
 from .enemy import Enemy
 from .spell import Spell
+from .dice import Dice
 from .grimoire import Grimoire
+from .creature_pool import CreaturePool, CreatureHandle
+from .effects import CompositeEffect, register_effect
 
-__all__ = ["Creature", "Enemy", "Spell", "Grimoire"]
\ No newline at end of file
+__all__ = ["Creature", "Enemy", "Spell", "Dice", "Grimoire", "CreaturePool", "CreatureHandle",
+           "CompositeEffect", "register_effect"]
\ No newline at end of file
@@ -6,6 +6,8 @@ from domain.entities.creature import Creature
 class Character(Creature):
     """Игровой персонаж"""
 
+    __slots__ = ("experience",)
+
     def __init__(self, max_mana: int, max_hp: int, name: str):
         super().__init__(max_mana, max_hp, name)
         self.experience = 0
@@ -5,6 +5,10 @@ from config.settings import settings
 class Creature:
     """Базовый класс для всех игровых существ (персонажи, враги, NPC)"""
 
+    # Без __dict__: экземпляр в разы компактнее и атрибуты читаются быстрее.
+    # Для сотен тысяч существ — CreaturePool (creature_pool.py)
+    __slots__ = ("max_hp", "max_mana", "_current_mana", "_current_hp", "level", "name", "statuses")
+
     def __init__(self, max_mana: int, max_hp: int, name: str):
         self._validate_stats(max_mana, max_hp)
 
@@ -14,11 +18,14 @@ class Creature:
         self._current_hp = max_hp
         self.level: int = 1
         self.name = name
+        # Длительные эффекты (щиты, оглушение и т.д.) — только в бою, см. domain/battle/status_effects.py
+        self.statuses = None
 
     def __repr__(self) -> str:
         output = []
-        for key, value in self.__dict__.items():
-            output.append(f'{key} = {value}')
+        for cls in reversed(type(self).__mro__):
+            for key in cls.__dict__.get('__slots__', ()):
+                output.append(f'{key} = {getattr(self, key)}')
         return str(output)
 
     @staticmethod
@@ -37,8 +44,13 @@ class Creature:
     @current_hp.setter
     # Сеттер: вызывается, когда мы ПИШЕМ (hero.current_hp = ...)
     def current_hp(self, value):
-        # Прием «зажим»/clamping - значение переменной не выйдет за установленные границы (0...max_hp)
-        self._current_hp = max(settings.MIN_HP, min(value, self.max_hp))
+        # Прием «зажим»/clamping - значение переменной не выйдет за установленные границы (0...max_hp).
+        # Сравнениями, а не max(min(...)): сеттер зовётся на каждый удар и каст
+        if value > self.max_hp:
+            value = self.max_hp
+        elif value < settings.MIN_HP:
+            value = settings.MIN_HP
+        self._current_hp = value
 
     @property
     def current_mana(self) -> int:
@@ -46,10 +58,16 @@ class Creature:
 
     @current_mana.setter
     def current_mana(self, value):
-        self._current_mana = max(settings.MIN_MANA, min(value, self.max_mana))
+        if value > self.max_mana:
+            value = self.max_mana
+        elif value < settings.MIN_MANA:
+            value = settings.MIN_MANA
+        self._current_mana = value
 
     def take_damage(self, damage: int):
         """Получить урон"""
+        if self.statuses is not None:
+            damage = self.statuses.absorb(damage)
         self.current_hp -= damage
         logger.info(f'{self.name} получил урон {damage}, осталось hp: {self.current_hp}')
 
@@ -0,0 +1,207 @@
+"""
+Пул существ для симуляций и серверов с сотнями тысяч существ.
+
+HP, мана, их максимумы и уровень лежат в непрерывных NumPy-массивах int32 (по столбцу
+на поле), имена — в одном списке. Отдельного объекта на существо нет: CreatureHandle —
+лёгкая ссылка (пул + индекс) с тем же интерфейсом, что у Creature, и создаётся по запросу.
+Массовые операции (урон/лечение сразу многим) идут векторно по индексам.
+Длительные эффекты (StatusEffects.attach) подключаются и к ручке: они хранятся в пуле
+по индексу, так что щиты работают, сколько бы ручек на существо ни создали.
+
+Замер байт на существо: python -m tools.bench_memory
+"""
+import numpy as np
+from loguru import logger
+
+from config.settings import settings
+from domain.entities.creature import Creature
+
+_COLUMNS = ("max_hp", "max_mana", "hp", "mana", "level")
+
+
+class CreaturePool:
+    """Существа в столбцовых массивах; индекс существа стабилен на всё время жизни пула"""
+
+    def __init__(self, capacity: int = 1024):
+        """
+        :param capacity: Начальная ёмкость (дальше растёт удвоением)
+        """
+        if capacity < 1:
+            raise ValueError('Ёмкость пула должна быть положительной')
+        self._size = 0
+        self.names: list[str] = []
+        self.max_hp = np.zeros(capacity, dtype=np.int32)
+        self.max_mana = np.zeros(capacity, dtype=np.int32)
+        self.hp = np.zeros(capacity, dtype=np.int32)
+        self.mana = np.zeros(capacity, dtype=np.int32)
+        self.level = np.zeros(capacity, dtype=np.int32)
+        # Длительные эффекты есть только у существ в бою — словарь по индексу, а не столбец
+        self.statuses: dict[int, object] = {}
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, index: int) -> 'CreatureHandle':
+        if not 0 <= index < self._size:
+            raise IndexError(f'В пуле нет существа {index}')
+        return CreatureHandle(self, index)
+
+    def __iter__(self):
+        return (CreatureHandle(self, index) for index in range(self._size))
+
+    @property
+    def capacity(self) -> int:
+        return len(self.hp)
+
+    def _grow(self, needed: int) -> None:
+        capacity = self.capacity
+        while capacity < needed:
+            capacity *= 2
+        for column in _COLUMNS:
+            old = getattr(self, column)
+            new = np.zeros(capacity, dtype=np.int32)
+            new[:self._size] = old[:self._size]
+            setattr(self, column, new)
+
+    def add(self, max_mana: int, max_hp: int, name: str) -> 'CreatureHandle':
+        """Добавить существо (те же правила валидации, что у Creature)"""
+        Creature._validate_stats(max_mana, max_hp)
+        if self._size == self.capacity:
+            self._grow(self._size + 1)
+        index = self._size
+        self.max_hp[index] = self.hp[index] = max_hp
+        self.max_mana[index] = self.mana[index] = max_mana
+        self.level[index] = 1
+        self.names.append(name)
+        self._size += 1
+        return CreatureHandle(self, index)
+
+    def add_many(self, count: int, max_mana: int, max_hp: int, name: str) -> range:
+        """
+        Добавить count одинаковых существ одним векторным присваиванием.
+
+        :return: Диапазон индексов новых существ
+        """
+        Creature._validate_stats(max_mana, max_hp)
+        start, end = self._size, self._size + count
+        if end > self.capacity:
+            self._grow(end)
+        self.max_hp[start:end] = self.hp[start:end] = max_hp
+        self.max_mana[start:end] = self.mana[start:end] = max_mana
+        self.level[start:end] = 1
+        self.names.extend([name] * count)
+        self._size = end
+        return range(start, end)
+
+    def damage(self, indices, amount) -> None:
+        """Урон многим сразу (amount — число или массив по индексам), с тем же зажимом; щиты не учитываются"""
+        self.hp[indices] = np.clip(self.hp[indices] - amount, settings.MIN_HP, self.max_hp[indices])
+
+    def heal(self, indices, amount) -> None:
+        self.hp[indices] = np.clip(self.hp[indices] + amount, settings.MIN_HP, self.max_hp[indices])
+
+    def restore_mana(self, indices, amount) -> None:
+        self.mana[indices] = np.clip(self.mana[indices] + amount, settings.MIN_MANA, self.max_mana[indices])
+
+    def alive(self) -> np.ndarray:
+        """Индексы живых существ"""
+        return np.flatnonzero(self.hp[:self._size] > settings.MIN_HP)
+
+    def nbytes(self) -> int:
+        """Байт под числовые столбцы (без имён)"""
+        return sum(getattr(self, column).nbytes for column in _COLUMNS)
+
+
+class CreatureHandle:
+    """Существо пула: интерфейс Creature поверх строки массивов"""
+
+    __slots__ = ("pool", "index")
+
+    def __init__(self, pool: CreaturePool, index: int):
+        self.pool = pool
+        self.index = index
+
+    def __repr__(self) -> str:
+        return f'CreatureHandle: (index={self.index}, name={self.name}, hp={self.current_hp})'
+
+    def __eq__(self, other):
+        if not isinstance(other, CreatureHandle):
+            return NotImplemented
+        return self.pool is other.pool and self.index == other.index
+
+    def __hash__(self):
+        return hash((id(self.pool), self.index))
+
+    @property
+    def name(self) -> str:
+        return self.pool.names[self.index]
+
+    @property
+    def max_hp(self) -> int:
+        return int(self.pool.max_hp[self.index])
+
+    @property
+    def max_mana(self) -> int:
+        return int(self.pool.max_mana[self.index])
+
+    @property
+    def level(self) -> int:
+        return int(self.pool.level[self.index])
+
+    @level.setter
+    def level(self, value: int):
+        self.pool.level[self.index] = value
+
+    @property
+    def statuses(self):
+        """Длительные эффекты (domain/battle/status_effects.py) — лежат в пуле, ручка их не хранит"""
+        return self.pool.statuses.get(self.index)
+
+    @statuses.setter
+    def statuses(self, value):
+        if value is None:
+            self.pool.statuses.pop(self.index, None)
+        else:
+            self.pool.statuses[self.index] = value
+
+    @property
+    def current_hp(self) -> int:
+        return int(self.pool.hp[self.index])
+
+    @current_hp.setter
+    def current_hp(self, value):
+        self.pool.hp[self.index] = max(settings.MIN_HP, min(value, self.max_hp))
+
+    @property
+    def current_mana(self) -> int:
+        return int(self.pool.mana[self.index])
+
+    @current_mana.setter
+    def current_mana(self, value):
+        self.pool.mana[self.index] = max(settings.MIN_MANA, min(value, self.max_mana))
+
+    def take_damage(self, damage: int):
+        """Получить урон"""
+        statuses = self.statuses
+        if statuses is not None:
+            damage = statuses.absorb(damage)
+        self.current_hp -= damage
+        logger.info(f'{self.name} получил урон {damage}, осталось hp: {self.current_hp}')
+
+    def take_hp(self, amount: int):
+        """Получить лечение"""
+        self.current_hp += amount
+        logger.info(f'{self.name} получил hp {amount}, осталось hp: {self.current_hp}')
+
+    def take_mana(self, amount: int):
+        """Получить ману"""
+        self.current_mana += amount
+        logger.info(f'{self.name} получил ману {amount}, осталось маны: {self.current_mana}')
+
+    def get_status(self) -> str:
+        return (
+            f'Существо: {self.name}, '
+            f'hp: {self.current_hp}, '
+            f'мана: {self.current_mana}, '
+            f'уровень: {self.level}, '
+        )
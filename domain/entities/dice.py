@@ -0,0 +1,244 @@
+"""
+Броски костей: выражения вида "3d6+2", "d20 adv", "2d8 - 1d4 + 3".
+
+Строка разбирается один раз (Dice.parse кэширует результат) в неизменяемое значение:
+слагаемые-кости, константа и режим (adv — бросить всё выражение дважды и взять больший
+результат, dis — меньший). Дальше с ним работают:
+
+- roll(rng) — один бросок для Battle: random.Random боя с зерном (как у RandomPolicy) —
+  бои воспроизводимы, а бросок стоит доли микросекунды, а не вызов NumPy;
+- sample(rng, size) — массив бросков одним вызовом NumPy (np.random.Generator) для симуляций;
+- distribution() — точное распределение свёрткой, кэшируется на выражение.
+"""
+import random
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+
+MAX_DICE = 1000
+MAX_SIDES = 1000
+
+_TERM = re.compile(r'\s*([+-])?\s*(\d*)(?:d(\d+))?\s*')
+_MODES = ("", "adv", "dis")
+
+# Генераторы для бросков вне боя (бой передаёт свой)
+_default_random = random.Random()
+_default_rng = np.random.default_rng()
+
+
+@dataclass(frozen=True, eq=False)
+class Distribution:
+    """Распределение целочисленной величины: pmf[i] = P(X = minimum + i)"""
+    minimum: int
+    pmf: np.ndarray
+
+    @property
+    def maximum(self) -> int:
+        return self.minimum + len(self.pmf) - 1
+
+    @property
+    def values(self) -> np.ndarray:
+        return np.arange(self.minimum, self.maximum + 1)
+
+    @property
+    def mean(self) -> float:
+        return float(self.values @ self.pmf)
+
+    @property
+    def std(self) -> float:
+        return float(np.sqrt(((self.values - self.mean) ** 2) @ self.pmf))
+
+    def probability(self, value: int) -> float:
+        """P(X = value)"""
+        if not self.minimum <= value <= self.maximum:
+            return 0.0
+        return float(self.pmf[value - self.minimum])
+
+    def at_least(self, value: int) -> float:
+        """P(X >= value) — например, шанс снять 30 HP одним ударом"""
+        start = min(max(value - self.minimum, 0), len(self.pmf))
+        return float(self.pmf[start:].sum())
+
+    def at_most(self, value: int) -> float:
+        """P(X <= value)"""
+        return 1.0 - self.at_least(value + 1)
+
+    def percentile(self, q: float) -> int:
+        """Наименьшее значение, которое не превышается с вероятностью q (0..100)"""
+        cdf = np.cumsum(self.pmf)
+        return self.minimum + int(np.searchsorted(cdf, q / 100 - 1e-12))
+
+
+@lru_cache(maxsize=1024)
+def _sum_pmf(count: int, sides: int) -> np.ndarray:
+    """Распределение суммы count кубиков dsides (от count до count*sides) — свёрткой"""
+    die = np.full(sides, 1.0 / sides)
+    result = np.ones(1)
+    power = die
+    # возведение в степень по свёртке: log2(count) свёрток вместо count
+    while count:
+        if count & 1:
+            result = np.convolve(result, power)
+        count >>= 1
+        if count:
+            power = np.convolve(power, power)
+    result.flags.writeable = False
+    return result
+
+
+@dataclass(frozen=True)
+class Dice:
+    """
+    Разобранное выражение бросков.
+
+    terms — пары (число кубиков со знаком, граней): (3, 6) — 3d6, (-1, 4) — вычесть 1d4.
+    """
+    terms: tuple[tuple[int, int], ...]
+    modifier: int = 0
+    mode: str = ""
+
+    def __post_init__(self):
+        if self.mode not in _MODES:
+            raise ValueError(f'Неизвестный режим броска: {self.mode}')
+        for count, sides in self.terms:
+            if count == 0 or abs(count) > MAX_DICE or not 1 <= sides <= MAX_SIDES:
+                raise ValueError(f'Недопустимые кости: {count}d{sides}')
+
+    @classmethod
+    def parse(cls, expression: "str | int | Dice") -> "Dice":
+        """Разобрать выражение (повторный разбор той же строки берётся из кэша)"""
+        if isinstance(expression, Dice):
+            return expression
+        if isinstance(expression, int):
+            return cls((), expression)
+        return _parse(expression)
+
+    def __str__(self):
+        parts = []
+        for count, sides in self.terms:
+            parts.append(f"{'-' if count < 0 else '+'}{abs(count)}d{sides}")
+        if self.modifier or not parts:
+            parts.append(f"{self.modifier:+d}")
+        text = "".join(parts).lstrip("+")
+        return f"{text} {self.mode}" if self.mode else text
+
+    @property
+    def fixed(self) -> bool:
+        """Без костей — результат всегда modifier"""
+        return not self.terms
+
+    @property
+    def minimum(self) -> int:
+        return self.modifier + sum(count if count > 0 else count * sides for count, sides in self.terms)
+
+    @property
+    def maximum(self) -> int:
+        return self.modifier + sum(count * sides if count > 0 else count for count, sides in self.terms)
+
+    @property
+    def mean(self) -> float:
+        if self.mode:
+            return self.distribution().mean
+        return self.modifier + sum(count * (sides + 1) / 2 for count, sides in self.terms)
+
+    @property
+    def clamped_mean(self) -> float:
+        """Среднее max(0, бросок): отрицательный бросок бой считает нулём, а не лечением цели"""
+        if self.minimum >= 0:
+            return self.mean
+        distribution = self.distribution()
+        return float(np.maximum(distribution.values, 0) @ distribution.pmf)
+
+    # ---------- броски ----------
+
+    def _roll_once(self, rng: random.Random) -> int:
+        total = self.modifier
+        randrange = rng.randrange
+        for count, sides in self.terms:
+            # кубик — randrange(sides) + 1; все «+1» сразу в начальном значении
+            rolled = abs(count)
+            for _ in range(rolled):
+                rolled += randrange(sides)
+            total += rolled if count > 0 else -rolled
+        return total
+
+    def roll(self, rng: random.Random | None = None) -> int:
+        """Один бросок"""
+        rng = rng if rng is not None else _default_random
+        if not self.mode:
+            return self._roll_once(rng)
+        first, second = self._roll_once(rng), self._roll_once(rng)
+        return max(first, second) if self.mode == "adv" else min(first, second)
+
+    def _sample_once(self, rng: np.random.Generator, size: int) -> np.ndarray:
+        total = np.full(size, self.modifier, dtype=np.int64)
+        for count, sides in self.terms:
+            rolled = rng.integers(1, sides + 1, size=(size, abs(count))).sum(axis=1)
+            total += rolled if count > 0 else -rolled
+        return total
+
+    def sample(self, rng: np.random.Generator | None, size: int) -> np.ndarray:
+        """size независимых бросков (int64) без цикла по броскам"""
+        rng = rng if rng is not None else _default_rng
+        if not self.mode:
+            return self._sample_once(rng, size)
+        first, second = self._sample_once(rng, size), self._sample_once(rng, size)
+        return np.maximum(first, second) if self.mode == "adv" else np.minimum(first, second)
+
+    # ---------- точное распределение ----------
+
+    def distribution(self) -> Distribution:
+        """Точное распределение результата (считается один раз на выражение)"""
+        return _distribution(self)
+
+
+@lru_cache(maxsize=1024)
+def _distribution(dice: Dice) -> Distribution:
+    minimum, pmf = dice.modifier, np.ones(1)
+    for count, sides in dice.terms:
+        part = _sum_pmf(abs(count), sides)
+        if count > 0:
+            minimum += abs(count)
+        else:
+            part = part[::-1]  # -X: от -count*sides до -count
+            minimum -= abs(count) * sides
+        pmf = np.convolve(pmf, part)
+
+    if dice.mode:
+        # max/min двух независимых бросков через функцию распределения
+        cdf = np.cumsum(pmf)
+        cdf = cdf ** 2 if dice.mode == "adv" else 1 - (1 - cdf) ** 2
+        pmf = np.diff(cdf, prepend=0.0)
+    pmf.flags.writeable = False
+    return Distribution(minimum, pmf)
+
+
+@lru_cache(maxsize=1024)
+def _parse(expression: str) -> Dice:
+    text = expression.strip().lower()
+    mode = ""
+    for candidate in ("adv", "dis"):
+        if text.endswith(candidate):
+            mode, text = candidate, text[: -len(candidate)]
+            break
+    if not text.strip():
+        raise ValueError(f'Пустое выражение бросков: {expression!r}')
+
+    terms: list[tuple[int, int]] = []
+    modifier = 0
+    position = 0
+    while position < len(text):
+        match = _TERM.match(text, position)
+        sign_text, count_text, sides_text = match.groups()
+        if match.end() == position or (position > 0 and not sign_text) or not (count_text or sides_text):
+            raise ValueError(f'Не удалось разобрать выражение бросков: {expression!r}')
+        sign = -1 if sign_text == "-" else 1
+        if sides_text is None:
+            modifier += sign * int(count_text)
+        else:
+            count = int(count_text) if count_text else 1
+            terms.append((sign * count, int(sides_text)))
+        position = match.end()
+    return Dice(tuple(terms), modifier, mode)
@@ -0,0 +1,88 @@
+"""
+Таблица эффектов заклинаний.
+
+Каждый SpellType один раз сопоставлен обработчику effect(target, power). Spell берёт
+обработчик из таблицы при создании, и каст — прямой вызов без строк, hasattr/getattr.
+Новые виды эффектов добавляются здесь (или через register_effect), Creature не трогаем:
+обработчику достаточно публичного интерфейса существа (take_damage/take_hp/take_mana),
+поэтому подходят и Creature, и CreatureHandle.
+"""
+from types import MappingProxyType
+from typing import Callable
+
+from domain.entities.creature import Creature
+from domain.enums.spell_type import SpellType
+
+Effect = Callable[[Creature, int], None]
+
+
+# Обычные функции, а не Creature.take_damage: так учитываются переопределения в наследниках
+def damage(target: Creature, amount: int) -> None:
+    target.take_damage(amount)
+
+
+def heal(target: Creature, amount: int) -> None:
+    target.take_hp(amount)
+
+
+def restore_mana(target: Creature, amount: int) -> None:
+    target.take_mana(amount)
+
+
+def burn_mana(target: Creature, amount: int) -> None:
+    """Сжечь ману цели"""
+    target.take_mana(-amount)
+
+
+class CompositeEffect:
+    """
+    Несколько эффектов за один каст, каждый со своей долей силы заклинания.
+
+    Например, «выпить жизнь и ману»: CompositeEffect((damage, 1.0), (burn_mana, 0.5))
+    """
+
+    __slots__ = ("parts",)
+
+    def __init__(self, *parts: tuple[Effect, float]):
+        """
+        :param parts: Пары (обработчик, множитель силы)
+        """
+        if not parts:
+            raise ValueError('Составной эффект без частей')
+        self.parts = tuple(parts)
+
+    def __call__(self, target: Creature, power: int) -> None:
+        for effect, scale in self.parts:
+            effect(target, round(power * scale))
+
+    def __eq__(self, other):
+        if not isinstance(other, CompositeEffect):
+            return NotImplemented
+        return self.parts == other.parts
+
+    def __hash__(self):
+        return hash(self.parts)
+
+    def __repr__(self):
+        return f'CompositeEffect{self.parts}'
+
+
+EFFECTS: dict[SpellType, Effect] = {
+    SpellType.DAMAGE: damage,
+    SpellType.HEAL: heal,
+    SpellType.MANA: restore_mana,
+}
+# Встроенные обработчики: только их понимает векторный симулятор (simulation/batch.py)
+DEFAULT_EFFECTS = MappingProxyType(dict(EFFECTS))
+
+
+def register_effect(spell_type: SpellType, effect: Effect) -> None:
+    """Назначить обработчик типу (действует на заклинания, созданные после регистрации)"""
+    EFFECTS[spell_type] = effect
+
+
+def effect_for(spell_type: SpellType) -> Effect:
+    effect = EFFECTS.get(spell_type)
+    if effect is None:
+        raise ValueError(f'Для типа {spell_type} не зарегистрирован эффект')
+    return effect
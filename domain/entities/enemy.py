@@ -1,29 +1,37 @@
 from domain.entities.creature import Creature
 from domain.entities.grimoire import Grimoire
+from domain.enums.spell_type import SpellType
 
 
 class Enemy(Creature):
-    def __init__(self, max_mana: int, max_hp: int, name: str, grimoire: Grimoire | None = None):
+    __slots__ = ("grimoire", "policy_table")
+
+    def __init__(self, max_mana: int, max_hp: int, name: str, grimoire: Grimoire | None = None,
+                 policy_table=None):
+        """
+        :param policy_table: Заранее посчитанная стратегия (simulation.optimal_policy.PolicyTable) —
+            если задана, выбор спелла идёт по ней
+        """
         super().__init__(max_mana, max_hp, name)
         self.grimoire = grimoire
+        self.policy_table = policy_table
 
     def choose_spell(self, target: 'Creature') -> str | None:
-        """ИИ враг выбирает спелл для кастования"""
+        """
+        ИИ враг выбирает спелл для кастования.
 
-        # Ищем спелл урона который можем позволить
-        damage_spells = [
-            s for s in self.grimoire.spell_list
-            if s.spell_type.value == 'take_damage' and s.mana_cost <= self.current_mana
-        ]
+        Returns:
+            Имя спелла или None — враг бьёт базовой атакой. С policy_table это выбор таблицы
+            (даже когда мана на спеллы есть), без неё — когда ни на один спелл маны не хватает
+        """
+        if self.policy_table is not None:
+            return self.policy_table.choose(self, target)
 
-        if damage_spells:
-            return damage_spells[0].name  # Берём первый доступный
+        # Ищем спелл урона который можем позволить (берём первый доступный)
+        spell = self.grimoire.first_affordable(self.current_mana, SpellType.DAMAGE)
 
         # Если нет урона, ищем любой спелл
-        available = [s for s in self.grimoire.spell_list
-                     if s.mana_cost <= self.current_mana]
+        if spell is None:
+            spell = self.grimoire.first_affordable(self.current_mana)
 
-        if available:
-            return available[0].name
-
-        return None  # Нет доступных спеллов
+        return spell.name if spell is not None else None  # не на что кастовать — базовая атака
@@ -1,16 +1,103 @@
+import random
+from bisect import bisect_right
+
 from loguru import logger
 
 from .creature import Creature
 from domain.entities.spell import Spell
 from domain.entities.character import Character
+from domain.enums.spell_type import SpellType
+
+
+class _CostIndex:
+    """
+    Спеллы одной выборки (тип или весь гримуар), отсортированные по (мана, порядок добавления).
+
+    Запрос «что по карману при мане M» — bisect по costs: всё левее точки отсечения доступно.
+    first[i] — самый ранний по добавлению спелл среди первых i+1 по цене, чтобы «первый
+    доступный» находился за O(log n); пересобирается лениво после изменений гримуара.
+    ordered[count] — первые count спеллов по цене в порядке добавления: сортировка по seq
+    делается один раз на точку отсечения, дальше «доступные» — bisect и копия ответа.
+    """
+
+    def __init__(self):
+        self.keys: list[tuple[int, int]] = []  # (mana_cost, seq)
+        self.costs: list[int] = []
+        self.spells: list[Spell] = []
+        self._first: list[Spell] | None = None
+        self._ordered: dict[int, list[Spell]] = {}
+
+    def add(self, spell: Spell, seq: int) -> None:
+        key = (spell.mana_cost, seq)
+        position = bisect_right(self.keys, key)
+        self.keys.insert(position, key)
+        self.costs.insert(position, spell.mana_cost)
+        self.spells.insert(position, spell)
+        self._first, self._ordered = None, {}
+
+    def copy(self) -> '_CostIndex':
+        clone = _CostIndex()
+        clone.keys, clone.costs, clone.spells = self.keys[:], self.costs[:], self.spells[:]
+        # кэши только пересоздаются, не чистятся на месте — копии могут их делить
+        clone._first, clone._ordered = self._first, self._ordered
+        return clone
+
+    def remove(self, spell: Spell, seq: int) -> None:
+        position = bisect_right(self.keys, (spell.mana_cost, seq)) - 1
+        del self.keys[position], self.costs[position], self.spells[position]
+        self._first, self._ordered = None, {}
+
+    def affordable(self, mana: int) -> list[Spell]:
+        """Доступные по мане, в порядке добавления"""
+        count = bisect_right(self.costs, mana)
+        if count == 0:
+            return []
+        ordered = self._ordered.get(count)
+        if ordered is None:
+            # ключи уже отсортированы по цене — порядок добавления восстанавливаем по seq
+            order = sorted(range(count), key=lambda i: self.keys[i][1])
+            ordered = self._ordered[count] = [self.spells[i] for i in order]
+        return list(ordered)
+
+    def first_affordable(self, mana: int) -> Spell | None:
+        count = bisect_right(self.costs, mana)
+        if count == 0:
+            return None
+        if self._first is None:
+            self._first, best = [], None
+            for key, spell in zip(self.keys, self.spells):
+                if best is None or key[1] < best[0]:
+                    best = (key[1], spell)
+                self._first.append(best[1])
+        return self._first[count - 1]
 
 
 class Grimoire:
+    """
+    Гримуар с индексами: имя -> спелл (dict), корзины по SpellType и массивы,
+    отсортированные по стоимости маны. Поиск по имени O(1), «доступные по мане» —
+    O(log n) + размер ответа (сортировка по порядку добавления — раз на точку отсечения),
+    «можно ли кастовать» — O(1).
+
+    Все выборки возвращают спеллы в порядке добавления, как раньше проход по spell_list.
+    Спелл нельзя менять после добавления (индексы построены по mana_cost и spell_type).
+
+    fork() — копия при записи: индексы общие, пока одна из копий не добавит или не уберёт спелл.
+    """
+
     def __init__(self, init_spell: list[Spell] | Spell | None = None):
         """
         :param init_spell: Одиночное заклинание, список заклинаний или None
         """
-        self.spell_list = self._normalize_spells(init_spell)
+        self._by_name: dict[str, Spell] = {}
+        self._seq: dict[str, int] = {}
+        self._next_seq = 0
+        self._by_type: dict[SpellType, dict[str, Spell]] = {spell_type: {} for spell_type in SpellType}
+        self._all_by_cost = _CostIndex()
+        self._type_by_cost: dict[SpellType, _CostIndex] = {spell_type: _CostIndex() for spell_type in SpellType}
+        self._shared = False  # индексы делятся с другой копией (fork) — перед записью копируем
+        for spell in self._normalize_spells(init_spell):
+            self.add_spell(spell)
 
     @staticmethod
     def _normalize_spells(input_spells: list[Spell] | Spell | None) -> list[Spell]:
@@ -25,7 +112,7 @@ class Grimoire:
         elif isinstance(input_spells, Spell):
             return [input_spells]
         else:
-            return input_spells
+            return list(input_spells)
 
     def __str__(self):
         return f'Гримуар {self.__class__.__name__}'
@@ -33,8 +120,84 @@ class Grimoire:
     def __repr__(self):
         return f'Grimoire: (spell_list={self.spell_list})'
 
+    def __len__(self) -> int:
+        return len(self._by_name)
+
+    def __contains__(self, spell_name: str) -> bool:
+        return spell_name in self._by_name
+
+    @property
+    def spell_list(self) -> list[Spell]:
+        """Все спеллы в порядке добавления (копия: менять гримуар — через add_spell/remove_spell)"""
+        return list(self._by_name.values())
+
+    def fork(self) -> 'Grimoire':
+        """Копия за O(1): индексы копируются только при первом изменении любой из копий"""
+        clone = Grimoire.__new__(Grimoire)
+        clone.__dict__.update(self.__dict__)
+        clone._shared = self._shared = True
+        return clone
+
+    def _own(self) -> None:
+        """Перед изменением: своя копия индексов (сами спеллы неизменяемы и остаются общими)"""
+        if not self._shared:
+            return
+        self._by_name = dict(self._by_name)
+        self._seq = dict(self._seq)
+        self._by_type = {spell_type: dict(spells) for spell_type, spells in self._by_type.items()}
+        self._all_by_cost = self._all_by_cost.copy()
+        self._type_by_cost = {spell_type: index.copy() for spell_type, index in self._type_by_cost.items()}
+        self._shared = False
+
     def add_spell(self, spell: Spell):
-        self.spell_list.append(spell)
+        if spell.name in self._by_name:
+            raise ValueError(f'Спелл {spell.name} уже есть в гримуаре!')
+        self._own()
+        seq = self._next_seq
+        self._next_seq += 1
+        self._by_name[spell.name] = spell
+        self._seq[spell.name] = seq
+        self._by_type[spell.spell_type][spell.name] = spell
+        self._all_by_cost.add(spell, seq)
+        self._type_by_cost[spell.spell_type].add(spell, seq)
+
+    def remove_spell(self, spell_name: str) -> Spell:
+        """Убрать спелл из гримуара и всех индексов; возвращает удалённый спелл"""
+        if spell_name not in self._by_name:
+            raise ValueError(f'Спелл {spell_name} отсутствует в гримуаре!')
+        self._own()
+        spell = self._by_name.pop(spell_name)
+        seq = self._seq.pop(spell_name)
+        del self._by_type[spell.spell_type][spell_name]
+        self._all_by_cost.remove(spell, seq)
+        self._type_by_cost[spell.spell_type].remove(spell, seq)
+        return spell
+
+    def _cost_index(self, spell_type: SpellType | None) -> _CostIndex:
+        return self._all_by_cost if spell_type is None else self._type_by_cost[spell_type]
+
+    def spells_of_type(self, spell_type: SpellType) -> list[Spell]:
+        """Все спеллы типа в порядке добавления"""
+        return list(self._by_type[spell_type].values())
+
+    def affordable_spells(self, mana: int, spell_type: SpellType | None = None) -> list[Spell]:
+        """
+        Спеллы, которые можно скастовать при данной мане.
+
+        :param mana: Текущая мана кастера
+        :param spell_type: Только этот тип (None — любой)
+        :return: Список в порядке добавления
+        """
+        return self._cost_index(spell_type).affordable(mana)
+
+    def first_affordable(self, mana: int, spell_type: SpellType | None = None) -> Spell | None:
+        """Первый по порядку добавления доступный по мане спелл (None — ничего не хватает)"""
+        return self._cost_index(spell_type).first_affordable(mana)
+
+    def can_cast(self, mana: int, spell_type: SpellType | None = None) -> bool:
+        """Хватает ли маны хотя бы на один спелл"""
+        costs = self._cost_index(spell_type).costs
+        return bool(costs) and costs[0] <= mana
 
     def show_all_spells(self):
         logger.info('Все спеллы гримуара:')
@@ -43,12 +206,10 @@ class Grimoire:
 
     def get_spell_by_name(self, spell_name: str) -> Spell | None:
         """Найти спелл по атрибуту 'имя' """
-        for spell in self.spell_list:
-            if spell.name == spell_name:
-                return spell
-        return None
+        return self._by_name.get(spell_name)
 
-    def cast_spell(self, spell_name: str, character: Character, target: Creature) -> None:
+    def cast_spell(self, spell_name: str, character: Character, target: Creature,
+                   rng: random.Random | None = None) -> None:
         spell = self.get_spell_by_name(spell_name)
         if spell is None:
             raise ValueError(f'Спелл {spell_name} отсутствует в гримуаре!')
@@ -59,7 +220,7 @@ class Grimoire:
             )
             character.current_mana -= spell.mana_cost
             spell.cast()
-            spell.apply_effect(target)
+            spell.apply_effect(target, rng)
             # Опыт может получить только Игрок
             if isinstance(character, Character):
                 character.gain_experience(10)
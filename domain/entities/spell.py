@@ -1,26 +1,75 @@
+import random
+
 from loguru import logger
 
 from domain.entities.creature import Creature
+from domain.entities.dice import Dice
+from domain.entities.effects import Effect, effect_for
 from domain.enums.spell_type import SpellType
 
 
 class Spell:
-    def __init__(self, name: str, mana_cost: int, level: int, spell_type: SpellType, power: int):
+    """
+    Неизменяемое значение: один экземпляр можно делить между любым числом гримуаров
+    и боёв (и его индексы в Grimoire не устареют). Равенство и хэш — по всем полям.
+    """
+
+    __slots__ = ("name", "mana_cost", "level", "spell_type", "power", "dice", "effect")
+
+    def __init__(
+            self,
+            name: str,
+            mana_cost: int,
+            level: int,
+            spell_type: SpellType,
+            power: int | str | Dice,
+            effect: Effect | None = None,
+    ):
         """
         :param name: Название заклинания
         :param mana_cost: Стоимость маны
         :param level: Уровень заклинания (1-10)
         :param spell_type: Тип заклинания (из перечисления SpellType)
-        :param power: Сила эффекта (урон/лечение/бонус)
+        :param power: Сила эффекта (урон/лечение/бонус): число или выражение бросков ("3d6+2", "2d8 adv").
+            Для бросков power — среднее (округлённое) для подсказок и планировщиков, сами броски — в dice;
+            бросок ниже нуля считается нулём (и в среднем тоже)
+        :param effect: Свой обработчик (например, CompositeEffect); по умолчанию — из таблицы
+            эффектов по spell_type. spell_type при этом по-прежнему задаёт цель
         """
         if not 1 <= level <= 10:
             raise ValueError('Уровень заклинания должен быть в диапазоне 0 - 10')
 
-        self.name = name
-        self.mana_cost = mana_cost
-        self.level = level
-        self.spell_type = spell_type
-        self.power = power
+        object.__setattr__(self, 'name', name)
+        object.__setattr__(self, 'mana_cost', mana_cost)
+        object.__setattr__(self, 'level', level)
+        object.__setattr__(self, 'spell_type', spell_type)
+        dice = None if isinstance(power, int) else Dice.parse(power)
+        object.__setattr__(self, 'power', power if dice is None else round(dice.clamped_mean))
+        object.__setattr__(self, 'dice', dice)
+        # обработчик выбирается один раз — каст дальше прямой вызов
+        object.__setattr__(self, 'effect', effect if effect is not None else effect_for(spell_type))
+
+    def __setattr__(self, key, value):
+        raise AttributeError(f'Заклинание {self.name} неизменяемо')
+
+    def __delattr__(self, key):
+        raise AttributeError(f'Заклинание {self.name} неизменяемо')
+
+    def _fields(self) -> tuple:
+        power = self.power if self.dice is None else self.dice
+        return self.name, self.mana_cost, self.level, self.spell_type, power, self.effect
+
+    def __eq__(self, other):
+        if not isinstance(other, Spell):
+            return NotImplemented
+        return self._fields() == other._fields()
+
+    def __hash__(self):
+        return hash(self._fields())
+
+    def __reduce__(self):
+        # copy/pickle не могут выставить слоты через __setattr__ — собираем через конструктор
+        return self.__class__, self._fields()
 
     def __str__(self):
         return f'Спелл {self.name}'
@@ -32,18 +81,10 @@ class Spell:
         """Активировать заклинание"""
         logger.info(f'Каст спелла {self.name} ✨')
 
-    def apply_effect(self, target: Creature):
-        """Применить эффект заклинания к цели"""
-        if not isinstance(target, Creature):
-            raise TypeError('Цель должна быть экземпляром класса Character')
+    def roll_power(self, rng: random.Random | None = None) -> int:
+        """Сила одного каста: бросок костей генератором боя (не меньше 0) или фиксированная power"""
+        return self.power if self.dice is None else max(0, self.dice.roll(rng))
 
-        effect_method_name = self.spell_type.value
-        """
-        # Берем из атрибута spell_type экземпляр объекта SpellType.attribute_name, затем
-        # достаем из объекта SpellType.attribute_name значение переменной - SpellType.attribute_name.value
-        """
-        if hasattr(target, effect_method_name):  # if у объекта "target" есть метод "effect_method_name"
-            effect_method = getattr(target, effect_method_name)  # получаем obj.attr
-            effect_method(self.power)  # вызываем obj.attr()
-        else:
-            logger.error(f'Метод {effect_method_name} не найден у цели')
+    def apply_effect(self, target: Creature, rng: random.Random | None = None):
+        """Применить эффект заклинания к цели (rng — генератор бросков боя)"""
+        self.effect(target, self.roll_power(rng))
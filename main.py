@@ -7,6 +7,9 @@ from domain.battle.battle import Battle
 from domain.entities.character import Character
 from services.perplexity_client import PerplexityClient
 from services.dm_service import DungeonMasterService
+from services.dm_cache import CachedDungeonMasterService
+from services.cassette import cassette_from_env
+from services.dm_memory import DungeonMemory
 
 # Загружаем переменные окружения из .env в самом начале
 load_dotenv()
@@ -22,22 +25,27 @@ def setup_logging() -> None:
     )
 
 
-def init_dm_service() -> DungeonMasterService | None:
+def init_dm_service() -> CachedDungeonMasterService | None:
     """
     Инициализирует DM сервис если доступен API ключ.
 
     Returns:
-        DungeonMasterService или None если ключ отсутствует
+        DungeonMasterService за семантическим кэшем или None если ключ отсутствует
     """
     api_key = os.getenv("PERPLEXITY_API_KEY")
+    # DM_CASSETTE=path, DM_CASSETTE_MODE=record|replay — запись/воспроизведение трафика DM
+    cassette = cassette_from_env()
 
-    if not api_key:
+    if not api_key and not (cassette and cassette.replaying):
         logger.warning("⚠️  PERPLEXITY_API_KEY не установлен. DM отключен.")
         return None
 
     try:
-        client = PerplexityClient()
-        dm = DungeonMasterService(client)
+        client = PerplexityClient(cassette=cassette)
+        dm = CachedDungeonMasterService(
+            DungeonMasterService(client, memory=DungeonMemory()),
+            path=os.getenv("DM_CACHE_PATH", ".dm_cache.json"),
+        )
         logger.info("✨ Dungeon Master активирован!")
         return dm
     except Exception as e:
@@ -65,8 +73,16 @@ def main():
     dm = init_dm_service()
 
     # Бой с опциональным DM!
-    battle = Battle(player, enemy, grimoire, dm=dm)
-    battle.run()
+    battle = Battle(player, enemy, grimoire, dm=dm, speculate_enemy=True,
+                    coalesce_dm_turn=True, stream_narration=True,
+                    narration_deadline_s=float(os.getenv("DM_NARRATION_DEADLINE_S", "3")))
+    try:
+        battle.run()
+    finally:
+        if dm is not None:
+            logger.debug(f"Задержки DM: {dm.client.latency_stats.summary()}")
+            logger.debug(f"Токены DM: {dm.client.usage_stats.summary()}")
+            dm.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,150 @@
+"""
+asyncio-версия DungeonMasterService: те же промпты и тот же parse_json_object,
+но сотни запросов DM могут быть в полёте одновременно.
+
+Запросы можно привязать к battle_id и отменить пачкой через cancel_battle(),
+когда бой закончился раньше, чем пришёл нарратив.
+"""
+import asyncio
+
+from loguru import logger
+
+from services.async_perplexity_client import AsyncPerplexityClient
+from services.json_protocol import parse_json_object
+from services.dm_service import validate_enemy_turn
+from services.dm_prompts import (
+    build_react_messages,
+    build_choose_enemy_action_messages,
+    build_enemy_turn_messages
+)
+
+
+class AsyncDungeonMasterService:
+    """Асинхронный Dungeon Master с отменой запросов по бою"""
+
+    def __init__(self, client: AsyncPerplexityClient):
+        self.client = client
+        self._in_flight: dict[str, set[asyncio.Task]] = {}
+        logger.info("AsyncDungeonMasterService инициализирован")
+
+    async def aclose(self) -> None:
+        """Отменяет всё, что в полёте, и закрывает пул соединений"""
+        for battle_id in list(self._in_flight):
+            self.cancel_battle(battle_id)
+        await self.client.aclose()
+
+    async def __aenter__(self) -> "AsyncDungeonMasterService":
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self.aclose()
+
+    def in_flight(self, battle_id: str | None = None) -> int:
+        """Сколько запросов сейчас ждут ответа (по бою или всего)"""
+        if battle_id is not None:
+            return len(self._in_flight.get(battle_id, ()))
+        return sum(len(tasks) for tasks in self._in_flight.values())
+
+    def cancel_battle(self, battle_id: str) -> int:
+        """
+        Отменяет все незавершённые запросы боя.
+        Ожидающие их корутины получат None, как при ошибке API.
+
+        Returns:
+            Сколько запросов было отменено
+        """
+        tasks = self._in_flight.pop(battle_id, set())
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            logger.debug(f"Бой {battle_id}: отменено запросов DM — {len(tasks)}")
+        return len(tasks)
+
+    async def _chat(self, messages: list[dict], max_tokens: int, battle_id: str | None) -> str | None:
+        key = battle_id or ""
+        task = asyncio.ensure_future(self.client.chat(messages, max_tokens=max_tokens))
+        self._in_flight.setdefault(key, set()).add(task)
+
+        try:
+            return await task
+        except asyncio.CancelledError:
+            # Отменили сам запрос (cancel_battle), а не нашу корутину — это штатный None
+            if task.cancelled() and not asyncio.current_task().cancelling():
+                return None
+            raise
+        finally:
+            tasks = self._in_flight.get(key)
+            if tasks is not None:
+                tasks.discard(task)
+                if not tasks:
+                    del self._in_flight[key]
+
+    async def react_to_action(self, battle_state: dict, actor: str, battle_id: str | None = None) -> dict | None:
+        """
+        Реагирует на действие игрока или врага.
+
+        Args:
+            battle_state: Состояние боя (round, player, enemy, last_action)
+            actor: "player" или "enemy" — кто совершил действие
+            battle_id: Ключ для cancel_battle()
+
+        Returns:
+            {"narration": "...", "event": {...}} или None если ошибка/отмена
+        """
+        response = await self._chat(build_react_messages(battle_state, actor), 300, battle_id)
+
+        if not response:
+            return None
+
+        return parse_json_object(response)
+
+    async def choose_enemy_action(
+            self,
+            battle_state: dict,
+            allowed_actions: dict,
+            battle_id: str | None = None,
+    ) -> dict | None:
+        """
+        Выбирает действие для врага.
+
+        Returns:
+            {"action": {...}, "narration": "..."} или None если ошибка/отмена
+        """
+        response = await self._chat(build_choose_enemy_action_messages(battle_state, allowed_actions), 200, battle_id)
+
+        if not response:
+            return None
+
+        parsed = parse_json_object(response)
+
+        if parsed:
+            logger.info(
+                f"Enemy action chosen: {parsed.get('action', {}).get('type')} | "
+                f"Narration: {parsed.get('narration', '')}"
+            )
+
+        return parsed
+
+    async def play_enemy_turn(
+            self,
+            battle_state: dict,
+            allowed_actions: dict,
+            battle_id: str | None = None,
+    ) -> dict | None:
+        """
+        Весь ход врага одним запросом (см. DungeonMasterService.play_enemy_turn).
+
+        Returns:
+            {"action": {...}, "narration": "...", "event": {...} | None} или None
+        """
+        response = await self._chat(build_enemy_turn_messages(battle_state, allowed_actions), 350, battle_id)
+
+        if not response:
+            return None
+
+        validated = validate_enemy_turn(parse_json_object(response), allowed_actions)
+
+        if validated is None:
+            logger.warning("Совмещённый ход врага не прошёл валидацию")
+
+        return validated
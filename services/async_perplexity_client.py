@@ -0,0 +1,243 @@
+"""асинхронно отправить запрос в Perplexity и вернуть сырой content (строку) или None"""
+import asyncio
+import importlib.util
+import json
+import os
+import time
+
+import httpx
+from loguru import logger
+
+from services.cassette import Cassette
+from services.latency import AsyncLatencyTracer, LatencyStats, RequestLatency
+from services.perplexity_client import (
+    PERPLEXITY_URL,
+    AttemptOutcome,
+    auth_headers,
+    build_payload,
+    extract_content,
+)
+from services.resilience import AdaptiveTimeout, CircuitBreaker, RetryPolicy, parse_retry_after
+from services.token_usage import TokenUsage, UsageStats
+
+
+class AsyncPerplexityClient:
+    """
+    asyncio-версия PerplexityClient на httpx.AsyncClient.
+    Один пул соединений на много одновременных запросов; закрывать через aclose() или async with.
+    Адаптивный таймаут, хедж, повторы и circuit breaker — как у синхронного клиента,
+    только проигравший хедж-запрос здесь действительно отменяется.
+    """
+
+    def __init__(
+            self,
+            model: str = "sonar",
+            timeout_s: int = 10,
+            base_url: str = PERPLEXITY_URL,
+            max_connections: int = 100,
+            max_keepalive_connections: int = 20,
+            keepalive_expiry_s: float = 60.0,
+            http2: bool = False,
+            adaptive_timeout: bool = True,
+            min_timeout_s: float = 1.0,
+            hedge: bool = False,
+            retry: RetryPolicy | None = None,
+            breaker: CircuitBreaker | None = None,
+            cassette: Cassette | None = None,
+    ):
+        self.api_key = os.getenv("PERPLEXITY_API_KEY")
+        self.model = model
+        self.timeout_s = timeout_s
+        self.base_url = base_url
+        self.latency_stats = LatencyStats()
+        self.last_latency: RequestLatency | None = None
+        self.usage_stats = UsageStats()
+        self.last_usage: TokenUsage | None = None
+        self.timeouts = AdaptiveTimeout(
+            self.latency_stats,
+            min_s=min_timeout_s if adaptive_timeout else timeout_s,
+            max_s=timeout_s,
+        )
+        self.hedge = hedge
+        self.retry = retry or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker()
+        self.hedged_requests = 0
+        self.hedge_wins = 0
+        self.cassette = cassette
+
+        if not self.api_key and not (cassette and cassette.replaying):
+            logger.warning("PERPLEXITY_API_KEY не найден в .env")
+
+        if http2 and importlib.util.find_spec("h2") is None:
+            logger.warning("HTTP/2 недоступен (pip install httpx[http2]), используем HTTP/1.1")
+            http2 = False
+
+        self._http = httpx.AsyncClient(
+            timeout=timeout_s,
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry_s,
+            ),
+            headers=auth_headers(self.api_key),
+        )
+
+    async def aclose(self) -> None:
+        """Закрывает пул соединений"""
+        await self._http.aclose()
+        if self.cassette is not None:
+            self.cassette.close()
+
+    async def __aenter__(self) -> "AsyncPerplexityClient":
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self.aclose()
+
+    def _record_usage(self, usage: TokenUsage | None) -> None:
+        """Токены из usage ответа (провайдеры без usage просто не попадают в статистику)"""
+        if usage is not None:
+            self.last_usage = usage
+            self.usage_stats.add(usage)
+
+    def is_available(self) -> bool:
+        """False, пока circuit breaker разомкнут"""
+        return not self.breaker.is_open
+
+    async def _post_once(self, payload: dict, timeout_s: float) -> AttemptOutcome:
+        """Одна попытка запроса без повторов"""
+        tracer = AsyncLatencyTracer()
+
+        try:
+            response = await self._http.post(
+                self.base_url, json=payload, timeout=timeout_s, extensions={"trace": tracer}
+            )
+
+            if response.status_code == 429 or response.status_code >= 500:
+                logger.warning(f"API ответил {response.status_code}")
+                return AttemptOutcome(
+                    failed=True,
+                    retryable=True,
+                    retry_after_s=parse_retry_after(response.headers.get("Retry-After")),
+                )
+
+            response.raise_for_status()
+            data = response.json()
+            content = extract_content(data)
+            self._record_usage(TokenUsage.from_response(data))
+
+            self.last_latency = tracer.finish()
+            self.latency_stats.add(self.last_latency)
+
+            if not content:
+                logger.warning("Пустой ответ от API")
+                return AttemptOutcome()
+
+            return AttemptOutcome(content=content)
+
+        except httpx.TimeoutException:
+            logger.error(f"Таймаут ({timeout_s:.1f} сек) при запросе к API")
+            self.latency_stats.add(RequestLatency(ttfb_s=timeout_s, total_s=timeout_s))
+            return AttemptOutcome(failed=True, retryable=True)
+
+        except httpx.TransportError as e:
+            logger.error(f"Сетевая ошибка: {e}")
+            return AttemptOutcome(failed=True, retryable=True)
+
+        except httpx.HTTPStatusError as e:
+            # 401/403/404 и прочие 4XX: ответа нет, и повтор того же запроса его не даст
+            logger.error(f"Ошибка запроса: {e}")
+            return AttemptOutcome(failed=True, retryable=False)
+
+        except (json.JSONDecodeError, KeyError, IndexError) as e:
+            logger.error(f"Ошибка парсинга ответа: {e}")
+            return AttemptOutcome(failed=True)
+
+        except Exception as e:
+            # asyncio.CancelledError — BaseException, сюда не попадает и долетает до вызывающего
+            logger.error(f"Ошибка: {e}")
+            return AttemptOutcome(failed=True)
+
+    async def _send(self, payload: dict, timeout_s: float) -> AttemptOutcome:
+        """Попытка с хеджированием после p95; проигравший запрос отменяется"""
+        hedge_delay = self.timeouts.hedge_delay() if self.hedge else None
+        if hedge_delay is None:
+            return await self._post_once(payload, timeout_s)
+
+        primary = asyncio.ensure_future(self._post_once(payload, timeout_s))
+        pending = {primary}
+        backup = None
+        try:
+            done, _ = await asyncio.wait(pending, timeout=hedge_delay)
+            if done:
+                return primary.result()
+
+            self.hedged_requests += 1
+            backup = asyncio.ensure_future(self._post_once(payload, timeout_s))
+            pending = {primary, backup}
+            outcome = AttemptOutcome(failed=True, retryable=True)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    outcome = task.result()
+                    if not outcome.failed:
+                        if task is backup:
+                            self.hedge_wins += 1
+                        return outcome
+            return outcome
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def chat(self, message: list[dict], max_tokens: int = 300) -> str | None:
+        """Отправляет запрос к LLM и возвращает ответ. Отмена задачи прерывает запрос."""
+        payload = build_payload(self.model, message, max_tokens)
+
+        if self.cassette is not None and self.cassette.replaying:
+            found, content, latency_s = self.cassette.replay(payload)
+            if not found:
+                logger.warning("Промпта нет в кассете")
+                return None
+            if self.cassette.simulate_latency:
+                await asyncio.sleep(latency_s)
+            self.last_latency = RequestLatency(ttfb_s=latency_s, total_s=latency_s)
+            self.latency_stats.add(self.last_latency)
+            return content
+
+        started = time.perf_counter()
+        content = await self._chat_with_retries(payload)
+        if self.cassette is not None:
+            self.cassette.record(payload, content, time.perf_counter() - started)
+        return content
+
+    async def _chat_with_retries(self, payload: dict) -> str | None:
+        if not self.breaker.allow_request():
+            logger.debug("Circuit breaker разомкнут — запрос к API пропущен")
+            return None
+
+        try:
+            return await self._attempts(payload)
+        finally:
+            # cancel_battle отменяет задачу посреди запроса: вердикта нет, а пробный слот надо вернуть
+            self.breaker.release()
+
+    async def _attempts(self, payload: dict) -> str | None:
+        """Попытки с повторами; каждая сообщает breaker'у успех или ошибку"""
+        for attempt in range(self.retry.max_attempts):
+            outcome = await self._send(payload, self.timeouts.current())
+
+            if outcome.failed:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+
+            if not outcome.retryable or attempt == self.retry.max_attempts - 1:
+                return outcome.content
+
+            if not self.breaker.allow_request():
+                return None
+
+            await asyncio.sleep(self.retry.delay(attempt, outcome.retry_after_s))
+
+        return None
@@ -0,0 +1,156 @@
+"""
+Кассета трафика DM: запись пар запрос/ответ и их воспроизведение без сети.
+
+Формат файла — append-only, без JSON, чтобы запись не тормозила бой:
+    заголовок  b"DMCS" + версия (1 байт)
+    запись     blake2b-хэш промпта (16 байт) | задержка float32 | длина UTF-8 uint32 | ответ
+Длина NONE_LENGTH означает, что API вернул None — при воспроизведении это тоже None.
+Недописанная последняя запись (процесс упал посреди append) при загрузке отбрасывается.
+"""
+import hashlib
+import json
+import os
+import struct
+import threading
+
+from loguru import logger
+
+MAGIC = b"DMCS"
+VERSION = 1
+RECORD_HEADER = struct.Struct("<16sfI")
+NONE_LENGTH = 0xFFFFFFFF
+
+
+def prompt_hash(payload: dict) -> bytes:
+    """Ключ запроса: модель, messages и max_tokens (stream не важен — ответ тот же)"""
+    key = json.dumps(
+        [payload.get("model"), payload.get("messages"), payload.get("max_tokens")],
+        ensure_ascii=False,
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.blake2b(key.encode(), digest_size=16).digest()
+
+
+class Cassette:
+    """
+    mode="record": каждый ответ клиента дописывается в файл.
+    mode="replay": ответы берутся из индекса в памяти; одинаковые промпты получают
+    записанные ответы по очереди (по кругу, если повторов больше, чем записей).
+    """
+
+    RECORD = "record"
+    REPLAY = "replay"
+
+    def __init__(self, path: str, mode: str = REPLAY, simulate_latency: bool = False):
+        """
+        :param path: Файл кассеты
+        :param mode: "record" | "replay"
+        :param simulate_latency: При воспроизведении клиент выдерживает исходную задержку ответа
+        """
+        if mode not in (self.RECORD, self.REPLAY):
+            raise ValueError(f"Неизвестный режим кассеты: {mode}")
+
+        self.path = path
+        self.mode = mode
+        self.simulate_latency = simulate_latency
+        self.recorded = 0
+        self.replayed = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._index: dict[bytes, list[tuple[str | None, float]]] = {}
+        self._cursor: dict[bytes, int] = {}
+        self._file = None
+
+        if mode == self.RECORD:
+            self._file = open(path, "ab")
+            if self._file.tell() == 0:
+                self._file.write(MAGIC + bytes([VERSION]))
+                self._file.flush()
+        else:
+            self._load()
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == self.REPLAY
+
+    def _load(self) -> None:
+        with open(self.path, "rb") as f:
+            data = f.read()
+
+        if data[:len(MAGIC)] != MAGIC or len(data) <= len(MAGIC):
+            raise ValueError(f"{self.path}: не кассета DM")
+        if data[len(MAGIC)] != VERSION:
+            raise ValueError(f"{self.path}: неподдерживаемая версия кассеты {data[len(MAGIC)]}")
+
+        offset = len(MAGIC) + 1
+        records = 0
+        while offset + RECORD_HEADER.size <= len(data):
+            key, latency_s, length = RECORD_HEADER.unpack_from(data, offset)
+            offset += RECORD_HEADER.size
+            content = None
+            if length != NONE_LENGTH:
+                if offset + length > len(data):
+                    break
+                content = data[offset:offset + length].decode()
+                offset += length
+            self._index.setdefault(key, []).append((content, latency_s))
+            records += 1
+
+        if offset != len(data):
+            logger.warning(f"{self.path}: отброшен недописанный хвост ({len(data) - offset} байт)")
+        logger.debug(f"Кассета {self.path}: {records} записей, {len(self._index)} промптов")
+
+    def record(self, payload: dict, content: str | None, latency_s: float) -> None:
+        """Дописывает ответ в кассету"""
+        if self._file is None:
+            raise ValueError("Кассета открыта не на запись")
+
+        body = b"" if content is None else content.encode()
+        length = NONE_LENGTH if content is None else len(body)
+        record = RECORD_HEADER.pack(prompt_hash(payload), latency_s, length) + body
+        with self._lock:
+            self._file.write(record)
+            self._file.flush()
+            self.recorded += 1
+
+    def replay(self, payload: dict) -> tuple[bool, str | None, float]:
+        """
+        Достаёт записанный ответ.
+
+        Returns:
+            (нашёлся ли, ответ, исходная задержка в секундах)
+        """
+        key = prompt_hash(payload)
+        with self._lock:
+            entries = self._index.get(key)
+            if not entries:
+                self.misses += 1
+                return False, None, 0.0
+            position = self._cursor.get(key, 0)
+            self._cursor[key] = position + 1
+            self.replayed += 1
+        content, latency_s = entries[position % len(entries)]
+        return True, content, latency_s
+
+    def stats(self) -> dict:
+        return {"mode": self.mode, "recorded": self.recorded, "replayed": self.replayed, "misses": self.misses}
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> "Cassette":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+
+def cassette_from_env() -> Cassette | None:
+    """DM_CASSETTE=path и DM_CASSETTE_MODE=record|replay — подключить кассету без правки кода"""
+    path = os.getenv("DM_CASSETTE")
+    if not path:
+        return None
+    return Cassette(path, os.getenv("DM_CASSETTE_MODE", Cassette.REPLAY))
@@ -0,0 +1,343 @@
+"""
+Семантический кэш ответов DM.
+
+Бои повторяют похожие ситуации (тот же спелл, похожие доли HP), поэтому ответы
+кэшируются по нормализованному отпечатку состояния: кто ходит, что сделал, имена
+сторон и HP/мана, разложенные по полосам (bands). На ключ копится пул из нескольких
+разных ответов, чтобы нарратив не повторялся слово в слово.
+
+Пока breaker DM разомкнут, is_available() честно возвращает False, а Battle берёт
+ответы только из кэша через cached() — без запросов к DM.
+
+Кэш отдаёт только сырые ответы DM: событие из них всё равно проходит через
+apply_event в Battle, так что зажим дельт и HP/маны работает как обычно.
+"""
+import copy
+import json
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable
+
+from loguru import logger
+
+from services.dm_service import DungeonMasterService, validate_enemy_action, validate_enemy_turn
+
+
+class CachedDungeonMasterService:
+    """Обёртка над DungeonMasterService с тем же интерфейсом и LRU+TTL кэшем"""
+
+    def __init__(
+            self,
+            dm: DungeonMasterService,
+            bands: int = 5,
+            max_entries: int = 1000,
+            ttl_s: float = 24 * 3600,
+            variety: int = 3,
+            path: str | None = None,
+            seed: int | None = None,
+    ):
+        """
+        :param dm: Настоящий DM, к которому идут промахи
+        :param bands: На сколько полос резать доли HP/маны (5 → шаг 20%)
+        :param max_entries: Максимум ключей; дальше вытесняются самые давние по использованию
+        :param ttl_s: Время жизни одного ответа в пуле
+        :param variety: Сколько разных ответов копить на ключ, прежде чем начать отдавать из кэша
+        :param path: JSON-файл для сохранения кэша между запусками (None — только в памяти)
+        """
+        self.dm = dm
+        self.bands = bands
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.variety = variety
+        self.path = path
+        self.rng = random.Random(seed)
+        # ключ -> [(время записи, ответ), ...]
+        self._entries: OrderedDict[str, list[tuple[float, dict]]] = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self._miss_time_s = 0.0
+        # кэш делят бой, спекулятивные потоки и гонка нарратива
+        self._lock = threading.Lock()
+
+        if path and os.path.exists(path):
+            self.load(path)
+
+    @property
+    def client(self):
+        return self.dm.client
+
+    def is_available(self) -> bool:
+        """Доступен ли сам DM; при разомкнутом breaker'е ответы берутся через cached()"""
+        return self.dm.is_available()
+
+    # ---------- ключи ----------
+
+    def _band(self, current: int, maximum: int) -> int:
+        if maximum <= 0:
+            return 0
+        return min(self.bands - 1, current * self.bands // maximum)
+
+    def fingerprint(self, kind: str, battle_state: dict, actor: str = "", allowed_actions: dict | None = None) -> str:
+        """
+        Нормализованный ключ состояния боя.
+
+        Args:
+            kind: "react" | "choose" | "turn" — какой запрос DM
+            battle_state: dict из Battle._get_battle_state
+            actor: Кто ходил (для react)
+            allowed_actions: Доступные врагу действия (для choose/turn)
+        """
+        last_action = battle_state.get("last_action") or {}
+        sides = []
+        for side in ("player", "enemy"):
+            s = battle_state[side]
+            side = [
+                s["name"],
+                self._band(s["current_hp"], s["max_hp"]),
+                self._band(s["current_mana"], s["max_mana"]),
+            ]
+            if s.get("statuses"):
+                # виды эффектов, без точных сил и сроков — как и HP, ключ грубый
+                side.append(sorted({status["kind"] for status in s["statuses"]}))
+            sides.append(side)
+
+        allowed = None
+        if allowed_actions is not None:
+            spells = allowed_actions.get("cast_spell", {}).get("available_spells", [])
+            allowed = [sorted(allowed_actions), sorted(s["name"] for s in spells)]
+
+        return json.dumps(
+            [kind, actor, last_action.get("type"), last_action.get("spell_name"), sides, allowed],
+            ensure_ascii=False,
+        )
+
+    # ---------- хранилище ----------
+
+    def _lookup(self, key: str) -> dict | None:
+        """Ответ из пула, если пул уже набран; иначе None (нужен запрос к LLM)"""
+        with self._lock:
+            pool = self._entries.get(key)
+            if pool is None:
+                return None
+
+            now = time.time()
+            pool[:] = [(ts, resp) for ts, resp in pool if now - ts < self.ttl_s]
+            if not pool:
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            if len(pool) < self.variety:
+                return None
+            return copy.deepcopy(self.rng.choice(pool)[1])
+
+    def _store(self, key: str, response: dict) -> None:
+        response = copy.deepcopy(response)
+        with self._lock:
+            pool = self._entries.setdefault(key, [])
+            self._entries.move_to_end(key)
+            pool.append((time.time(), response))
+            if len(pool) > self.variety:
+                pool.pop(0)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _count_hit(self) -> None:
+        with self._lock:
+            self.hits += 1
+
+    @staticmethod
+    def _cacheable(kind: str, response: dict | None, allowed_actions: dict | None) -> bool:
+        """
+        Годен ли ответ для повторной выдачи: кэш отдаёт его и в других боях, так что
+        ошибку модели (чужой спелл, пустой нарратив) нельзя тиражировать
+        """
+        if not isinstance(response, dict):
+            return False
+        if kind == "react":
+            narration = response.get("narration")
+            return isinstance(narration, str) and bool(narration)
+        if kind == "choose":
+            return validate_enemy_action(response, allowed_actions or {}) is not None
+        if kind == "turn":
+            return validate_enemy_turn(response, allowed_actions or {}) is not None
+        raise ValueError(f'Неизвестный вид запроса DM: {kind}')
+
+    def store(self, kind: str, battle_state: dict, response: dict | None, actor: str = "",
+              allowed_actions: dict | None = None) -> None:
+        """Кладёт готовый ответ в кэш (например, опоздавший ответ DM); негодный не кладётся"""
+        if self._cacheable(kind, response, allowed_actions):
+            self._store(self.fingerprint(kind, battle_state, actor, allowed_actions), response)
+
+    def _cached_call(
+            self,
+            kind: str,
+            key: str,
+            call: Callable[[], dict | None],
+            on_hit: Callable[[dict], None] | None = None,
+            allowed_actions: dict | None = None,
+    ) -> dict | None:
+        cached = self._lookup(key)
+        if cached is not None:
+            self._count_hit()
+            if on_hit is not None:
+                on_hit(cached)
+            return cached
+
+        started = time.perf_counter()
+        response = call()
+        with self._lock:
+            self.misses += 1
+            self._miss_time_s += time.perf_counter() - started
+
+        if self._cacheable(kind, response, allowed_actions):
+            self._store(key, response)
+        return response
+
+    def _remember_hit(self, battle_id: str | None, battle_state: dict, actor: str) -> Callable[[dict], None]:
+        """Ответ из кэша тоже часть истории боя — иначе память DM пропустит этот ход"""
+        return lambda response: self.dm.remember(battle_id, battle_state, actor, response)
+
+    def cached(self, kind: str, battle_state: dict, actor: str = "enemy", allowed_actions: dict | None = None,
+               battle_id: str | None = None) -> dict | None:
+        """
+        Ответ только из кэша, без запроса к DM — путь для разомкнутого breaker'а.
+
+        Args:
+            kind: "react" | "choose" | "turn"
+            battle_state: dict из Battle._get_battle_state
+            actor: Кто ходил (в ключ входит только для react)
+            allowed_actions: Доступные врагу действия (для choose/turn)
+            battle_id: Бой, в память которого записать попадание
+
+        Returns:
+            Ответ из пула или None (промах — DM не спрашивается)
+        """
+        key = self.fingerprint(kind, battle_state, actor if kind == "react" else "", allowed_actions)
+        cached = self._lookup(key)
+        if cached is None:
+            return None
+        self._count_hit()
+        if kind != "choose":  # на choose память пишет следующая за ним реакция
+            self.dm.remember(battle_id, battle_state, actor, cached)
+        return cached
+
+    # ---------- интерфейс DungeonMasterService ----------
+
+    def end_battle(self, battle_id: str) -> None:
+        self.dm.end_battle(battle_id)
+
+    def remember(self, battle_id: str | None, battle_state: dict, actor: str, response: dict | None) -> None:
+        self.dm.remember(battle_id, battle_state, actor, response)
+
+    def react_to_action(self, battle_state: dict, actor: str, battle_id: str | None = None) -> dict | None:
+        key = self.fingerprint("react", battle_state, actor)
+        return self._cached_call(
+            "react",
+            key,
+            lambda: self.dm.react_to_action(battle_state, actor, battle_id),
+            self._remember_hit(battle_id, battle_state, actor),
+        )
+
+    def react_to_action_stream(
+            self,
+            battle_state: dict,
+            actor: str,
+            on_narration: Callable[[str], None],
+            on_object: Callable[[str, Any], None] | None = None,
+            battle_id: str | None = None,
+    ) -> dict | None:
+        key = self.fingerprint("react", battle_state, actor)
+        cached = self._lookup(key)
+        if cached is not None:
+            self._count_hit()
+            if cached.get("narration"):
+                on_narration(cached["narration"])
+            if on_object is not None and cached.get("event") is not None:
+                on_object("event", cached["event"])
+            self.dm.remember(battle_id, battle_state, actor, cached)
+            return cached
+
+        return self._cached_call(
+            "react", key,
+            lambda: self.dm.react_to_action_stream(battle_state, actor, on_narration, on_object, battle_id),
+        )
+
+    def choose_enemy_action(self, battle_state: dict, allowed_actions: dict, battle_id: str | None = None,
+                            cancel: threading.Event | None = None) -> dict | None:
+        key = self.fingerprint("choose", battle_state, allowed_actions=allowed_actions)
+        return self._cached_call(
+            "choose", key,
+            lambda: self.dm.choose_enemy_action(battle_state, allowed_actions, battle_id, cancel=cancel),
+            allowed_actions=allowed_actions,
+        )
+
+    def play_enemy_turn(self, battle_state: dict, allowed_actions: dict, battle_id: str | None = None,
+                        cancel: threading.Event | None = None) -> dict | None:
+        key = self.fingerprint("turn", battle_state, allowed_actions=allowed_actions)
+        return self._cached_call(
+            "turn",
+            key,
+            lambda: self.dm.play_enemy_turn(battle_state, allowed_actions, battle_id, cancel=cancel),
+            self._remember_hit(battle_id, battle_state, "enemy"),
+            allowed_actions,
+        )
+
+    # ---------- метрики и персистентность ----------
+
+    def stats(self) -> dict:
+        """Доля попаданий и сэкономленное время (попадания × средняя цена промаха)"""
+        with self._lock:
+            entries, hits, misses, miss_time_s = len(self._entries), self.hits, self.misses, self._miss_time_s
+        total = hits + misses
+        mean_miss_s = miss_time_s / misses if misses else 0.0
+        return {
+            "entries": entries,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / total if total else 0.0,
+            "mean_miss_ms": 1000 * mean_miss_s,
+            "saved_s": hits * mean_miss_s,
+        }
+
+    def save(self, path: str | None = None) -> None:
+        path = path or self.path
+        if not path:
+            return
+        with self._lock:
+            items = [(key, list(pool)) for key, pool in self._entries.items()]
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(items, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        logger.debug(f"Кэш DM сохранён: {len(items)} ключей → {path}")
+
+    def load(self, path: str) -> None:
+        try:
+            with open(path, encoding="utf-8") as f:
+                items = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Не удалось загрузить кэш DM из {path}: {e}")
+            return
+
+        now = time.time()
+        for key, pool in items:
+            fresh = [(ts, resp) for ts, resp in pool if now - ts < self.ttl_s]
+            if fresh:
+                self._entries[key] = fresh
+        logger.debug(f"Кэш DM загружен: {len(self._entries)} ключей из {path}")
+
+    def close(self) -> None:
+        self.save()
+        logger.debug(f"Кэш DM: {self.stats()}")
+        self.dm.close()
+
+    def __enter__(self) -> "CachedDungeonMasterService":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
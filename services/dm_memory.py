@@ -0,0 +1,205 @@
+"""
+Память DM в пределах боя.
+
+Без неё каждый запрос DM stateless и нарратив не может сослаться на прошлые раунды,
+а наивная история целиком растит промпт (и задержку) линейно с длиной боя.
+Здесь контекст ограничен: последние keep_rounds раундов дословно плюс компактная
+сводка всего, что было раньше, и жёсткий бюджет токенов на весь блок — размер промпта
+на раунд O(1), сколько бы бой ни длился.
+
+Сводка строится локально из счётчиков (без лишних запросов к LLM) и пересобирается
+раз в summary_every раундов, чтобы между обновлениями текст не менялся.
+"""
+import threading
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+
+from services.prompt_templates import estimate_tokens
+
+NARRATION_SNIPPET_CHARS = 120
+
+
+def _first_sentence(text: str, limit: int = NARRATION_SNIPPET_CHARS) -> str:
+    text = " ".join(text.split())
+    for stop in (". ", "! ", "? "):
+        position = text.find(stop)
+        if 0 < position < limit:
+            return text[:position + 1]
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+def _describe_action(action: dict | None) -> str:
+    action = action or {}
+    if action.get("type") == "cast_spell" and action.get("spell_name"):
+        return action["spell_name"]
+    return "базовая атака"
+
+
+@dataclass
+class RoundNote:
+    """Одна запись памяти: кто что сделал и чем это запомнилось"""
+    round: int
+    actor_name: str
+    action: str
+    narration: str
+
+    def render(self) -> str:
+        line = f"Р{self.round}: {self.actor_name} — {self.action}"
+        return f"{line}. {self.narration}" if self.narration else line
+
+
+@dataclass
+class BattleMemory:
+    """Контекст одного боя"""
+    keep_rounds: int = 3
+    token_budget: int = 200
+    summary_every: int = 5
+    recent: deque = field(default_factory=deque)
+    summary: str = ""
+    # сжатое прошлое: (имя, действие) -> сколько раз; первый/последний свёрнутый раунд
+    folded_actions: dict = field(default_factory=dict)
+    folded_from: int = 0
+    folded_to: int = 0
+    highlight: str = ""
+    _summary_round: int = 0
+
+    def observe(self, note: RoundNote) -> None:
+        self.recent.append(note)
+        while self.recent and note.round - self.recent[0].round >= self.keep_rounds:
+            self._fold(self.recent.popleft())
+        if note.round - self._summary_round >= self.summary_every:
+            self._refresh_summary(note.round)
+
+    def _fold(self, note: RoundNote) -> None:
+        key = (note.actor_name, note.action)
+        self.folded_actions[key] = self.folded_actions.get(key, 0) + 1
+        self.folded_from = self.folded_from or note.round
+        self.folded_to = note.round
+        if note.narration:
+            self.highlight = note.narration
+
+    def _refresh_summary(self, current_round: int) -> None:
+        self._summary_round = current_round
+        if not self.folded_actions:
+            self.summary = ""
+            return
+
+        by_actor: dict[str, list[str]] = {}
+        for (name, action), count in self.folded_actions.items():
+            by_actor.setdefault(name, []).append(f"{action} ×{count}" if count > 1 else action)
+        parts = "; ".join(f"{name}: {', '.join(actions)}" for name, actions in by_actor.items())
+        summary = f"Раунды {self.folded_from}–{self.folded_to}: {parts}."
+        if self.highlight:
+            summary += f" Запомнилось: {self.highlight}"
+        self.summary = summary
+
+    def render(self) -> str:
+        """Блок контекста, уложенный в token_budget"""
+        while True:
+            lines = [f"Ранее: {self.summary}"] if self.summary else []
+            lines += [note.render() for note in self.recent]
+            text = "\n".join(lines)
+            if estimate_tokens(text) <= self.token_budget:
+                return text
+            if len(self.recent) > 1:
+                # не влезли — самый старый дословный раунд уходит в сводку
+                self._fold(self.recent.popleft())
+                self._refresh_summary(self._summary_round)
+                continue
+            # крайний случай: одна очень длинная запись — режем текст под бюджет
+            return text.encode()[:4 * self.token_budget].decode(errors="ignore")
+
+
+class DungeonMemory:
+    """Память DM по боям (battle_id) + метрики размера контекста на запрос"""
+
+    def __init__(
+            self,
+            keep_rounds: int = 3,
+            token_budget: int = 200,
+            summary_every: int = 5,
+            max_battles: int = 1000,
+    ):
+        """
+        :param keep_rounds: Сколько последних раундов держать дословно
+        :param token_budget: Жёсткий потолок токенов на блок контекста
+        :param summary_every: Раз во сколько раундов пересобирать сводку
+        :param max_battles: Сколько боёв помнить одновременно (давно забытые вытесняются)
+        """
+        self.keep_rounds = keep_rounds
+        self.token_budget = token_budget
+        self.summary_every = summary_every
+        self.max_battles = max_battles
+        self._battles: OrderedDict[str, BattleMemory] = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.calls = 0
+        self.context_tokens_total = 0
+        self.context_tokens_max = 0
+        self.last_context_tokens = 0
+
+    def _battle(self, battle_id: str) -> BattleMemory:
+        memory = self._battles.get(battle_id)
+        if memory is None:
+            memory = BattleMemory(self.keep_rounds, self.token_budget, self.summary_every)
+            self._battles[battle_id] = memory
+            while len(self._battles) > self.max_battles:
+                self._battles.popitem(last=False)
+        self._battles.move_to_end(battle_id)
+        return memory
+
+    def observe(self, battle_id: str, battle_state: dict, actor: str, response: dict) -> None:
+        """
+        Запоминает ответ DM на ход.
+
+        Args:
+            battle_state: Состояние, с которым шёл запрос
+            actor: "player" | "enemy" — чей ход
+            response: Ответ DM (narration и, для хода врага, action)
+        """
+        action = response.get("action") or battle_state.get("last_action")
+        note = RoundNote(
+            round=battle_state["round"],
+            actor_name=battle_state[actor]["name"],
+            action=_describe_action(action),
+            narration=_first_sentence(response.get("narration") or ""),
+        )
+        with self._lock:
+            self._battle(battle_id).observe(note)
+
+    def context(self, battle_id: str) -> str:
+        """Блок контекста для следующего запроса ("" — боя ещё нет в памяти)"""
+        with self._lock:
+            memory = self._battles.get(battle_id)
+            text = memory.render() if memory is not None else ""
+            tokens = estimate_tokens(text)
+            self.calls += 1
+            self.context_tokens_total += tokens
+            self.context_tokens_max = max(self.context_tokens_max, tokens)
+            self.last_context_tokens = tokens
+        return text
+
+    def forget(self, battle_id: str) -> None:
+        with self._lock:
+            self._battles.pop(battle_id, None)
+
+    def stats(self) -> dict:
+        return {
+            "battles": len(self._battles),
+            "calls": self.calls,
+            "context_tokens_mean": self.context_tokens_total / self.calls if self.calls else 0.0,
+            "context_tokens_max": self.context_tokens_max,
+            "context_tokens_last": self.last_context_tokens,
+        }
+
+
+def with_context(messages: list[dict], context: str) -> list[dict]:
+    """
+    Вставляет контекст в начало последнего user-сообщения.
+    Отдельным сообщением нельзя: Perplexity требует чередования user/assistant,
+    а system трогать не хотим — это закэшированный префикс.
+    """
+    if not context:
+        return messages
+    last = messages[-1]
+    return messages[:-1] + [{**last, "content": f"{context}\n\n{last['content']}"}]
@@ -1,6 +1,13 @@
 """Задача: хранить system prompt и собирать messages для Perplexity."""
 import json
 from config.settings import settings
+from services.prompt_templates import (
+    REACT_INSTRUCTIONS,
+    CHOOSE_ENEMY_ACTION_INSTRUCTIONS,
+    ENEMY_TURN_INSTRUCTIONS,
+    render_react,
+    render_enemy_decision,
+)
 
 
 def get_react_to_action_prompt(battle_state: dict, actor: str) -> str:
@@ -89,3 +96,102 @@ def get_choose_enemy_action_prompt(battle_state: dict, allowed_actions: dict) ->
 Только JSON, без лишнего текста.
 """
     return prompt.strip()
+
+
+def get_enemy_turn_prompt(battle_state: dict, allowed_actions: dict) -> str:
+    """
+    Формирует промпт для всего хода врага за один запрос: выбор действия,
+    нарратив и бонусное событие (вместо choose_enemy_action + react_to_action).
+
+    Args:
+        battle_state: Состояние боя
+        allowed_actions: Доступные действия
+
+    Returns:
+        Промпт для LLM
+    """
+    enemy_name = battle_state['enemy']['name']
+    player_name = battle_state['player']['name']
+
+    prompt = f"""
+Ты мастер подземелья. Проведи ход {enemy_name} в этом раунде боя.
+
+Раунд: #{battle_state['round']}
+
+Состояние:
+- {enemy_name}: HP {battle_state['enemy']['current_hp']}/{battle_state['enemy']['max_hp']}, Мана {battle_state['enemy']['current_mana']}/{battle_state['enemy']['max_mana']}
+- {player_name}: HP {battle_state['player']['current_hp']}/{battle_state['player']['max_hp']}, Мана {battle_state['player']['current_mana']}/{battle_state['player']['max_mana']}
+
+Доступные действия:
+{json.dumps(allowed_actions, indent=2, ensure_ascii=False)}
+
+1. Выбери лучшую тактику для {enemy_name} (только из доступных действий).
+2. Драматично опиши действие и его эффект от третьего лица.
+3. Если действие заслуживает дополнительного эффекта (урон, лечение, урон маны), добавь event.
+
+Ответь JSON:
+{{
+    "action": {{
+        "type": "basic_attack" или "cast_spell",
+        "spell_name": "<имя заклинания если cast_spell>"
+    }},
+    "narration": "драматичное описание действия и эффекта (2-3 предложения)",
+    "event": {{
+        "type": "modify_stats",
+        "target": "player",
+        "hp_delta": <число от -{settings.MAX_HP_DELTA} до +{settings.MAX_HP_DELTA}, 0 если нет эффекта>,
+        "mana_delta": <число от -{settings.MAX_MANA_DELTA} до +{settings.MAX_MANA_DELTA}, 0 если нет эффекта>
+    }}
+}}
+
+Только JSON, без лишнего текста.
+"""
+    return prompt.strip()
+
+
+REACT_SYSTEM_PROMPT = "Ты мастер подземелья в D&D. Реагируй на действия персонажей драматично и интересно."
+CHOOSE_ENEMY_ACTION_SYSTEM_PROMPT = "Ты враг в D&D бою. Выбери лучшее действие из доступных."
+ENEMY_TURN_SYSTEM_PROMPT = "Ты мастер подземелья в D&D. Веди ход врага: выбери действие из доступных и опиши его драматично."
+
+
+def build_legacy_messages(kind: str, battle_state: dict, actor: str = "", allowed_actions: dict | None = None) -> list[dict]:
+    """
+    messages в старом формате (короткий system + полный промпт с инструкциями в user).
+    Оставлены для сравнения в tools/bench_prompts.py.
+
+    Args:
+        kind: "react" | "choose" | "turn"
+    """
+    if kind == "react":
+        system, prompt = REACT_SYSTEM_PROMPT, get_react_to_action_prompt(battle_state, actor)
+    elif kind == "choose":
+        system, prompt = CHOOSE_ENEMY_ACTION_SYSTEM_PROMPT, get_choose_enemy_action_prompt(battle_state, allowed_actions)
+    elif kind == "turn":
+        system, prompt = ENEMY_TURN_SYSTEM_PROMPT, get_enemy_turn_prompt(battle_state, allowed_actions)
+    else:
+        raise ValueError(f"Неизвестный вид запроса DM: {kind}")
+    return [{"role": "system", "content": system}, {"role": "user", "content": prompt}]
+
+
+def build_react_messages(battle_state: dict, actor: str) -> list[dict]:
+    """messages для реакции DM на действие: неизменный префикс + срез состояния"""
+    return [
+        {"role": "system", "content": REACT_INSTRUCTIONS},
+        {"role": "user", "content": render_react(battle_state, actor)},
+    ]
+
+
+def build_choose_enemy_action_messages(battle_state: dict, allowed_actions: dict) -> list[dict]:
+    """messages для выбора действия врага"""
+    return [
+        {"role": "system", "content": CHOOSE_ENEMY_ACTION_INSTRUCTIONS},
+        {"role": "user", "content": render_enemy_decision(battle_state, allowed_actions)},
+    ]
+
+
+def build_enemy_turn_messages(battle_state: dict, allowed_actions: dict) -> list[dict]:
+    """messages для хода врага одним запросом"""
+    return [
+        {"role": "system", "content": ENEMY_TURN_INSTRUCTIONS},
+        {"role": "user", "content": render_enemy_decision(battle_state, allowed_actions)},
+    ]
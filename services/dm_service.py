@@ -1,57 +1,191 @@
 """бизнес-логика “мастера”: вызвать PerplexityClient → распарсить JSON → отдать нормализованный dict или None."""
+import threading
+from typing import Any, Callable
+
 from loguru import logger
 from services.perplexity_client import PerplexityClient
-from services.json_protocol import parse_json_object
+from services.json_protocol import parse_json_object, IncrementalJsonScanner
+from services.dm_memory import DungeonMemory, with_context
 from services.dm_prompts import (
-    get_react_to_action_prompt,
-    get_choose_enemy_action_prompt
+    build_react_messages,
+    build_choose_enemy_action_messages,
+    build_enemy_turn_messages
 )
 
 
+class InvalidEnemyTurn(ValueError):
+    """DM ответил на совмещённый ход, но ответ не прошёл validate_enemy_turn"""
+
+
+def validate_enemy_action(parsed: dict | None, allowed_actions: dict) -> dict | None:
+    """
+    Проверяет действие врага из ответа DM против разрешённых действий.
+
+    Args:
+        parsed: Ответ LLM с ключом "action": {"type": ..., "spell_name": ...}
+        allowed_actions: Структура из Battle._get_allowed_actions_for_enemy
+
+    Returns:
+        Нормализованное действие или None, если его нельзя применять
+    """
+    if not isinstance(parsed, dict):
+        return None
+
+    action = parsed.get("action")
+    if not isinstance(action, dict):
+        return None
+
+    action_type = action.get("type")
+    if action_type not in allowed_actions:
+        return None
+
+    if action_type == "cast_spell":
+        allowed_names = {s["name"] for s in allowed_actions["cast_spell"].get("available_spells", [])}
+        if action.get("spell_name") not in allowed_names:
+            return None
+        return {"type": "cast_spell", "spell_name": action["spell_name"]}
+    return {"type": "basic_attack"}
+
+
+def validate_enemy_turn(parsed: dict | None, allowed_actions: dict) -> dict | None:
+    """
+    Проверяет совмещённый ответ хода врага против разрешённых действий.
+
+    Args:
+        parsed: {"action": {...}, "narration": "...", "event": {...}} из LLM
+        allowed_actions: Структура из Battle._get_allowed_actions_for_enemy
+
+    Returns:
+        Нормализованный {"action", "narration", "event"} или None, если ответ нельзя применять
+    """
+    action = validate_enemy_action(parsed, allowed_actions)
+    if action is None:
+        return None
+
+    narration = parsed.get("narration")
+    if not isinstance(narration, str) or not narration:
+        return None
+
+    event = parsed.get("event")
+    if event is not None:
+        if not isinstance(event, dict) or event.get("type") != "modify_stats":
+            return None
+        if event.get("target") not in ("player", "enemy"):
+            return None
+        if not isinstance(event.get("hp_delta", 0), int) or not isinstance(event.get("mana_delta", 0), int):
+            return None
+
+    return {"action": action, "narration": narration, "event": event}
+
+
 class DungeonMasterService:
     """
     Сервис Dungeon Master'а — управляет реакциями LLM на боевые действия.
     """
 
-    def __init__(self, client: PerplexityClient):
+    def __init__(self, client: PerplexityClient, memory: DungeonMemory | None = None):
+        """
+        :param client: HTTP-клиент LLM
+        :param memory: Память боя (последние раунды + сводка); None — каждый запрос без истории
+        """
         self.client = client
+        self.memory = memory
         logger.info("DungeonMasterService инициализирован")
 
-    def react_to_action(self, battle_state: dict, actor: str) -> dict | None:
+    def close(self) -> None:
+        """Закрывает пул соединений клиента"""
+        self.client.close()
+
+    def __enter__(self) -> "DungeonMasterService":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def is_available(self) -> bool:
+        """False, пока circuit breaker клиента разомкнут — бой сразу берёт локальный fallback"""
+        return self.client.is_available()
+
+    def _with_memory(self, messages: list[dict], battle_id: str | None) -> list[dict]:
+        """Добавляет в запрос контекст боя, если память включена"""
+        if self.memory is None or battle_id is None:
+            return messages
+        return with_context(messages, self.memory.context(battle_id))
+
+    def remember(self, battle_id: str | None, battle_state: dict, actor: str, response: dict | None) -> None:
+        """Кладёт ответ DM в память боя (зовёт и кэш, когда отвечает без нас)"""
+        if self.memory is not None and battle_id is not None and isinstance(response, dict):
+            self.memory.observe(battle_id, battle_state, actor, response)
+
+    def end_battle(self, battle_id: str) -> None:
+        """Бой закончен — его память больше не нужна"""
+        if self.memory is not None:
+            self.memory.forget(battle_id)
+
+    def react_to_action(self, battle_state: dict, actor: str, battle_id: str | None = None) -> dict | None:
         """
         Реагирует на действие игрока или врага.
 
         Args:
             battle_state: Состояние боя (round, player, enemy, last_action)
             actor: "player" или "enemy" — кто совершил действие
+            battle_id: Бой, чью память подмешать в запрос
 
         Returns:
             {"narration": "...", "event": {...}} или None если ошибка
         """
-        prompt = get_react_to_action_prompt(battle_state, actor)
-
-        messages = [
-            {
-                "role": "system",
-                "content": "Ты мастер подземелья в D&D. Реагируй на действия персонажей драматично и интересно."
-            },
-            {
-                "role": "user",
-                "content": prompt
-            }
-        ]
+        messages = self._with_memory(build_react_messages(battle_state, actor), battle_id)
 
         response = self.client.chat(messages, max_tokens=300)
 
         if not response:
             return None
 
-        return parse_json_object(response)
+        parsed = parse_json_object(response)
+        self.remember(battle_id, battle_state, actor, parsed)
+        return parsed
+
+    def react_to_action_stream(
+            self,
+            battle_state: dict,
+            actor: str,
+            on_narration: Callable[[str], None],
+            on_object: Callable[[str, Any], None] | None = None,
+            battle_id: str | None = None,
+    ) -> dict | None:
+        """
+        Как react_to_action, но нарратив отдаётся по кусочкам, пока ответ ещё идёт.
+
+        Args:
+            on_narration: Вызывается с каждым новым куском narration
+            on_object: Вызывается с (ключ, объект), как только закрылся event/другой объект
+
+        Returns:
+            Полный {"narration": "...", "event": {...}} или None если ошибка
+        """
+        messages = self._with_memory(build_react_messages(battle_state, actor), battle_id)
+        scanner = IncrementalJsonScanner(stream_keys=("narration",))
+
+        for chunk in self.client.chat_stream(messages, max_tokens=300):
+            for kind, key, value in scanner.feed(chunk):
+                if kind == "text":
+                    on_narration(value)
+                elif on_object is not None:
+                    on_object(key, value)
+
+        if not scanner.text:
+            return None
+
+        parsed = parse_json_object(scanner.text)
+        self.remember(battle_id, battle_state, actor, parsed)
+        return parsed
 
     def choose_enemy_action(
             self,
             battle_state: dict,
-            allowed_actions: dict
+            allowed_actions: dict,
+            battle_id: str | None = None,
+            cancel: threading.Event | None = None,
     ) -> dict | None:
         """
         Выбирает действие для врага.
@@ -59,24 +193,16 @@ class DungeonMasterService:
         Args:
             battle_state: Состояние боя
             allowed_actions: Доступные действия {"basic_attack": {}, "cast_spell": {...}}
+            battle_id: Бой, чью память подмешать в запрос
+            cancel: Выставленное событие прерывает запрос (спекуляция, которая не пригодилась)
 
         Returns:
             {"action": {...}, "narration": "..."} или None если ошибка
         """
-        prompt = get_choose_enemy_action_prompt(battle_state, allowed_actions)
-
-        messages = [
-            {
-                "role": "system",
-                "content": "Ты враг в D&D бою. Выбери лучшее действие из доступных."
-            },
-            {
-                "role": "user",
-                "content": prompt
-            }
-        ]
+        # В память не пишем: этот ход ещё опишет react_to_action
+        messages = self._with_memory(build_choose_enemy_action_messages(battle_state, allowed_actions), battle_id)
 
-        response = self.client.chat(messages, max_tokens=200)
+        response = self.client.chat(messages, max_tokens=200, cancel=cancel)
 
         if not response:
             return None
@@ -90,3 +216,46 @@ class DungeonMasterService:
             )
 
         return parsed
+
+    def play_enemy_turn(
+            self,
+            battle_state: dict,
+            allowed_actions: dict,
+            battle_id: str | None = None,
+            cancel: threading.Event | None = None,
+    ) -> dict | None:
+        """
+        Весь ход врага одним запросом: действие + нарратив + бонусное событие.
+
+        Args:
+            battle_state: Состояние боя
+            allowed_actions: Доступные действия {"basic_attack": {}, "cast_spell": {...}}
+            battle_id: Бой, чью память подмешать в запрос
+            cancel: Выставленное событие прерывает запрос (спекуляция, которая не пригодилась)
+
+        Returns:
+            {"action": {...}, "narration": "...", "event": {...} | None} или None, если ответа нет
+            (таймаут, сеть, breaker) — тогда повторять ход другими запросами бессмысленно
+
+        Raises:
+            InvalidEnemyTurn: Ответ пришёл, но не прошёл validate_enemy_turn (нужен двухзапросный fallback)
+        """
+        messages = self._with_memory(build_enemy_turn_messages(battle_state, allowed_actions), battle_id)
+
+        response = self.client.chat(messages, max_tokens=350, cancel=cancel)
+
+        if not response:
+            return None
+
+        validated = validate_enemy_turn(parse_json_object(response), allowed_actions)
+
+        if validated is None:
+            logger.warning("Совмещённый ход врага не прошёл валидацию")
+            raise InvalidEnemyTurn(response)
+
+        logger.info(
+            f"Enemy turn: {validated['action']['type']} | "
+            f"Narration: {validated['narration']}"
+        )
+        self.remember(battle_id, battle_state, "enemy", validated)
+        return validated
@@ -68,6 +68,114 @@ def clamp_int(value: int, min_val: int, max_val: int) -> int:
     return max(min_val, min(value, max_val))
 
 
+class IncrementalJsonScanner:
+    """
+    Потоковый разбор ответа LLM по мере прихода кусков (SSE-дельт).
+
+    Отдаёт события, не дожидаясь конца ответа:
+      ("text", key, piece)  — очередной кусок строкового значения верхнего уровня
+                               из stream_keys (например, narration) — можно сразу печатать
+      ("object", key, obj)  — вложенный объект/массив верхнего уровня (event, action),
+                               как только закрылась его скобка
+
+    Markdown-обёртка ```json ... ``` и текст до первой "{" пропускаются.
+    Полный ответ для parse_json_object — в self.text.
+    """
+
+    def __init__(self, stream_keys: tuple[str, ...] = ("narration",)):
+        self.stream_keys = stream_keys
+        self.text = ""
+        self._pos = 0  # сколько символов self.text уже разобрано
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._expect_key = False
+        self._string_start = 0
+        self._current_key: str | None = None
+        self._value_start: int | None = None  # начало вложенного значения (depth 1 -> 2)
+        self._streamed = 0  # сколько символов строкового значения уже отдано
+        self._streaming = False
+
+    def feed(self, chunk: str) -> list[tuple]:
+        """Добавляет кусок ответа и возвращает новые события"""
+        self.text += chunk
+        events: list[tuple] = []
+        text = self.text
+
+        while self._pos < len(text):
+            ch = text[self._pos]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    self._close_string(events)
+                self._pos += 1
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                self._string_start = self._pos + 1
+                self._streaming = (
+                    self._depth == 1 and not self._expect_key and self._current_key in self.stream_keys
+                )
+                self._streamed = 0
+            elif ch in "{[":
+                if self._depth == 1 and not self._expect_key:
+                    self._value_start = self._pos
+                self._depth += 1
+                if self._depth == 1:
+                    self._expect_key = True
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 1 and self._value_start is not None:
+                    raw = text[self._value_start:self._pos + 1]
+                    self._value_start = None
+                    try:
+                        events.append(("object", self._current_key, json.loads(raw)))
+                    except json.JSONDecodeError:
+                        pass
+            elif ch == "," and self._depth == 1:
+                self._expect_key = True
+            elif ch == ":" and self._depth == 1:
+                self._expect_key = False
+            self._pos += 1
+
+        # Строка narration ещё не закрыта — отдаём уже пришедший безопасный префикс
+        if self._in_string and self._streaming:
+            self._emit_text(events, text[self._string_start:self._pos], final=False)
+
+        return events
+
+    def _close_string(self, events: list[tuple]) -> None:
+        raw = self.text[self._string_start:self._pos]
+        if self._depth == 1 and self._expect_key:
+            try:
+                self._current_key = json.loads(f'"{raw}"')
+            except json.JSONDecodeError:
+                self._current_key = raw
+        elif self._streaming:
+            self._emit_text(events, raw, final=True)
+            self._streaming = False
+
+    def _emit_text(self, events: list[tuple], raw: str, final: bool) -> None:
+        if not final:
+            # Не режем escape-последовательность пополам: отступаем до последнего "\\"
+            backslash = raw.rfind("\\")
+            if backslash != -1 and len(raw) - backslash <= 6:
+                raw = raw[:backslash]
+        try:
+            decoded = json.loads(f'"{raw}"')
+        except json.JSONDecodeError:
+            return
+        if len(decoded) > self._streamed:
+            events.append(("text", self._current_key, decoded[self._streamed:]))
+            self._streamed = len(decoded)
+
+
 if __name__ == "__main__":
     # Тест 1: валидный JSON
     test1 = parse_json_object('{"narration": "test", "event": null}')
@@ -84,3 +192,13 @@ if __name__ == "__main__":
     # Тест 4: clamp_int с отрицательным
     test4 = clamp_int(-5, 0, 100)
     print(f"✅ Тест 4: clamp_int(-5, 0, 100) = {test4}")
+
+    # Тест 5: потоковый разбор по кусочку в 3 символа
+    raw5 = '```json\n{"narration": "Огонь \\"жжёт\\" \\u2014 всё", "event": {"type": "modify_stats", "hp_delta": -3}}\n```'
+    scanner = IncrementalJsonScanner()
+    events5 = []
+    for i in range(0, len(raw5), 3):
+        events5.extend(scanner.feed(raw5[i:i + 3]))
+    narration5 = "".join(e[2] for e in events5 if e[0] == "text")
+    objects5 = [e for e in events5 if e[0] == "object"]
+    print(f"✅ Тест 5: {narration5!r}, {objects5}, итог: {parse_json_object(scanner.text)}")
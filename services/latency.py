@@ -0,0 +1,103 @@
+"""Замеры задержки HTTP-запросов: connect / time-to-first-byte / total"""
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+
+
+@dataclass
+class RequestLatency:
+    """Разбивка одного запроса (секунды)"""
+    connect_s: float = 0.0  # TCP + TLS; 0 если соединение взято из пула
+    ttfb_s: float = 0.0  # от отправки до получения заголовков ответа
+    total_s: float = 0.0  # до конца тела ответа
+    first_token_s: float = 0.0  # до первого куска текста (только для стриминга)
+    reused_connection: bool = True
+
+
+class LatencyTracer:
+    """
+    Колбэк для httpx extensions={"trace": ...}.
+    httpcore зовёт его с событиями вида "connection.connect_tcp.started".
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.latency = RequestLatency()
+        self._connect_started: float | None = None
+
+    def __call__(self, event_name: str, info: dict) -> None:
+        now = time.perf_counter()
+        if event_name == "connection.connect_tcp.started":
+            self._connect_started = now
+            self.latency.reused_connection = False
+        elif event_name in ("connection.connect_tcp.complete", "connection.start_tls.complete"):
+            if self._connect_started is not None:
+                self.latency.connect_s = now - self._connect_started
+        elif event_name.endswith("receive_response_headers.complete"):
+            self.latency.ttfb_s = now - self.started
+
+    def mark_first_token(self) -> None:
+        if not self.latency.first_token_s:
+            self.latency.first_token_s = time.perf_counter() - self.started
+
+    def finish(self) -> RequestLatency:
+        self.latency.total_s = time.perf_counter() - self.started
+        return self.latency
+
+
+class AsyncLatencyTracer(LatencyTracer):
+    """То же для httpx.AsyncClient: там trace-колбэк обязан быть корутиной"""
+
+    async def __call__(self, event_name: str, info: dict) -> None:
+        super().__call__(event_name, info)
+
+
+class LatencyStats:
+    """
+    Скользящее окно последних замеров с перцентилями.
+    Пишут в него параллельные запросы (хеджи, спекуляция), поэтому чтение идёт по снимку окна.
+    """
+
+    def __init__(self, window: int = 1000):
+        self.samples: deque[RequestLatency] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def add(self, latency: RequestLatency) -> None:
+        with self._lock:
+            self.samples.append(latency)
+
+    def snapshot(self) -> list[RequestLatency]:
+        """Копия окна: обход deque во время append из другого потока падает с RuntimeError"""
+        with self._lock:
+            return list(self.samples)
+
+    def __len__(self) -> int:
+        return len(self.samples)
+
+    @staticmethod
+    def _percentile(values: list[float], q: float) -> float:
+        if not values:
+            return 0.0
+        ordered = sorted(values)
+        index = min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def percentile(self, q: float, field: str = "total_s") -> float:
+        return self._percentile([getattr(s, field) for s in self.snapshot()], q)
+
+    def summary(self) -> dict:
+        """Средние и p50/p95/p99 по каждой фазе (в миллисекундах)"""
+        samples = self.snapshot()
+        result: dict = {"requests": len(samples)}
+        if not samples:
+            return result
+
+        result["new_connections"] = sum(1 for s in samples if not s.reused_connection)
+        for field in ("connect_s", "ttfb_s", "total_s"):
+            values = [getattr(s, field) for s in samples]
+            name = field.removesuffix("_s")
+            result[f"{name}_mean_ms"] = 1000 * sum(values) / len(values)
+            for q in (50, 95, 99):
+                result[f"{name}_p{q}_ms"] = 1000 * self._percentile(values, q)
+        return result
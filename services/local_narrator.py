@@ -0,0 +1,282 @@
+"""
+Локальный нарратив и дедлайн для реакции DM.
+
+LocalNarrator собирает описание хода по шаблонной грамматике (актор, спелл, SpellType,
+сила удара, доли HP) за микросекунды и без сети. NarrationRacer запускает
+react_to_action и ждёт его не дольше дедлайна: не успел — игрок сразу видит локальный
+текст, а опоздавший ответ LLM выбрасывается или кладётся в кэш DM на будущее.
+"""
+import queue
+import random
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Callable
+
+from loguru import logger
+
+from domain.enums.spell_type import SpellType
+from services.dm_cache import CachedDungeonMasterService
+
+# <правило> раскрывается в одну из своих альтернатив, {слот} — в значение из боя
+GRAMMAR: dict[str, tuple[str, ...]] = {
+    "turn": (
+        "<opener> <act>. <impact> <state>.",
+        "<act_lead>. <impact> <state>.",
+    ),
+    "opener": (
+        "{actor}",
+        "Не медля, {actor}",
+        "С яростным криком {actor}",
+        "Собрав волю в кулак, {actor}",
+        "Выждав момент, {actor}",
+    ),
+    "act_lead": (
+        "<opener> <act>",
+        "Воздух дрожит — <opener_lower> <act>",
+    ),
+    "opener_lower": ("{actor}", "и вот {actor}", "тут же {actor}"),
+    "act_basic": (
+        "бросается вперёд с оружием",
+        "наносит размашистый удар",
+        "бьёт наотмашь",
+    ),
+    "act_damage": (
+        "обрушивает {spell} на противника",
+        "выпускает {spell}",
+        "сплетает {spell} и швыряет во врага",
+    ),
+    "act_heal": (
+        "шепчет {spell}, и раны затягиваются",
+        "призывает {spell} — тепло разливается по телу",
+    ),
+    "act_mana": (
+        "направляет {spell} в противника",
+        "опутывает противника чарами {spell}",
+    ),
+    "impact_weak": ("Удар лишь царапает цель.", "Выходит скорее предупреждение, чем удар."),
+    "impact_solid": ("Удар достигает цели.", "Попадание точное."),
+    "impact_crushing": ("Сокрушительная мощь сотрясает арену!", "Арена содрогается от удара!"),
+    "impact_heal": ("Силы возвращаются.", "Дыхание выравнивается."),
+    "impact_mana": ("Магия противника вздрагивает.", "Чужие чары дают трещину."),
+    "state_fresh": ("{target} всё ещё полон сил", "{target} даже не пошатнулся"),
+    "state_worn": ("{target} заметно измотан", "{target} тяжело дышит"),
+    "state_low": ("{target} едва держится на ногах", "{target} из последних сил стоит"),
+    "state_critical": ("{target} на волоске от гибели", "ещё удар — и {target} падёт"),
+    "state_down": ("{target} падает замертво", "{target} больше не поднимется"),
+}
+
+_TOKEN = re.compile(r"<(\w+)>")
+_SENTENCE_START = re.compile(r"(^|[.!?] )(\w)")
+
+
+def _compile(grammar: dict[str, tuple[str, ...]]) -> dict[str, list[list[tuple[bool, str]]]]:
+    """Разбирает альтернативы один раз: [(это правило?, текст), ...]"""
+    compiled = {}
+    for rule, alternatives in grammar.items():
+        compiled[rule] = []
+        for alternative in alternatives:
+            parts = _TOKEN.split(alternative)
+            # split с группой: чётные индексы — текст, нечётные — имена правил
+            compiled[rule].append([(i % 2 == 1, part) for i, part in enumerate(parts) if part])
+    return compiled
+
+
+class LocalNarrator:
+    """Процедурный нарратив хода без LLM"""
+
+    def __init__(self, seed: int | None = None, grammar: dict[str, tuple[str, ...]] = GRAMMAR):
+        self.rng = random.Random(seed)
+        self._rules = _compile(grammar)
+
+    def _expand(self, rule: str, aliases: dict[str, str], out: list[str]) -> None:
+        alternatives = self._rules[aliases.get(rule, rule)]
+        for is_rule, text in alternatives[self.rng.randrange(len(alternatives))]:
+            if is_rule:
+                self._expand(text, aliases, out)
+            else:
+                out.append(text)
+
+    def narrate(self, battle_state: dict, actor: str, spell_type: SpellType | None = None, power: int = 0) -> str:
+        """
+        Описание хода по уже применённому действию.
+
+        Args:
+            battle_state: Состояние после хода (как в запросе к DM)
+            actor: "player" | "enemy"
+            spell_type: Тип заклинания (None — базовая атака)
+            power: Сила удара/заклинания
+        """
+        opponent = "enemy" if actor == "player" else "player"
+        # лечение цели не выбирает: речь о самом акторе
+        target_side = actor if spell_type == SpellType.HEAL else opponent
+        target = battle_state[target_side]
+
+        if spell_type == SpellType.HEAL:
+            act, impact = "act_heal", "impact_heal"
+        elif spell_type == SpellType.MANA:
+            act, impact = "act_mana", "impact_mana"
+        else:
+            act = "act_basic" if spell_type is None else "act_damage"
+            impact = "impact_weak" if power < 10 else "impact_solid" if power < 30 else "impact_crushing"
+
+        hp_fraction = target["current_hp"] / target["max_hp"] if target["max_hp"] else 0.0
+        if target["current_hp"] <= 0:
+            state = "state_down"
+        elif hp_fraction > 0.75:
+            state = "state_fresh"
+        elif hp_fraction > 0.4:
+            state = "state_worn"
+        elif hp_fraction > 0.15:
+            state = "state_low"
+        else:
+            state = "state_critical"
+
+        out: list[str] = []
+        self._expand("turn", {"act": act, "impact": impact, "state": state}, out)
+        spell_name = (battle_state.get("last_action") or {}).get("spell_name") or ""
+        text = "".join(out).format(actor=battle_state[actor]["name"], spell=spell_name, target=target["name"])
+        return _SENTENCE_START.sub(lambda m: m.group(1) + m.group(2).upper(), text)
+
+
+_STREAM_DONE = object()
+
+
+class NarrationRacer:
+    """
+    Реакция DM наперегонки с дедлайном.
+    Событие (бонусный урон/хил) из опоздавшего ответа не применяется никогда — ход уже показан.
+    Запрос уходит без battle_id: в память боя попадает только показанный ответ DM.
+    """
+
+    def __init__(self, dm, deadline_s: float = 1.5, max_workers: int = 4):
+        """
+        :param dm: DungeonMasterService или CachedDungeonMasterService
+        :param deadline_s: Сколько ждать DM за ход
+        """
+        self.dm = dm
+        self.deadline_s = deadline_s
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="dm-deadline")
+        self._lock = threading.Lock()
+
+        self.calls = 0
+        self.dm_on_time = 0
+        self.deadline_fired = 0
+        self.dm_failed = 0
+        self.late_cached = 0
+        self.late_discarded = 0
+        self._local_time_s = 0.0
+        self._local_calls = 0
+
+    def _local(self, local: Callable[[], str]) -> dict:
+        """Локальный нарратив в формате ответа DM"""
+        started = time.perf_counter()
+        narration = local()
+        with self._lock:
+            self._local_time_s += time.perf_counter() - started
+            self._local_calls += 1
+        return {"narration": narration, "event": None}
+
+    def _late(self, future: Future) -> None:
+        """Опоздавший ответ: кэш DM уже положил его к себе сам, без кэша он пропадает"""
+        response = None if future.cancelled() or future.exception() else future.result()
+        with self._lock:
+            if isinstance(response, dict) and isinstance(self.dm, CachedDungeonMasterService):
+                self.late_cached += 1
+            else:
+                self.late_discarded += 1
+
+    def _deadline(self, future: Future, local: Callable[[], str]) -> dict:
+        with self._lock:
+            self.deadline_fired += 1
+        future.add_done_callback(self._late)
+        return self._local(local)
+
+    def _on_time(self, response: dict | None, local: Callable[[], str], battle_state: dict, actor: str,
+                 battle_id: str | None) -> tuple[dict, str]:
+        if response:
+            with self._lock:
+                self.dm_on_time += 1
+            self.dm.remember(battle_id, battle_state, actor, response)
+            return response, "dm"
+        with self._lock:
+            self.dm_failed += 1
+        return self._local(local), "fallback"
+
+    def react(
+            self,
+            battle_state: dict,
+            actor: str,
+            local: Callable[[], str],
+            battle_id: str | None = None,
+    ) -> tuple[dict, str]:
+        """
+        Args:
+            local: Локальный нарратив на случай дедлайна или ошибки DM (зовётся лениво)
+            battle_id: Бой, в память которого записать ответ DM, если он успел и показан
+
+        Returns:
+            (ответ в формате DM, источник: "dm" | "deadline" | "fallback")
+        """
+        with self._lock:
+            self.calls += 1
+        future = self._executor.submit(self.dm.react_to_action, battle_state, actor)
+        try:
+            response = future.result(timeout=self.deadline_s)
+        except FutureTimeoutError:
+            return self._deadline(future, local), "deadline"
+        return self._on_time(response, local, battle_state, actor, battle_id)
+
+    def react_stream(
+            self,
+            battle_state: dict,
+            actor: str,
+            on_narration: Callable[[str], None],
+            local: Callable[[], str],
+            battle_id: str | None = None,
+    ) -> tuple[dict, str]:
+        """
+        Как react, но дедлайн — на первый кусок нарратива: начал приходить вовремя —
+        дочитываем поток, нет — показываем локальный текст целиком.
+        """
+        with self._lock:
+            self.calls += 1
+        chunks: queue.SimpleQueue = queue.SimpleQueue()
+        future = self._executor.submit(self.dm.react_to_action_stream, battle_state, actor, chunks.put)
+        future.add_done_callback(lambda f: chunks.put(_STREAM_DONE))
+
+        try:
+            chunk = chunks.get(timeout=self.deadline_s)
+        except queue.Empty:
+            response = self._deadline(future, local)
+            on_narration(response["narration"])
+            return response, "deadline"
+
+        streamed = False
+        while chunk is not _STREAM_DONE:
+            streamed = True
+            on_narration(chunk)
+            chunk = chunks.get()
+
+        response, source = self._on_time(future.result(), local, battle_state, actor, battle_id)
+        if source == "fallback" and not streamed:
+            on_narration(response["narration"])
+        return response, source
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "dm_on_time": self.dm_on_time,
+            "deadline_fired": self.deadline_fired,
+            "dm_failed": self.dm_failed,
+            "fired_rate": self.deadline_fired / self.calls if self.calls else 0.0,
+            "late_cached": self.late_cached,
+            "late_discarded": self.late_discarded,
+            "local_mean_us": 1e6 * self._local_time_s / self._local_calls if self._local_calls else 0.0,
+        }
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        if self.calls:
+            logger.debug(f"Дедлайн нарратива: {self.stats()}")
@@ -1,69 +1,457 @@
 """синхронно отправить запрос в Perplexity и вернуть сырой content (строку) или None"""
+import importlib.util
 import json
 import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Callable, Iterable, Iterator
 
 import httpx
 from loguru import logger
 
+from services.cassette import Cassette
+from services.latency import LatencyStats, LatencyTracer, RequestLatency
+from services.resilience import AdaptiveTimeout, CircuitBreaker, RetryPolicy, parse_retry_after
+from services.token_usage import TokenUsage, UsageStats
+
+PERPLEXITY_URL = "https://api.perplexity.ai/chat/completions"
+
+
+def auth_headers(api_key: str | None) -> dict:
+    return {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json",
+    }
+
+
+def build_payload(model: str, message: list[dict], max_tokens: int) -> dict:
+    return {
+        "model": model,
+        "messages": message,
+        "max_tokens": max_tokens,
+        "temperature": 0.7,
+    }
+
+
+def extract_content(data: dict) -> str:
+    """Извлекает текст ответа по пути: choices -> первый элемент -> message -> content"""
+    return data["choices"][0]["message"]["content"]
+
+
+@dataclass
+class AttemptOutcome:
+    """Итог одной попытки запроса"""
+    content: str | None = None
+    failed: bool = False  # провайдер не справился (считается в circuit breaker)
+    retryable: bool = False  # имеет смысл повторить (таймаут, сеть, 429, 5xx)
+    retry_after_s: float | None = None
+    cancelled: bool = False  # запрос отменили (ответ больше не нужен) — не успех и не ошибка провайдера
+
 
 class PerplexityClient:
-    def __init__(self, model: str = "sonar", timeout_s: int = 10):
+    """
+    Клиент держит долгоживущий пул соединений: TCP/TLS поднимаются один раз,
+    дальше запросы DM идут по keep-alive. Закрывать через close() или with.
+
+    Хвостовые задержки: таймаут подстраивается под наблюдаемый p99, медленный запрос
+    можно продублировать после p95 (hedge), ошибки повторяются с джиттером и уважением
+    Retry-After, а circuit breaker при нездоровом провайдере сразу возвращает None,
+    чтобы бой ушёл в локальный fallback.
+    """
+
+    def __init__(
+            self,
+            model: str = "sonar",
+            timeout_s: int = 10,
+            base_url: str = PERPLEXITY_URL,
+            max_connections: int = 10,
+            max_keepalive_connections: int = 5,
+            keepalive_expiry_s: float = 60.0,
+            http2: bool = False,
+            adaptive_timeout: bool = True,
+            min_timeout_s: float = 1.0,
+            hedge: bool = False,
+            retry: RetryPolicy | None = None,
+            breaker: CircuitBreaker | None = None,
+            cassette: Cassette | None = None,
+    ):
+        """
+        :param timeout_s: Потолок таймаута (и таймаут, пока нет статистики)
+        :param base_url: Эндпоинт chat completions (можно подменить локальным стендом)
+        :param max_connections: Максимум одновременных соединений в пуле
+        :param max_keepalive_connections: Сколько простаивающих соединений держать открытыми
+        :param keepalive_expiry_s: Через сколько секунд простоя закрывать соединение
+        :param http2: Включить HTTP/2 (нужен пакет h2, иначе остаёмся на HTTP/1.1)
+        :param adaptive_timeout: Таймаут из p99 наблюдаемых задержек вместо фиксированного
+        :param min_timeout_s: Нижняя граница адаптивного таймаута
+        :param hedge: Дублировать запрос, если он не ответил за p95
+        :param retry: Политика повторов (по умолчанию 3 попытки)
+        :param breaker: Circuit breaker (по умолчанию 5 ошибок подряд → пауза 30 с)
+        :param cassette: Запись ответов в кассету или воспроизведение из неё без сети
+        """
         self.api_key = os.getenv("PERPLEXITY_API_KEY")
         self.model = model
         self.timeout_s = timeout_s
-        self.base_url = "https://api.perplexity.ai/chat/completions"
+        self.base_url = base_url
+        self.latency_stats = LatencyStats()
+        self.last_latency: RequestLatency | None = None
+        self.usage_stats = UsageStats()
+        self.last_usage: TokenUsage | None = None
+        self.timeouts = AdaptiveTimeout(
+            self.latency_stats,
+            min_s=min_timeout_s if adaptive_timeout else timeout_s,
+            max_s=timeout_s,
+        )
+        self.hedge = hedge
+        self.retry = retry or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker()
+        self.hedged_requests = 0
+        self.hedge_wins = 0
+        self.cancelled_requests = 0
+        self.cassette = cassette
+        self._hedge_executor = ThreadPoolExecutor(thread_name_prefix="llm-hedge") if hedge else None
 
-        if not self.api_key:
+        if not self.api_key and not (cassette and cassette.replaying):
             logger.warning("PERPLEXITY_API_KEY не найден в .env")
 
-    def chat(self, message: list[dict], max_tokens: int = 300) -> str | None:
-        """Отправляет запрос к LLM и возвращает ответ"""
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-        }
+        if http2 and importlib.util.find_spec("h2") is None:
+            logger.warning("HTTP/2 недоступен (pip install httpx[http2]), используем HTTP/1.1")
+            http2 = False
 
-        payload = {
-            "model": self.model,
-            "messages": message,
-            "max_tokens": max_tokens,
-            "temperature": 0.7,
-        }
+        self._http = httpx.Client(
+            timeout=timeout_s,
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry_s,
+            ),
+            headers=auth_headers(self.api_key),
+        )
+
+    def close(self) -> None:
+        """Закрывает пул соединений"""
+        if self._hedge_executor is not None:
+            self._hedge_executor.shutdown(wait=False, cancel_futures=True)
+        self._http.close()
+        if self.cassette is not None:
+            self.cassette.close()
+
+    def __enter__(self) -> "PerplexityClient":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def _record_usage(self, usage: TokenUsage | None) -> None:
+        """Токены из usage ответа (провайдеры без usage просто не попадают в статистику)"""
+        if usage is not None:
+            self.last_usage = usage
+            self.usage_stats.add(usage)
+
+    def is_available(self) -> bool:
+        """False, пока circuit breaker разомкнут — звать API бессмысленно"""
+        return not self.breaker.is_open
+
+    @staticmethod
+    def _status_failure(response: httpx.Response) -> AttemptOutcome | None:
+        """429/5xx — повторяемая ошибка провайдера; остальные 4XX поднимают HTTPStatusError"""
+        if response.status_code == 429 or response.status_code >= 500:
+            logger.warning(f"API ответил {response.status_code}")
+            return AttemptOutcome(
+                failed=True,
+                retryable=True,
+                retry_after_s=parse_retry_after(response.headers.get("Retry-After")),
+            )
+        response.raise_for_status()
+        return None
+
+    def _read_cancellable(self, payload: dict, timeout_s: float, tracer: LatencyTracer,
+                          cancel: threading.Event) -> tuple[str | None, AttemptOutcome | None]:
+        """
+        Запрос стримом, чтобы его можно было бросить на полпути: закрытие ответа рвёт
+        соединение, и провайдер перестаёт генерировать (и списывать) токены. Проверка
+        идёт между кусками ответа: до первого токена запрос всё равно ждёт провайдера.
+
+        Returns:
+            (текст, None) или (None, итог попытки: ошибка статуса или отмена)
+        """
+        pieces = []
+        with self._http.stream(
+                "POST", self.base_url, json={**payload, "stream": True}, timeout=timeout_s,
+                extensions={"trace": tracer},
+        ) as response:
+            failure = self._status_failure(response)
+            if failure is not None:
+                return None, failure
+            for delta in iter_sse_content(response.iter_lines(), on_usage=self._record_usage):
+                if cancel.is_set():
+                    break
+                tracer.mark_first_token()
+                pieces.append(delta)
+        if cancel.is_set():
+            self.cancelled_requests += 1
+            return None, AttemptOutcome(cancelled=True)
+        return "".join(pieces), None
+
+    def _post_once(self, payload: dict, timeout_s: float, cancel: threading.Event | None = None) -> AttemptOutcome:
+        """Одна попытка запроса без повторов (cancel — прервать, если ответ стал не нужен)"""
+        tracer = LatencyTracer()
 
         try:
-            with httpx.Client(timeout=self.timeout_s) as client:
-                # отправляем запрос и принимаем ответ - client.post()
-                response = client.post(self.base_url, headers=headers, json=payload)
+            if cancel is None:
+                # отправляем запрос по соединению из пула и принимаем ответ
+                response = self._http.post(
+                    self.base_url, json=payload, timeout=timeout_s, extensions={"trace": tracer}
+                )
+                failure = self._status_failure(response)
+                if failure is not None:
+                    return failure
 
-                # Вызовет исключение для 4XX/5XX ответов
-                response.raise_for_status()
+                # Десериализуем JSON и извлекаем текст ответа
+                data = response.json()
+                content = extract_content(data)
+                self._record_usage(TokenUsage.from_response(data))
+            else:
+                content, outcome = self._read_cancellable(payload, timeout_s, tracer, cancel)
+                if outcome is not None:
+                    return outcome
 
-                # Десериализуем JSON и извлекаем текст ответа по пути: choices -> первый элемент -> message -> content
-                content = response.json()["choices"][0]["message"]["content"]
+            self.last_latency = tracer.finish()
+            self.latency_stats.add(self.last_latency)
 
-                if not content:
-                    logger.warning("Пустой ответ от API")
-                    return None
+            if not content:
+                logger.warning("Пустой ответ от API")
+                return AttemptOutcome()
 
-                return content
+            return AttemptOutcome(content=content)
 
         except httpx.TimeoutException:
-            logger.error(f"Таймаут ({self.timeout_s} сек) при запросе к API")
-            return None
+            logger.error(f"Таймаут ({timeout_s:.1f} сек) при запросе к API")
+            # Цензурированный замер: иначе после замедления провайдера таймаут не вырастет никогда
+            self.latency_stats.add(RequestLatency(ttfb_s=timeout_s, total_s=timeout_s))
+            return AttemptOutcome(failed=True, retryable=True)
+
+        except httpx.TransportError as e:
+            logger.error(f"Сетевая ошибка: {e}")
+            return AttemptOutcome(failed=True, retryable=True)
+
+        except httpx.HTTPStatusError as e:
+            # 401/403/404 и прочие 4XX: ответа нет, и повтор того же запроса его не даст
+            logger.error(f"Ошибка запроса: {e}")
+            return AttemptOutcome(failed=True, retryable=False)
 
         except (json.JSONDecodeError, KeyError, IndexError) as e:
             logger.error(f"Ошибка парсинга ответа: {e}")
-            return None
+            return AttemptOutcome(failed=True)
 
         except Exception as e:
             logger.error(f"Ошибка: {e}")
+            return AttemptOutcome(failed=True)
+
+    def _send(self, payload: dict, timeout_s: float, cancel: threading.Event | None = None) -> AttemptOutcome:
+        """
+        Попытка с хеджированием: если ответа нет дольше p95, уходит второй такой же
+        запрос, берётся первый успешный. У каждого из двух — своё событие отмены, и оба
+        читаются стримом (_read_cancellable): проигравшему событие выставляется, он рвёт
+        соединение на следующем куске ответа, и провайдер перестаёт генерировать токены.
+        Отменяемые запросы (cancel) не хеджируются: это фоновая спекуляция, дубль только удвоит расход.
+        """
+        if cancel is not None:
+            return self._post_once(payload, timeout_s, cancel)
+        hedge_delay = self.timeouts.hedge_delay() if self._hedge_executor is not None else None
+        if hedge_delay is None:
+            return self._post_once(payload, timeout_s)
+
+        cancels = {}
+        primary = self._submit_attempt(payload, timeout_s, cancels)
+        done, _ = wait([primary], timeout=hedge_delay)
+        if done:
+            return primary.result()
+
+        self.hedged_requests += 1
+        backup = self._submit_attempt(payload, timeout_s, cancels)
+        pending = {primary, backup}
+        outcome = AttemptOutcome(failed=True, retryable=True)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                outcome = future.result()
+                if not outcome.failed:
+                    for loser in pending:
+                        # ещё в очереди — не стартует; уже идёт — прервётся через своё событие
+                        loser.cancel()
+                        cancels[loser].set()
+                    if future is backup:
+                        self.hedge_wins += 1
+                    return outcome
+        return outcome
+
+    def _submit_attempt(self, payload: dict, timeout_s: float, cancels: dict[Future, threading.Event]) -> Future:
+        """Хеджируемая попытка в пуле со своим событием отмены (кладётся в cancels)"""
+        cancel = threading.Event()
+        future = self._hedge_executor.submit(self._post_once, payload, timeout_s, cancel)
+        cancels[future] = cancel
+        return future
+
+    def _replay(self, payload: dict) -> tuple[bool, str | None]:
+        """Ответ из кассеты в режиме воспроизведения; (False, None) — промах"""
+        found, content, latency_s = self.cassette.replay(payload)
+        if not found:
+            logger.warning("Промпта нет в кассете")
+            return False, None
+        if self.cassette.simulate_latency:
+            time.sleep(latency_s)
+        self.last_latency = RequestLatency(ttfb_s=latency_s, total_s=latency_s)
+        self.latency_stats.add(self.last_latency)
+        return True, content
+
+    def chat(self, message: list[dict], max_tokens: int = 300, cancel: threading.Event | None = None) -> str | None:
+        """
+        Отправляет запрос к LLM и возвращает ответ (None — ошибка, breaker разомкнут или отмена).
+
+        :param cancel: Выставленное событие прерывает запрос: до отправки — он не уходит,
+            во время — ответ читается стримом и соединение закрывается
+        """
+        payload = build_payload(self.model, message, max_tokens)
+
+        if self.cassette is not None and self.cassette.replaying:
+            return self._replay(payload)[1]
+
+        started = time.perf_counter()
+        content = self._chat_with_retries(payload, cancel)
+        if self.cassette is not None and not (cancel is not None and cancel.is_set()):
+            self.cassette.record(payload, content, time.perf_counter() - started)
+        return content
+
+    def _chat_with_retries(self, payload: dict, cancel: threading.Event | None = None) -> str | None:
+        if not self.breaker.allow_request():
+            logger.debug("Circuit breaker разомкнут — запрос к API пропущен")
+            return None
+
+        try:
+            return self._attempts(payload, cancel)
+        finally:
+            # отмена или исключение не дают вердикта — пробный запрос half-open не должен висеть
+            self.breaker.release()
+
+    def _attempts(self, payload: dict, cancel: threading.Event | None) -> str | None:
+        """Попытки с повторами; каждая сообщает breaker'у успех или ошибку"""
+        for attempt in range(self.retry.max_attempts):
+            if cancel is not None and cancel.is_set():
+                return None
+            outcome = self._send(payload, self.timeouts.current(), cancel)
+            if outcome.cancelled:
+                return None
+
+            if outcome.failed:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+
+            if not outcome.retryable or attempt == self.retry.max_attempts - 1:
+                return outcome.content
+
+            # Провайдер только что признан нездоровым — дальше не долбим
+            if not self.breaker.allow_request():
+                return None
+
+            delay = self.retry.delay(attempt, outcome.retry_after_s)
+            if cancel is None:
+                time.sleep(delay)
+            elif cancel.wait(delay):
+                return None
+
+        return None
+
+    def chat_stream(self, message: list[dict], max_tokens: int = 300) -> Iterator[str]:
+        """
+        Стримит ответ LLM (SSE, "stream": true) и отдаёт куски текста по мере прихода.
+        При ошибке поток просто заканчивается — как chat() возвращает None.
+        """
+        payload = build_payload(self.model, message, max_tokens)
+
+        if self.cassette is not None and self.cassette.replaying:
+            _, content = self._replay(payload)
+            if content:
+                yield content
+            return
+
+        if not self.breaker.allow_request():
+            logger.debug("Circuit breaker разомкнут — стриминг пропущен")
+            return
+
+        payload["stream"] = True
+        tracer = LatencyTracer()
+        timeout_s = self.timeouts.current()
+        pieces = [] if self.cassette is not None else None
+
+        try:
+            with self._http.stream(
+                    "POST", self.base_url, json=payload, timeout=timeout_s, extensions={"trace": tracer}
+            ) as response:
+                response.raise_for_status()
+                for delta in iter_sse_content(response.iter_lines(), on_usage=self._record_usage):
+                    tracer.mark_first_token()
+                    if pieces is not None:
+                        pieces.append(delta)
+                    yield delta
+
+            self.last_latency = tracer.finish()
+            self.latency_stats.add(self.last_latency)
+            self.breaker.record_success()
+            if pieces is not None:
+                self.cassette.record(payload, "".join(pieces) or None, self.last_latency.total_s)
+
+        except httpx.TimeoutException:
+            logger.error(f"Таймаут ({timeout_s:.1f} сек) при стриминге ответа API")
+            self.breaker.record_failure()
+
+        except Exception as e:
+            logger.error(f"Ошибка стриминга: {e}")
+            self.breaker.record_failure()
+
+        finally:
+            # генератор бросили на полпути (GeneratorExit) — без вердикта, но слот пробы свободен
+            self.breaker.release()
+
+
+def iter_sse_content(
+        lines: Iterable[str],
+        on_usage: Callable[[TokenUsage], None] | None = None,
+) -> Iterator[str]:
+    """
+    Достаёт текст из SSE-потока chat completions:
+    строки "data: {...choices[0].delta.content...}", конец — "data: [DONE]".
+    usage (обычно в последнем чанке) передаётся в on_usage.
+    """
+    for line in lines:
+        if not line.startswith("data:"):
+            continue
+        data = line[5:].strip()
+        if data == "[DONE]":
+            return
+        try:
+            chunk = json.loads(data)
+            choices = chunk.get("choices") or [{}]
+            content = choices[0].get("delta", {}).get("content")
+        except (json.JSONDecodeError, AttributeError, IndexError) as e:
+            logger.warning(f"Пропущен битый SSE-чанк: {e}")
+            continue
+        if on_usage is not None:
+            usage = TokenUsage.from_response(chunk)
+            if usage is not None:
+                on_usage(usage)
+        if content:
+            yield content
 
 
 if __name__ == "__main__":
     from dotenv import load_dotenv
     load_dotenv()
 
-    test_client = PerplexityClient()
     # Формат role + content - это требование Perplexity API
     test_message = [
         {
@@ -75,4 +463,7 @@ if __name__ == "__main__":
             "content": "Привет! Как дела?"
         }
     ]
-    test_client.chat(test_message)
+    with PerplexityClient() as test_client:
+        test_client.chat(test_message)
+        test_client.chat(test_message)
+        print(test_client.latency_stats.summary())
@@ -0,0 +1,111 @@
+"""
+Компактные промпты DM с неизменным префиксом.
+
+Всё, что не меняется от запроса к запросу (роль, правила, схема ответа, лимиты дельт),
+живёт в system-сообщении и собирается один раз при импорте. Провайдер кэширует этот
+префикс, а в user-сообщение уходит только короткий срез состояния боя.
+
+Старые промпты из dm_prompts.get_*_prompt ставили числа раунда и HP перед инструкциями
+и вставляли json.dumps(indent=2) — префикс менялся каждый раз. Сравнение: tools/bench_prompts.py
+"""
+import json
+import math
+
+from config.settings import settings
+
+_EVENT_SCHEMA = (
+    '{{"type":"modify_stats","target":"{target}",'
+    f'"hp_delta":<от -{settings.MAX_HP_DELTA} до {settings.MAX_HP_DELTA}, 0 если нет эффекта>,'
+    f'"mana_delta":<от -{settings.MAX_MANA_DELTA} до {settings.MAX_MANA_DELTA}, 0 если нет эффекта>}}}}'
+)
+_ACTION_SCHEMA = '{"type":"basic_attack" или "cast_spell","spell_name":"<имя заклинания если cast_spell>"}'
+
+REACT_INSTRUCTIONS = f"""Ты мастер подземелья в D&D. Реагируй на действия персонажей драматично и интересно.
+В каждом запросе: раунд, HP и мана сторон, совершённое действие и цель эффекта.
+Опиши действие и его эффект от третьего лица (2-3 предложения).
+Если действие заслуживает дополнительного эффекта (урон, лечение, урон маны), добавь event, иначе "event": null.
+Ответь только JSON, без лишнего текста:
+{{"narration":"...","event":{_EVENT_SCHEMA.format(target="<цель из запроса>")}}}"""
+
+CHOOSE_ENEMY_ACTION_INSTRUCTIONS = f"""Ты враг в D&D бою. Выбери лучшее действие из доступных.
+В каждом запросе: раунд, HP и мана сторон, доступные действия (JSON).
+Если враг ранен, рассмотри лечение (если доступно); если в хорошей форме — атакуй заклинаниями.
+Ответь только JSON, без лишнего текста (narration — от третьего лица, 1-2 предложения):
+{{"action":{_ACTION_SCHEMA},"narration":"..."}}"""
+
+ENEMY_TURN_INSTRUCTIONS = f"""Ты мастер подземелья в D&D. Веди ход врага: выбери действие из доступных и опиши его драматично.
+В каждом запросе: раунд, HP и мана сторон, доступные действия (JSON).
+1. Выбери лучшую тактику для врага (только из доступных действий).
+2. Драматично опиши действие и его эффект от третьего лица (2-3 предложения).
+3. Если действие заслуживает дополнительного эффекта (урон, лечение, урон маны), добавь event, иначе "event": null.
+Ответь только JSON, без лишнего текста:
+{{"action":{_ACTION_SCHEMA},"narration":"...","event":{_EVENT_SCHEMA.format(target="player")}}}"""
+
+SYSTEM_PROMPTS = {
+    "react": REACT_INSTRUCTIONS,
+    "choose": CHOOSE_ENEMY_ACTION_INSTRUCTIONS,
+    "turn": ENEMY_TURN_INSTRUCTIONS,
+}
+
+# Переменная часть: только то, что отличает один запрос от другого
+_SIDE_TEMPLATE = "{name}: HP {current_hp}/{max_hp}, мана {current_mana}/{max_mana}"
+_STATUS_NAMES = {"dot": "яд", "regen": "регенерация", "shield": "щит", "stun": "оглушение"}
+_REACT_TEMPLATE = "Раунд {round}\n{player}\n{enemy}\nДействие: {action}\nЦель event: {target}"
+_ENEMY_TEMPLATE = "Раунд {round}\nВраг {enemy}\nПротивник {player}\nДоступные действия:\n{allowed}"
+
+
+def _render_status(status: dict) -> str:
+    name = _STATUS_NAMES.get(status["kind"], status["kind"])
+    if "turns_left" in status:
+        return f"{name} ещё {status['turns_left']} ход."
+    return f"{name} {status['power']} ещё {status['rounds_left']} р."
+
+
+def _render_side(side: dict) -> str:
+    text = _SIDE_TEMPLATE.format_map(side)
+    statuses = side.get("statuses")
+    if statuses:
+        text += ", эффекты: " + "; ".join(_render_status(status) for status in statuses)
+    return text
+
+
+def _render_sides(battle_state: dict) -> tuple[str, str]:
+    return _render_side(battle_state["player"]), _render_side(battle_state["enemy"])
+
+
+def render_react(battle_state: dict, actor: str) -> str:
+    """Срез состояния для реакции на действие actor ("player" | "enemy")"""
+    player, enemy = _render_sides(battle_state)
+    actor_name = battle_state[actor]["name"]
+    spell_name = (battle_state.get("last_action") or {}).get("spell_name")
+    action = f"{actor_name} использует {spell_name}" if spell_name else f"{actor_name} атакует базовой атакой"
+    return _REACT_TEMPLATE.format(
+        round=battle_state["round"],
+        player=player,
+        enemy=enemy,
+        action=action,
+        target="enemy" if actor == "player" else "player",
+    )
+
+
+def render_enemy_decision(battle_state: dict, allowed_actions: dict) -> str:
+    """Срез состояния для выбора хода врага (и для совмещённого хода)"""
+    player, enemy = _render_sides(battle_state)
+    return _ENEMY_TEMPLATE.format(
+        round=battle_state["round"],
+        enemy=enemy,
+        player=player,
+        allowed=json.dumps(allowed_actions, ensure_ascii=False, separators=(",", ":")),
+    )
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Грубая оценка числа токенов (≈ 4 байта UTF-8 на токен: латиница ~4 символа,
+    кириллица ~2). Только для офлайн-сравнений — реальный счёт приходит в usage ответа API.
+    """
+    return math.ceil(len(text.encode()) / 4)
+
+
+def estimate_messages_tokens(messages: list[dict]) -> int:
+    return sum(estimate_tokens(m["content"]) for m in messages)
@@ -0,0 +1,154 @@
+"""
+Контроль хвостовых задержек LLM-клиента: адаптивный таймаут, хеджирование,
+ретраи с джиттером и circuit breaker.
+"""
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+from services.latency import LatencyStats
+
+
+class AdaptiveTimeout:
+    """
+    Таймаут из наблюдаемых задержек: p99 × multiplier, зажатый в [min_s, max_s].
+    Пока замеров мало — max_s (исходный фиксированный таймаут).
+    """
+
+    def __init__(
+            self,
+            stats: LatencyStats,
+            min_s: float = 1.0,
+            max_s: float = 10.0,
+            percentile: float = 99,
+            multiplier: float = 1.5,
+            min_samples: int = 20,
+    ):
+        self.stats = stats
+        self.min_s = min_s
+        self.max_s = max_s
+        self.percentile = percentile
+        self.multiplier = multiplier
+        self.min_samples = min_samples
+
+    def current(self) -> float:
+        if len(self.stats) < self.min_samples:
+            return self.max_s
+        observed = self.stats.percentile(self.percentile) * self.multiplier
+        return max(self.min_s, min(observed, self.max_s))
+
+    def hedge_delay(self, percentile: float = 95) -> float | None:
+        """Через сколько отправлять хедж-запрос (None — замеров пока мало)"""
+        if len(self.stats) < self.min_samples:
+            return None
+        return self.stats.percentile(percentile)
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Retry-After: число секунд или HTTP-дата"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """Экспоненциальный backoff с полным джиттером; Retry-After сервера имеет приоритет"""
+
+    def __init__(
+            self,
+            max_attempts: int = 3,
+            base_delay_s: float = 0.2,
+            max_delay_s: float = 5.0,
+            seed: int | None = None,
+    ):
+        self.max_attempts = max_attempts
+        self.base_delay_s = base_delay_s
+        self.max_delay_s = max_delay_s
+        self.rng = random.Random(seed)
+
+    def delay(self, attempt: int, retry_after_s: float | None = None) -> float:
+        """
+        Пауза перед повтором.
+
+        Args:
+            attempt: Номер неудачной попытки (с 0)
+            retry_after_s: Значение Retry-After, если сервер его прислал
+        """
+        if retry_after_s is not None:
+            return min(retry_after_s, self.max_delay_s)
+        return self.rng.uniform(0, min(self.max_delay_s, self.base_delay_s * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """
+    Предохранитель: после failure_threshold ошибок подряд размыкается и сразу
+    отказывает в запросах. Через reset_timeout_s пропускает один пробный запрос
+    (half-open): успех — замыкается, ошибка — снова размыкается. Пробный запрос,
+    закончившийся без вердикта (отмена, брошенный стрим), освобождает слот через release().
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout_s: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_s = reset_timeout_s
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.short_circuited = 0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        """Провайдер считается нездоровым и пробовать его пока рано"""
+        with self._lock:
+            if self.state == self.OPEN:
+                return time.monotonic() - self.opened_at < self.reset_timeout_s
+            return self.state == self.HALF_OPEN and self._probe_in_flight
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout_s:
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+
+            self.short_circuited += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def release(self) -> None:
+        """Запрос закончился без record_success/record_failure — иначе пробный слот занят навсегда"""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self._probe_in_flight = False
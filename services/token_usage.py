@@ -0,0 +1,58 @@
+"""Учёт токенов по полю usage ответа chat completions"""
+import threading
+from dataclasses import dataclass
+
+
+@dataclass
+class TokenUsage:
+    """Токены одного запроса"""
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0  # часть prompt_tokens, попавшая в кэш префикса провайдера
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    @classmethod
+    def from_response(cls, data: dict) -> "TokenUsage | None":
+        """Достаёт usage из JSON ответа (или последнего SSE-чанка); None, если его нет"""
+        usage = data.get("usage")
+        if not isinstance(usage, dict):
+            return None
+        details = usage.get("prompt_tokens_details") or {}
+        return cls(
+            prompt_tokens=int(usage.get("prompt_tokens") or 0),
+            completion_tokens=int(usage.get("completion_tokens") or 0),
+            cached_tokens=int(details.get("cached_tokens") or 0),
+        )
+
+
+class UsageStats:
+    """Накопленные токены клиента: суммы и средние на запрос"""
+
+    def __init__(self):
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cached_tokens = 0
+        self._lock = threading.Lock()
+
+    def add(self, usage: TokenUsage) -> None:
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += usage.prompt_tokens
+            self.completion_tokens += usage.completion_tokens
+            self.cached_tokens += usage.cached_tokens
+
+    def summary(self) -> dict:
+        calls = self.calls or 1
+        return {
+            "calls": self.calls,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cached_tokens": self.cached_tokens,
+            "prompt_per_call": self.prompt_tokens / calls,
+            "completion_per_call": self.completion_tokens / calls,
+            "cached_share": self.cached_tokens / self.prompt_tokens if self.prompt_tokens else 0.0,
+        }
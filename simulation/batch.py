@@ -0,0 +1,264 @@
+"""
+Векторизованный симулятор: N боёв игрок-против-врага одновременно в NumPy-массивах.
+
+Правила те же, что у Battle без DM: базовая атака на basic_attack_damage, списание маны
+за спелл, цель по SpellType (лечение — на себя, остальное — на противника), зажим
+HP/маны в [MIN, max]. Каждый вызов _half_turn продвигает все незавершённые бои на один ход.
+Броски костей (Spell с выражением, basic_attack_damage="1d8+2") сэмплируются разом на все
+бои, сделавшие это действие в этом ходу; бросок ниже нуля, как и в Battle, считается нулём.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+from config.settings import settings
+from domain.battle.policies import (
+    ActionPolicy,
+    BasicAttackPolicy,
+    FirstDamageSpellPolicy,
+    PriorityPolicy,
+    RandomPolicy,
+)
+from domain.entities.dice import Dice
+from domain.entities.effects import DEFAULT_EFFECTS
+from domain.entities.grimoire import Grimoire
+from domain.enums.spell_type import SpellType
+
+# Коды победителя в BatchResult.winner
+DRAW = 0
+PLAYER_WON = 1
+ENEMY_WON = 2
+
+BASIC_ATTACK = -1
+
+
+@dataclass
+class BatchResult:
+    """Итоги N боёв (все массивы длины N)"""
+    winner: np.ndarray  # DRAW / PLAYER_WON / ENEMY_WON
+    rounds: np.ndarray
+    player_hp: np.ndarray
+    player_mana: np.ndarray
+    enemy_hp: np.ndarray
+    enemy_mana: np.ndarray
+    # Сторона хотя бы раз начала свой ход, не имея маны ни на один разрешённый ей спелл
+    player_exhausted: np.ndarray
+    enemy_exhausted: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.winner)
+
+    def winner_names(self) -> list[str]:
+        names = {DRAW: "draw", PLAYER_WON: "player", ENEMY_WON: "enemy"}
+        return [names[int(w)] for w in self.winner]
+
+
+class _CompiledPolicy:
+    """Стратегия, приведённая к векторной форме: список приоритетов или случайный выбор"""
+
+    def __init__(self, priority: list[int] | None, allowed: np.ndarray, rng: np.random.Generator | None = None):
+        self.priority = priority
+        self.allowed = allowed  # bool[S]: какие спеллы этой стороне вообще разрешены
+        self.rng = rng
+
+    def cheapest_cost(self, costs: np.ndarray) -> int | None:
+        """Минимальная стоимость разрешённого спелла (None — спеллов нет вовсе)"""
+        allowed_costs = costs[self.allowed]
+        return int(allowed_costs.min()) if len(allowed_costs) else None
+
+    def choose(self, mana: np.ndarray, active: np.ndarray, costs: np.ndarray) -> np.ndarray:
+        """Возвращает индекс спелла для каждого боя (BASIC_ATTACK — базовая атака)"""
+        actions = np.full(len(mana), BASIC_ATTACK, dtype=np.int32)
+
+        if self.priority is not None:
+            undecided = active.copy()
+            for spell_idx in self.priority:
+                chosen = undecided & (mana >= costs[spell_idx])
+                actions[chosen] = spell_idx
+                undecided &= ~chosen
+            return actions
+
+        # Случайный выбор: базовая атака + каждый доступный спелл равновероятны
+        affordable = (mana[:, None] >= costs[None, :]) & self.allowed[None, :] & active[:, None]
+        n_options = affordable.sum(axis=1) + 1
+        pick = (self.rng.random(len(mana)) * n_options).astype(np.int32)
+        cumulative = np.cumsum(affordable, axis=1)
+        has_spell = active & (pick > 0)
+        spell_idx = np.argmax(cumulative >= pick[:, None], axis=1)
+        actions[has_spell] = spell_idx[has_spell]
+        return actions
+
+
+def compile_policy(policy: ActionPolicy, grimoire: Grimoire, is_enemy: bool) -> _CompiledPolicy:
+    """
+    Переводит скалярную стратегию в векторную.
+
+    Врагу, как и в Battle, доступны только damage-спеллы.
+    """
+    spells = grimoire.spell_list
+    allowed = np.array(
+        [(not is_enemy) or s.spell_type == SpellType.DAMAGE for s in spells],
+        dtype=bool,
+    )
+
+    if isinstance(policy, BasicAttackPolicy):
+        return _CompiledPolicy([], allowed)
+    if isinstance(policy, FirstDamageSpellPolicy):
+        return _CompiledPolicy(
+            [i for i, s in enumerate(spells) if s.spell_type == SpellType.DAMAGE and allowed[i]],
+            allowed,
+        )
+    if isinstance(policy, PriorityPolicy):
+        index = {s.name: i for i, s in enumerate(spells)}
+        return _CompiledPolicy(
+            [index[name] for name in policy.spell_names if name in index and allowed[index[name]]],
+            allowed,
+        )
+    if isinstance(policy, RandomPolicy):
+        return _CompiledPolicy(None, allowed, np.random.default_rng(policy.seed))
+
+    raise TypeError(f"Стратегия {type(policy).__name__} не поддерживает векторный режим")
+
+
+class BatchSimulator:
+    """Прогоняет N независимых боёв с одним гримуаром и парой стратегий"""
+
+    def __init__(
+            self,
+            grimoire: Grimoire,
+            player_policy: ActionPolicy,
+            enemy_policy: ActionPolicy | None = None,
+            basic_attack_damage: int | str | Dice = 10,
+            max_rounds: int = 1000,
+            seed: int | None = None,
+    ):
+        """
+        :param basic_attack_damage: Урон базовой атаки: число или выражение бросков
+        :param seed: Зерно бросков костей
+        """
+        self.grimoire = grimoire
+        self.player_policy = compile_policy(player_policy, grimoire, is_enemy=False)
+        self.enemy_policy = compile_policy(enemy_policy or FirstDamageSpellPolicy(), grimoire, is_enemy=True)
+        self.basic_attack_damage = basic_attack_damage
+        self.basic_attack_dice = None if isinstance(basic_attack_damage, int) else Dice.parse(basic_attack_damage)
+        self.max_rounds = max_rounds
+        self.rng = np.random.default_rng(seed)
+
+        spells = grimoire.spell_list
+        custom = [s.name for s in spells if s.effect is not DEFAULT_EFFECTS.get(s.spell_type)]
+        if custom:
+            raise TypeError(f"Спеллы со своими эффектами не поддерживают векторный режим: {custom}")
+        self.costs = np.array([s.mana_cost for s in spells], dtype=np.int32)
+        self.powers = np.array([s.power for s in spells], dtype=np.int32)
+        self.types = [s.spell_type for s in spells]
+        self.dice = [s.dice for s in spells]
+
+    @staticmethod
+    def _as_array(value, n: int) -> np.ndarray:
+        return np.broadcast_to(np.asarray(value, dtype=np.int32), (n,)).copy()
+
+    def run(
+            self,
+            n: int,
+            player_max_hp,
+            player_max_mana,
+            enemy_max_hp,
+            enemy_max_mana,
+    ) -> BatchResult:
+        """
+        Прогоняет N боёв до конца.
+
+        Args:
+            n: Число боёв
+            player_max_hp, player_max_mana, enemy_max_hp, enemy_max_mana:
+                Скаляр (одинаково для всех боёв) или массив длины N
+
+        Returns:
+            BatchResult
+        """
+        p_max_hp = self._as_array(player_max_hp, n)
+        p_max_mana = self._as_array(player_max_mana, n)
+        e_max_hp = self._as_array(enemy_max_hp, n)
+        e_max_mana = self._as_array(enemy_max_mana, n)
+
+        # Бой стартует с полными HP и маной, как Creature.__init__
+        p_hp, p_mana = p_max_hp.copy(), p_max_mana.copy()
+        e_hp, e_mana = e_max_hp.copy(), e_max_mana.copy()
+
+        winner = np.full(n, DRAW, dtype=np.int8)
+        rounds = np.zeros(n, dtype=np.int32)
+        p_exhausted = np.zeros(n, dtype=bool)
+        e_exhausted = np.zeros(n, dtype=bool)
+        p_cheapest = self.player_policy.cheapest_cost(self.costs)
+        e_cheapest = self.enemy_policy.cheapest_cost(self.costs)
+        # Сторона с max_hp == 0 мертва с начала — исход как у Battle._winner (враг проверяется первым)
+        winner[e_hp <= settings.MIN_HP] = PLAYER_WON
+        winner[(e_hp > settings.MIN_HP) & (p_hp <= settings.MIN_HP)] = ENEMY_WON
+        active = (p_hp > settings.MIN_HP) & (e_hp > settings.MIN_HP)
+
+        round_number = 0
+        while active.any() and round_number < self.max_rounds:
+            round_number += 1
+            rounds[active] = round_number
+
+            # Ход игрока
+            if p_cheapest is not None:
+                p_exhausted |= active & (p_mana < p_cheapest)
+            self._half_turn(
+                self.player_policy, active,
+                p_hp, p_mana, p_max_hp, p_max_mana,
+                e_hp, e_mana, e_max_hp, e_max_mana,
+            )
+            enemy_dead = active & (e_hp <= settings.MIN_HP)
+            winner[enemy_dead] = PLAYER_WON
+            active &= ~enemy_dead
+
+            # Ход врага
+            if e_cheapest is not None:
+                e_exhausted |= active & (e_mana < e_cheapest)
+            self._half_turn(
+                self.enemy_policy, active,
+                e_hp, e_mana, e_max_hp, e_max_mana,
+                p_hp, p_mana, p_max_hp, p_max_mana,
+            )
+            player_dead = active & (p_hp <= settings.MIN_HP)
+            winner[player_dead] = ENEMY_WON
+            active &= ~player_dead
+
+        return BatchResult(winner, rounds, p_hp, p_mana, e_hp, e_mana, p_exhausted, e_exhausted)
+
+    def _half_turn(
+            self,
+            policy: _CompiledPolicy,
+            active: np.ndarray,
+            hp, mana, max_hp, max_mana,
+            opp_hp, opp_mana, opp_max_hp, opp_max_mana,
+    ) -> None:
+        """Один ход стороны для всех активных боёв (массивы правятся на месте)"""
+        actions = policy.choose(mana, active, self.costs)
+
+        basic = active & (actions == BASIC_ATTACK)
+        if self.basic_attack_dice is None:
+            opp_hp[basic] = np.maximum(settings.MIN_HP, opp_hp[basic] - self.basic_attack_damage)
+        elif basic.any():
+            damage = np.maximum(0, self.basic_attack_dice.sample(self.rng, int(basic.sum())))
+            opp_hp[basic] = np.maximum(settings.MIN_HP, opp_hp[basic] - damage)
+
+        for spell_idx, spell_type in enumerate(self.types):
+            cast = active & (actions == spell_idx)
+            if not cast.any():
+                continue
+
+            mana[cast] = np.maximum(settings.MIN_MANA, mana[cast] - self.costs[spell_idx])
+            dice = self.dice[spell_idx]
+            power = self.powers[spell_idx] if dice is None else np.maximum(0, dice.sample(self.rng, int(cast.sum())))
+
+            if spell_type == SpellType.DAMAGE:
+                opp_hp[cast] = np.clip(opp_hp[cast] - power, settings.MIN_HP, opp_max_hp[cast])
+            elif spell_type == SpellType.HEAL:
+                hp[cast] = np.clip(hp[cast] + power, settings.MIN_HP, max_hp[cast])
+            elif spell_type == SpellType.MANA:
+                # Как и в Battle._get_target: всё, кроме лечения, летит в противника
+                opp_mana[cast] = np.clip(opp_mana[cast] + power, settings.MIN_MANA, opp_max_mana[cast])
+            else:
+                raise ValueError(f"Неизвестный тип спелла: {spell_type}")
@@ -0,0 +1,138 @@
+"""
+Общий корпус сценариев для сверки векторного симулятора со скалярным Battle.
+
+Запуск: python -m simulation.corpus
+"""
+from dataclasses import dataclass, field
+
+from domain.battle.headless import run_headless
+from domain.battle.policies import (
+    ActionPolicy,
+    BasicAttackPolicy,
+    FirstDamageSpellPolicy,
+    PriorityPolicy,
+)
+from domain.entities.character import Character
+from domain.entities.enemy import Enemy
+from domain.entities.grimoire import Grimoire
+from domain.entities.spell import Spell
+from domain.enums.spell_type import SpellType
+from simulation.batch import BatchSimulator, PLAYER_WON, ENEMY_WON, DRAW
+
+
+@dataclass
+class Scenario:
+    """Один сценарий: гримуар, статы сторон и стратегии"""
+    name: str
+    spells: list[tuple]  # (name, mana_cost, level, SpellType, power)
+    player_stats: list[tuple[int, int]]  # [(max_hp, max_mana), ...]
+    enemy_stats: list[tuple[int, int]]
+    player_policy: ActionPolicy
+    enemy_policy: ActionPolicy = field(default_factory=FirstDamageSpellPolicy)
+    max_rounds: int = 200
+
+    def grimoire(self) -> Grimoire:
+        return Grimoire([Spell(*spec) for spec in self.spells])
+
+
+STAT_GRID = [(hp, mana) for hp in (1, 15, 40, 80, 100) for mana in (0, 10, 25, 60, 100)]
+
+MAIN_SPELLS = [
+    ("Fireball", 30, 3, SpellType.DAMAGE, 20),
+    ("Healing", 20, 2, SpellType.HEAL, 25),
+]
+
+MIXED_SPELLS = [
+    ("Spark", 5, 1, SpellType.DAMAGE, 6),
+    ("Meteor", 45, 7, SpellType.DAMAGE, 40),
+    ("Mend", 15, 2, SpellType.HEAL, 12),
+    ("Gift", 10, 1, SpellType.MANA, 15),
+]
+
+
+def build_corpus() -> list[Scenario]:
+    player_stats = [p for p in STAT_GRID for _ in STAT_GRID]
+    enemy_stats = [e for _ in STAT_GRID for e in STAT_GRID]
+
+    return [
+        Scenario("main/basic", MAIN_SPELLS, player_stats, enemy_stats, BasicAttackPolicy()),
+        Scenario("main/first_damage", MAIN_SPELLS, player_stats, enemy_stats, FirstDamageSpellPolicy()),
+        Scenario("main/heal_first", MAIN_SPELLS, player_stats, enemy_stats, PriorityPolicy(["Healing", "Fireball"])),
+        Scenario(
+            "mixed/priority", MIXED_SPELLS, player_stats, enemy_stats,
+            PriorityPolicy(["Meteor", "Gift", "Mend", "Spark"]),
+            enemy_policy=PriorityPolicy(["Meteor", "Spark"]),
+        ),
+        Scenario(
+            "mixed/stalemate", [("Mend", 0, 1, SpellType.HEAL, 50)], player_stats, enemy_stats,
+            PriorityPolicy(["Mend"]),
+            enemy_policy=BasicAttackPolicy(),
+            max_rounds=20,
+        ),
+    ]
+
+
+def run_scalar(scenario: Scenario) -> list[tuple[str, int]]:
+    results = []
+    for (p_hp, p_mana), (e_hp, e_mana) in zip(scenario.player_stats, scenario.enemy_stats):
+        grimoire = scenario.grimoire()
+        result = run_headless(
+            Character(p_mana, p_hp, "player"),
+            Enemy(e_mana, e_hp, "enemy", grimoire),
+            grimoire,
+            player_policy=scenario.player_policy,
+            enemy_policy=scenario.enemy_policy,
+            max_rounds=scenario.max_rounds,
+        )
+        results.append((result.winner, result.rounds))
+    return results
+
+
+def run_batch(scenario: Scenario) -> list[tuple[str, int]]:
+    simulator = BatchSimulator(
+        scenario.grimoire(),
+        scenario.player_policy,
+        scenario.enemy_policy,
+        max_rounds=scenario.max_rounds,
+    )
+    result = simulator.run(
+        len(scenario.player_stats),
+        [p[0] for p in scenario.player_stats],
+        [p[1] for p in scenario.player_stats],
+        [e[0] for e in scenario.enemy_stats],
+        [e[1] for e in scenario.enemy_stats],
+    )
+    return list(zip(result.winner_names(), result.rounds.tolist()))
+
+
+def check_corpus(corpus: list[Scenario] | None = None) -> list[str]:
+    """Возвращает список расхождений (пустой — всё совпало)"""
+    mismatches = []
+    for scenario in corpus or build_corpus():
+        scalar = run_scalar(scenario)
+        batch = run_batch(scenario)
+        for i, (expected, got) in enumerate(zip(scalar, batch)):
+            if expected != got:
+                mismatches.append(f"{scenario.name}[{i}]: scalar={expected}, batch={got}")
+    return mismatches
+
+
+if __name__ == "__main__":
+    import time
+
+    import numpy as np
+
+    mismatches = check_corpus()
+    print(f"✅ Расхождений со скалярным движком: {len(mismatches)}")
+    for line in mismatches[:10]:
+        print(f"  ❌ {line}")
+
+    n = 1_000_000
+    simulator = BatchSimulator(Grimoire([Spell(*spec) for spec in MAIN_SPELLS]), FirstDamageSpellPolicy())
+    rng = np.random.default_rng(0)
+    started = time.perf_counter()
+    result = simulator.run(n, rng.integers(1, 101, n), rng.integers(0, 101, n), 80, 50)
+    elapsed = time.perf_counter() - started
+    counts = {name: int((result.winner == code).sum()) for name, code in
+              (("player", PLAYER_WON), ("enemy", ENEMY_WON), ("draw", DRAW))}
+    print(f"✅ {n} боёв за {elapsed:.2f} c ({n / elapsed:,.0f} боёв/с): {counts}")
@@ -0,0 +1,472 @@
+"""
+Оптимальная стратегия врага для дуэли, посчитанная заранее динамическим программированием.
+
+Состояние дуэли — (HP и мана игрока, HP и мана врага), и достижимых значений немного:
+каждое измерение меняется на фиксированные шаги (урон, лечение, стоимость спеллов)
+с зажимом в [MIN, max], поэтому решётка достижимых значений строится замыканием от
+стартового максимума. По ней обратной индукцией по раундам (как лимит max_rounds в бою)
+считаются:
+
+- policy: лучшее действие врага в каждом состоянии (максимум вероятности победы);
+- вероятности победы врага и игрока (остальное — ничья по лимиту раундов);
+- ожидаемое число оставшихся раундов.
+
+Игрок моделируется стратегией без памяти: равновероятно по доступным действиям
+(как RandomPolicy) или любой ActionPolicy, чей выбор зависит только от доступных спеллов.
+Правила хода — как у BatchSimulator. Таблицы кэшируются на диск (.npz) по хэшу
+содержимого: спеллы, характеристики, модель игрока, лимит раундов.
+
+Запуск отчёта: python -m simulation.optimal_policy --battles 2000
+"""
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+
+import numpy as np
+from loguru import logger
+
+from config.settings import settings
+from domain.battle.policies import (
+    ActionPolicy,
+    RandomPolicy,
+    basic_attack_action,
+    cast_spell_action,
+)
+from domain.entities.effects import DEFAULT_EFFECTS
+from domain.entities.grimoire import Grimoire
+from domain.enums.spell_type import SpellType
+
+FORMAT_VERSION = 1
+BASIC_ATTACK = -1
+MAX_STATES = 20_000_000
+DEFAULT_CACHE_DIR = os.getenv("POLICY_CACHE_DIR", ".policy_cache")
+
+# Порядок измерений массивов состояния
+P_HP, P_MANA, E_HP, E_MANA = range(4)
+
+
+@dataclass(frozen=True)
+class _Spec:
+    """Спелл в виде чисел для решателя"""
+    index: int  # индекс в grimoire.spell_list
+    name: str
+    cost: int
+    spell_type: SpellType
+    power: int
+
+
+def _closure(start: int, maximum: int, floor: int, steps: list[int], costs: list[int]) -> np.ndarray:
+    """Все значения, достижимые от start шагами steps (с зажимом) и тратами costs (если хватает)"""
+    seen = {start}
+    frontier = [start]
+    while frontier:
+        value = frontier.pop()
+        nexts = [max(floor, min(value + step, maximum)) for step in steps]
+        nexts += [max(floor, value - cost) for cost in costs if value >= cost]
+        for next_value in nexts:
+            if next_value not in seen:
+                seen.add(next_value)
+                frontier.append(next_value)
+    return np.array(sorted(seen), dtype=np.int32)
+
+
+def _nearest_index(lattice: np.ndarray, maximum: int) -> np.ndarray:
+    """Значение 0..maximum -> индекс ближайшей точки решётки (для состояний вне неё, например после события DM)"""
+    values = np.arange(maximum + 1)
+    return np.abs(values[:, None] - lattice[None, :]).argmin(axis=1).astype(np.int32)
+
+
+class PolicyTable:
+    """Готовые таблицы: O(1) на запрос — индексы по четырём измерениям и чтение массива"""
+
+    def __init__(
+            self,
+            spell_names: list[str],
+            lattices: list[np.ndarray],
+            maxima: tuple[int, int, int, int],
+            policy: np.ndarray,
+            enemy_win: np.ndarray,
+            player_win: np.ndarray,
+            rounds: np.ndarray,
+    ):
+        """
+        Массивы enemy_win/player_win/rounds имеют форму (2, *решётка): [0] — начало раунда
+        (ходит игрок), [1] — ход врага.
+        """
+        self.spell_names = spell_names
+        self.lattices = lattices
+        self.maxima = maxima
+        self.policy = policy
+        self.enemy_win = enemy_win
+        self.player_win = player_win
+        self.rounds = rounds
+        self._index = [_nearest_index(lattice, maximum) for lattice, maximum in zip(lattices, maxima)]
+
+    def __repr__(self):
+        return f'PolicyTable: (spells={self.spell_names}, states={self.states})'
+
+    @property
+    def states(self) -> int:
+        return int(self.policy.size)
+
+    def _key(self, player_hp: int, player_mana: int, enemy_hp: int, enemy_mana: int) -> tuple[int, int, int, int]:
+        values = (player_hp, player_mana, enemy_hp, enemy_mana)
+        return tuple(
+            int(index[max(0, min(value, maximum))])
+            for index, value, maximum in zip(self._index, values, self.maxima)
+        )
+
+    def best_action(self, player_hp: int, player_mana: int, enemy_hp: int, enemy_mana: int) -> dict:
+        """Лучшее действие врага в формате ActionPolicy"""
+        action = int(self.policy[self._key(player_hp, player_mana, enemy_hp, enemy_mana)])
+        if action == BASIC_ATTACK:
+            return basic_attack_action()
+        return cast_spell_action(self.spell_names[action])
+
+    def win_probability(self, player_hp: int, player_mana: int, enemy_hp: int, enemy_mana: int,
+                        enemy_to_move: bool = False) -> dict[str, float]:
+        """Вероятности исходов при оптимальном враге: {"enemy", "player", "draw"}"""
+        key = (int(enemy_to_move),) + self._key(player_hp, player_mana, enemy_hp, enemy_mana)
+        enemy, player = float(self.enemy_win[key]), float(self.player_win[key])
+        return {"enemy": enemy, "player": player, "draw": max(0.0, 1.0 - enemy - player)}
+
+    def expected_rounds(self, player_hp: int, player_mana: int, enemy_hp: int, enemy_mana: int,
+                        enemy_to_move: bool = False) -> float:
+        """Сколько ещё раундов (включая текущий, если ходит игрок) в среднем продлится бой"""
+        key = (int(enemy_to_move),) + self._key(player_hp, player_mana, enemy_hp, enemy_mana)
+        return float(self.rounds[key])
+
+    def choose(self, enemy, target) -> str | None:
+        """Для Enemy.choose_spell: имя спелла или None (базовая атака)"""
+        action = self.best_action(target.current_hp, target.current_mana, enemy.current_hp, enemy.current_mana)
+        return action.get("spell_name")
+
+    # ---------- диск ----------
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez_compressed(
+            tmp_path,
+            spell_names=np.array(self.spell_names, dtype=str),
+            maxima=np.array(self.maxima, dtype=np.int32),
+            policy=self.policy,
+            enemy_win=self.enemy_win,
+            player_win=self.player_win,
+            rounds=self.rounds,
+            **{f"lattice_{i}": lattice for i, lattice in enumerate(self.lattices)},
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "PolicyTable":
+        with np.load(path) as data:
+            return cls(
+                spell_names=[str(name) for name in data["spell_names"]],
+                lattices=[data[f"lattice_{i}"] for i in range(4)],
+                maxima=tuple(int(x) for x in data["maxima"]),
+                policy=data["policy"],
+                enemy_win=data["enemy_win"],
+                player_win=data["player_win"],
+                rounds=data["rounds"],
+            )
+
+
+class TablePolicy(ActionPolicy):
+    """Стратегия врага по готовой таблице (O(1) на ход)"""
+
+    def __init__(self, table: PolicyTable):
+        self.table = table
+
+    def choose_action(self, battle, caster, available_spells) -> dict:
+        opponent = battle.player if caster is battle.enemy else battle.enemy
+        action = self.table.best_action(
+            opponent.current_hp, opponent.current_mana, caster.current_hp, caster.current_mana
+        )
+        # вне решётки (событие DM, эффекты) ближайшее состояние может «разрешить» лишний спелл
+        if action["type"] == "cast_spell" and action["spell_name"] not in {s.name for s in available_spells}:
+            return basic_attack_action()
+        return action
+
+
+class PolicySolver:
+    """Обратная индукция по раундам на решётке достижимых состояний"""
+
+    def __init__(
+            self,
+            grimoire: Grimoire,
+            player_stats: tuple[int, int],
+            enemy_stats: tuple[int, int],
+            basic_attack_damage: int = 10,
+            player_model: ActionPolicy | str = "uniform",
+            enemy_types: set[SpellType] | None = None,
+            max_rounds: int = 1000,
+    ):
+        """
+        :param player_stats: (max_hp, max_mana) игрока
+        :param enemy_stats: (max_hp, max_mana) врага
+        :param player_model: "uniform" или ActionPolicy без памяти (RandomPolicy — то же, что "uniform")
+        :param enemy_types: Типы спеллов, доступные врагу (как в Battle — только DAMAGE)
+        :param max_rounds: Лимит раундов: после него — ничья
+        """
+        custom = [s.name for s in grimoire.spell_list if s.effect is not DEFAULT_EFFECTS.get(s.spell_type)]
+        if custom:
+            raise TypeError(f"Спеллы со своими эффектами не поддерживаются решателем: {custom}")
+        rolled = [s.name for s in grimoire.spell_list if s.dice is not None]
+        if rolled:
+            raise TypeError(f"Спеллы с бросками костей не поддерживаются решателем: {rolled}")
+        if max_rounds < 1:
+            raise ValueError('Лимит раундов должен быть положительным')
+
+        self.grimoire = grimoire
+        self.player_stats = player_stats
+        self.enemy_stats = enemy_stats
+        self.basic = basic_attack_damage
+        self.player_model = player_model
+        self.enemy_types = enemy_types if enemy_types is not None else {SpellType.DAMAGE}
+        self.max_rounds = max_rounds
+
+        self.specs = [
+            _Spec(i, s.name, s.mana_cost, s.spell_type, s.power) for i, s in enumerate(grimoire.spell_list)
+        ]
+        self.enemy_specs = [s for s in self.specs if s.spell_type in self.enemy_types]
+        self.maxima = (player_stats[0], player_stats[1], enemy_stats[0], enemy_stats[1])
+        self.lattices = self._lattices()
+        self.shape = tuple(len(lattice) for lattice in self.lattices)
+        states = int(np.prod(self.shape))
+        if states > MAX_STATES:
+            raise ValueError(f'Слишком много состояний для точного решения: {states:,}')
+        self._positions = [{int(v): i for i, v in enumerate(lattice)} for lattice in self.lattices]
+        self.player_policy = self._player_distribution()
+
+    # ---------- модель ----------
+
+    def _lattices(self) -> list[np.ndarray]:
+        player_heal = [s.power for s in self.specs if s.spell_type == SpellType.HEAL]
+        enemy_heal = [s.power for s in self.enemy_specs if s.spell_type == SpellType.HEAL]
+        player_hits = [-self.basic] + [-s.power for s in self.specs if s.spell_type == SpellType.DAMAGE]
+        enemy_hits = [-self.basic] + [-s.power for s in self.enemy_specs if s.spell_type == SpellType.DAMAGE]
+        player_gifts = [s.power for s in self.specs if s.spell_type == SpellType.MANA]
+        enemy_gifts = [s.power for s in self.enemy_specs if s.spell_type == SpellType.MANA]
+        p_hp, p_mana, e_hp, e_mana = self.maxima
+        return [
+            _closure(p_hp, p_hp, settings.MIN_HP, enemy_hits + player_heal, []),
+            _closure(p_mana, p_mana, settings.MIN_MANA, enemy_gifts, [s.cost for s in self.specs]),
+            _closure(e_hp, e_hp, settings.MIN_HP, player_hits + enemy_heal, []),
+            _closure(e_mana, e_mana, settings.MIN_MANA, player_gifts, [s.cost for s in self.enemy_specs]),
+        ]
+
+    def _map(self, axis: int, change) -> np.ndarray:
+        """Индексы следующего состояния по одному измерению"""
+        maximum = self.maxima[axis]
+        floor = settings.MIN_HP if axis in (P_HP, E_HP) else settings.MIN_MANA
+        positions = self._positions[axis]
+        return np.array(
+            [positions[max(floor, min(change(int(v)), maximum))] for v in self.lattices[axis]],
+            dtype=np.intp,
+        )
+
+    def _transition(self, spec: _Spec | None, by_player: bool) -> tuple[list[np.ndarray], np.ndarray]:
+        """
+        Ход одной стороны: индексы следующего состояния по каждому измерению и маска
+        допустимости по мане ходящего (форма, совместимая с массивом состояний).
+        """
+        own_hp, own_mana, opp_hp, opp_mana = (P_HP, P_MANA, E_HP, E_MANA) if by_player else (E_HP, E_MANA, P_HP, P_MANA)
+        maps = [np.arange(n, dtype=np.intp) for n in self.shape]
+        legal_shape = [1, 1, 1, 1]
+        legal_shape[own_mana] = self.shape[own_mana]
+
+        if spec is None:
+            maps[opp_hp] = self._map(opp_hp, lambda v: v - self.basic)
+            return maps, np.ones(legal_shape, dtype=bool)
+
+        legal = (self.lattices[own_mana] >= spec.cost).reshape(legal_shape)
+        maps[own_mana] = self._map(own_mana, lambda v: v - spec.cost if v >= spec.cost else v)
+        if spec.spell_type == SpellType.DAMAGE:
+            maps[opp_hp] = self._map(opp_hp, lambda v: v - spec.power)
+        elif spec.spell_type == SpellType.HEAL:
+            maps[own_hp] = self._map(own_hp, lambda v: v + spec.power)
+        elif spec.spell_type == SpellType.MANA:
+            maps[opp_mana] = self._map(opp_mana, lambda v: v + spec.power)
+        return maps, legal
+
+    def _player_distribution(self) -> np.ndarray:
+        """P(действие игрока | его мана): форма (1 + число спеллов, размер решётки маны)"""
+        distribution = np.zeros((1 + len(self.specs), self.shape[P_MANA]))
+        uniform = self.player_model == "uniform" or isinstance(self.player_model, RandomPolicy)
+        names = [s.name for s in self.specs]
+        for j, mana in enumerate(self.lattices[P_MANA]):
+            available = self.grimoire.affordable_spells(int(mana))
+            if uniform:
+                rows = [0] + [1 + names.index(s.name) for s in available]
+                distribution[rows, j] = 1.0 / len(rows)
+                continue
+            action = self.player_model.choose_action(None, None, available)
+            if action.get("type") == "cast_spell":
+                distribution[1 + names.index(action["spell_name"]), j] = 1.0
+            else:
+                distribution[0, j] = 1.0
+        return distribution
+
+    def cache_key(self) -> str:
+        """Хэш всего, от чего зависят таблицы"""
+        content = json.dumps([
+            FORMAT_VERSION,
+            [(s.name, s.cost, s.spell_type.value, s.power) for s in self.specs],
+            self.player_stats, self.enemy_stats, self.basic,
+            sorted(t.value for t in self.enemy_types), self.max_rounds,
+            [settings.MIN_HP, settings.MIN_MANA],
+        ])
+        digest = hashlib.blake2b(content.encode(), digest_size=16)
+        digest.update(np.ascontiguousarray(self.player_policy).tobytes())
+        return digest.hexdigest()
+
+    # ---------- решение ----------
+
+    def _fix_terminal(self, values: np.ndarray, enemy_dead: float, player_dead: float) -> np.ndarray:
+        values[:, :, 0, :] = enemy_dead
+        values[0, :, :, :] = player_dead
+        return values
+
+    def solve(self) -> PolicyTable:
+        zero_hp_is_lattice = self.lattices[P_HP][0] == settings.MIN_HP and self.lattices[E_HP][0] == settings.MIN_HP
+        if not zero_hp_is_lattice:
+            raise ValueError('Решётка HP не доходит до нуля: бой не может закончиться')
+
+        enemy_moves = [(BASIC_ATTACK, *self._transition(None, False))]
+        enemy_moves += [(s.index, *self._transition(s, False)) for s in self.enemy_specs]
+        player_moves = [(0, *self._transition(None, True))]
+        player_moves += [(1 + s.index, *self._transition(s, True)) for s in self.specs]
+        # вероятность хода игрока по его мане — в форму массива состояний
+        player_prob = self.player_policy.reshape(len(self.specs) + 1, 1, self.shape[P_MANA], 1, 1)
+
+        # Начало раунда после лимита: ничья
+        enemy_win_next = self._fix_terminal(np.zeros(self.shape), 0.0, 1.0)
+        player_win_next = self._fix_terminal(np.zeros(self.shape), 1.0, 0.0)
+        rounds_next = np.zeros(self.shape)
+        policy = np.full(self.shape, BASIC_ATTACK, dtype=np.int8)
+
+        for iteration in range(self.max_rounds):
+            # Ход врага: максимум вероятности его победы
+            best = np.full(self.shape, -np.inf)
+            policy = np.full(self.shape, BASIC_ATTACK, dtype=np.int8)
+            enemy_turn_player_win = np.zeros(self.shape)
+            enemy_turn_rounds = np.zeros(self.shape)
+            for action, maps, legal in enemy_moves:
+                grid = np.ix_(*maps)
+                value = np.where(legal, enemy_win_next[grid], -np.inf)
+                better = value > best
+                best = np.where(better, value, best)
+                policy[better] = action
+                enemy_turn_player_win = np.where(better, player_win_next[grid], enemy_turn_player_win)
+                enemy_turn_rounds = np.where(better, rounds_next[grid], enemy_turn_rounds)
+            enemy_turn_enemy_win = self._fix_terminal(best, 0.0, 1.0)
+            enemy_turn_player_win = self._fix_terminal(enemy_turn_player_win, 1.0, 0.0)
+            enemy_turn_rounds = self._fix_terminal(enemy_turn_rounds, 0.0, 0.0)
+
+            # Ход игрока (начало раунда): ожидание по его модели
+            enemy_win = np.zeros(self.shape)
+            player_win = np.zeros(self.shape)
+            rounds = np.ones(self.shape)
+            for row, maps, legal in player_moves:
+                grid = np.ix_(*maps)
+                probability = np.where(legal, player_prob[row], 0.0)
+                enemy_win += probability * enemy_turn_enemy_win[grid]
+                player_win += probability * enemy_turn_player_win[grid]
+                rounds += probability * enemy_turn_rounds[grid]
+            enemy_win = self._fix_terminal(enemy_win, 0.0, 1.0)
+            player_win = self._fix_terminal(player_win, 1.0, 0.0)
+            rounds = self._fix_terminal(rounds, 0.0, 0.0)
+
+            converged = (
+                np.array_equal(enemy_win, enemy_win_next)
+                and np.array_equal(player_win, player_win_next)
+                and np.array_equal(rounds, rounds_next)
+            )
+            enemy_win_next, player_win_next, rounds_next = enemy_win, player_win, rounds
+            if converged:
+                logger.debug(f"Таблицы сошлись за {iteration + 1} раундов")
+                break
+
+        return PolicyTable(
+            spell_names=[s.name for s in self.specs],
+            lattices=self.lattices,
+            maxima=self.maxima,
+            policy=policy,
+            enemy_win=np.stack([enemy_win_next, enemy_turn_enemy_win]).astype(np.float32),
+            player_win=np.stack([player_win_next, enemy_turn_player_win]).astype(np.float32),
+            rounds=np.stack([rounds_next, enemy_turn_rounds]).astype(np.float32),
+        )
+
+
+def solve_policy(
+        grimoire: Grimoire,
+        player_stats: tuple[int, int],
+        enemy_stats: tuple[int, int],
+        cache_dir: str | None = DEFAULT_CACHE_DIR,
+        **solver_options,
+) -> PolicyTable:
+    """
+    Таблицы для гримуара и характеристик: с диска, если уже считались, иначе решить и сохранить.
+
+    Args:
+        cache_dir: Каталог кэша (None — не кэшировать)
+        solver_options: basic_attack_damage, player_model, enemy_types, max_rounds (см. PolicySolver)
+    """
+    solver = PolicySolver(grimoire, player_stats, enemy_stats, **solver_options)
+    path = os.path.join(cache_dir, f"{solver.cache_key()}.npz") if cache_dir else None
+    if path and os.path.exists(path):
+        try:
+            return PolicyTable.load(path)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Кэш таблиц {path} не читается ({e}), пересчитываем")
+
+    table = solver.solve()
+    if path:
+        table.save(path)
+    return table
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    from domain.battle.headless import run_headless
+    from domain.entities.character import Character
+    from domain.entities.enemy import Enemy
+    from domain.entities.spell import Spell
+
+    parser = argparse.ArgumentParser(description="Таблицы оптимального врага: прогноз против прогона боёв")
+    parser.add_argument("--battles", type=int, default=2000, help="боёв для эмпирической проверки")
+    parser.add_argument("--no-cache", action="store_true", help="не читать и не писать кэш на диск")
+    args = parser.parse_args()
+
+    spells = [Spell("Fireball", 30, 3, SpellType.DAMAGE, 20), Spell("Healing", 20, 2, SpellType.HEAL, 25)]
+    player_stats, enemy_stats = (100, 60), (100, 100)  # (max_hp, max_mana)
+
+    started = time.perf_counter()
+    cache_dir = None if args.no_cache else DEFAULT_CACHE_DIR
+    table = solve_policy(Grimoire(spells), player_stats, enemy_stats, cache_dir=cache_dir)
+    solve_s = time.perf_counter() - started
+    predicted = table.win_probability(player_stats[0], player_stats[1], enemy_stats[0], enemy_stats[1])
+    expected_rounds = table.expected_rounds(player_stats[0], player_stats[1], enemy_stats[0], enemy_stats[1])
+
+    outcomes = {"player": 0, "enemy": 0, "draw": 0}
+    rounds = 0
+    for seed in range(args.battles):
+        grimoire = Grimoire(spells)
+        result = run_headless(
+            Character(player_stats[1], player_stats[0], "Артур"),
+            Enemy(enemy_stats[1], enemy_stats[0], "Темный маг", grimoire),
+            grimoire,
+            player_policy=RandomPolicy(seed),
+            enemy_policy=TablePolicy(table),
+        )
+        outcomes[result.winner] += 1
+        rounds += result.rounds
+
+    print(f"состояний: {table.states:,}, policy: {table.policy.nbytes:,} Б, решение/загрузка: {solve_s * 1000:.1f} мс")
+    print(f"победа врага: прогноз {predicted['enemy']:.1%}, бои {outcomes['enemy'] / args.battles:.1%}")
+    print(f"победа игрока: прогноз {predicted['player']:.1%}, бои {outcomes['player'] / args.battles:.1%}")
+    print(f"раундов: прогноз {expected_rounds:.2f}, бои {rounds / args.battles:.2f}")
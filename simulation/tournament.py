@@ -0,0 +1,293 @@
+"""
+Турнир по сетке конфигураций: гримуары × статы игрока × статы врага × ИИ врага.
+
+Бои режутся на чанки (единицы работы) и разлетаются по ProcessPoolExecutor; каждый
+чанк — один вызов BatchSimulator. Воркеры возвращают только счётчики и гистограмму
+длины боя, так что IPC не растёт с числом боёв и масштабирование близко к линейному.
+Результаты стримятся по мере готовности чанков — длинный прогон можно прервать.
+
+Запуск: python -m simulation.tournament --battles 200000 --workers 8
+"""
+import itertools
+import os
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Iterator
+
+import numpy as np
+
+from domain.battle.policies import (
+    ActionPolicy,
+    BasicAttackPolicy,
+    FirstDamageSpellPolicy,
+    PriorityPolicy,
+    RandomPolicy,
+)
+from domain.entities.grimoire import Grimoire
+from domain.entities.spell import Spell
+from simulation.batch import BatchSimulator, PLAYER_WON, ENEMY_WON, DRAW
+
+SpellSpec = tuple  # (name, mana_cost, level, SpellType, power)
+
+
+@dataclass(frozen=True)
+class StatLine:
+    max_hp: int
+    max_mana: int
+
+
+@dataclass(frozen=True)
+class TournamentConfig:
+    """Одна точка сетки"""
+    name: str
+    spells: tuple[SpellSpec, ...]
+    player: StatLine
+    enemy: StatLine
+    enemy_ai: str = "first_damage"
+    player_ai: str = "random"
+
+
+def make_policy(ai: str, seed: int) -> ActionPolicy:
+    """
+    Стратегия по имени: "basic", "first_damage", "random" или "priority:Spell1,Spell2"
+    """
+    if ai == "basic":
+        return BasicAttackPolicy()
+    if ai == "first_damage":
+        return FirstDamageSpellPolicy()
+    if ai == "random":
+        return RandomPolicy(seed)
+    if ai.startswith("priority:"):
+        return PriorityPolicy([name for name in ai.split(":", 1)[1].split(",") if name])
+    raise ValueError(f"Неизвестный ИИ: {ai}")
+
+
+def build_grid(
+        grimoires: dict[str, list[SpellSpec]],
+        players: list[StatLine],
+        enemies: list[StatLine],
+        enemy_ais: list[str],
+        player_ai: str = "random",
+) -> list[TournamentConfig]:
+    """Декартово произведение всех вариантов"""
+    grid = []
+    for (g_name, spells), player, enemy, enemy_ai in itertools.product(grimoires.items(), players, enemies, enemy_ais):
+        name = f"{g_name} | P{player.max_hp}/{player.max_mana} vs E{enemy.max_hp}/{enemy.max_mana} | {enemy_ai}"
+        grid.append(TournamentConfig(name, tuple(spells), player, enemy, enemy_ai, player_ai))
+    return grid
+
+
+@dataclass
+class _ChunkStats:
+    """Что воркер возвращает за один чанк"""
+    config_index: int
+    battles: int
+    player_wins: int
+    enemy_wins: int
+    draws: int
+    rounds_histogram: np.ndarray
+    player_exhausted: int
+    enemy_exhausted: int
+
+
+def _run_chunk(config_index: int, config: TournamentConfig, n_battles: int, seed: int, max_rounds: int) -> _ChunkStats:
+    player_seed, enemy_seed = np.random.SeedSequence(seed).generate_state(2)
+    simulator = BatchSimulator(
+        Grimoire([Spell(*spec) for spec in config.spells]),
+        make_policy(config.player_ai, int(player_seed)),
+        make_policy(config.enemy_ai, int(enemy_seed)),
+        max_rounds=max_rounds,
+    )
+    result = simulator.run(
+        n_battles,
+        config.player.max_hp, config.player.max_mana,
+        config.enemy.max_hp, config.enemy.max_mana,
+    )
+    return _ChunkStats(
+        config_index=config_index,
+        battles=n_battles,
+        player_wins=int((result.winner == PLAYER_WON).sum()),
+        enemy_wins=int((result.winner == ENEMY_WON).sum()),
+        draws=int((result.winner == DRAW).sum()),
+        rounds_histogram=np.bincount(result.rounds, minlength=max_rounds + 1),
+        player_exhausted=int(result.player_exhausted.sum()),
+        enemy_exhausted=int(result.enemy_exhausted.sum()),
+    )
+
+
+class ConfigReport:
+    """Накопленная статистика одной конфигурации (сливается из чанков)"""
+
+    def __init__(self, config: TournamentConfig, planned_battles: int, max_rounds: int):
+        self.config = config
+        self.planned_battles = planned_battles
+        self.battles = 0
+        self.player_wins = 0
+        self.enemy_wins = 0
+        self.draws = 0
+        self.player_exhausted = 0
+        self.enemy_exhausted = 0
+        self.rounds_histogram = np.zeros(max_rounds + 1, dtype=np.int64)
+
+    def merge(self, chunk: _ChunkStats) -> None:
+        self.battles += chunk.battles
+        self.player_wins += chunk.player_wins
+        self.enemy_wins += chunk.enemy_wins
+        self.draws += chunk.draws
+        self.player_exhausted += chunk.player_exhausted
+        self.enemy_exhausted += chunk.enemy_exhausted
+        self.rounds_histogram += chunk.rounds_histogram
+
+    @property
+    def complete(self) -> bool:
+        return self.battles >= self.planned_battles
+
+    def _rate(self, count: int) -> float:
+        return count / self.battles if self.battles else 0.0
+
+    @property
+    def player_win_rate(self) -> float:
+        return self._rate(self.player_wins)
+
+    @property
+    def enemy_win_rate(self) -> float:
+        return self._rate(self.enemy_wins)
+
+    @property
+    def draw_rate(self) -> float:
+        return self._rate(self.draws)
+
+    @property
+    def player_mana_exhaustion_rate(self) -> float:
+        return self._rate(self.player_exhausted)
+
+    @property
+    def enemy_mana_exhaustion_rate(self) -> float:
+        return self._rate(self.enemy_exhausted)
+
+    @property
+    def mean_rounds(self) -> float:
+        if not self.battles:
+            return 0.0
+        return float(np.dot(np.arange(len(self.rounds_histogram)), self.rounds_histogram) / self.battles)
+
+    def rounds_percentile(self, q: float) -> int:
+        """Перцентиль длины боя (q в процентах) по гистограмме"""
+        if not self.battles:
+            return 0
+        cumulative = np.cumsum(self.rounds_histogram)
+        return int(np.searchsorted(cumulative, q / 100 * self.battles))
+
+    def as_dict(self) -> dict:
+        return {
+            "name": self.config.name,
+            "battles": self.battles,
+            "player_win_rate": self.player_win_rate,
+            "enemy_win_rate": self.enemy_win_rate,
+            "draw_rate": self.draw_rate,
+            "mean_rounds": self.mean_rounds,
+            "p50_rounds": self.rounds_percentile(50),
+            "p90_rounds": self.rounds_percentile(90),
+            "p99_rounds": self.rounds_percentile(99),
+            "player_mana_exhaustion_rate": self.player_mana_exhaustion_rate,
+            "enemy_mana_exhaustion_rate": self.enemy_mana_exhaustion_rate,
+        }
+
+
+class Tournament:
+    """Параллельный прогон сетки конфигураций"""
+
+    def __init__(
+            self,
+            configs: list[TournamentConfig],
+            battles_per_config: int,
+            chunk_size: int = 50_000,
+            workers: int | None = None,
+            max_rounds: int = 200,
+            seed: int = 0,
+    ):
+        self.configs = configs
+        self.battles_per_config = battles_per_config
+        self.chunk_size = chunk_size
+        self.workers = workers or os.cpu_count() or 1
+        self.max_rounds = max_rounds
+        self.seed = seed
+        self.reports = [ConfigReport(c, battles_per_config, max_rounds) for c in configs]
+
+    def _work_units(self) -> Iterator[tuple]:
+        # Чередуем конфигурации, чтобы частичные результаты копились по всей сетке сразу
+        n_chunks = -(-self.battles_per_config // self.chunk_size)
+        for chunk_index in range(n_chunks):
+            n_battles = min(self.chunk_size, self.battles_per_config - chunk_index * self.chunk_size)
+            for config_index, config in enumerate(self.configs):
+                seed = int(np.random.SeedSequence([self.seed, config_index, chunk_index]).generate_state(1)[0])
+                yield config_index, config, n_battles, seed, self.max_rounds
+
+    def run_iter(self) -> Iterator[ConfigReport]:
+        """
+        Стримит обновлённый ConfigReport после каждого готового чанка.
+        Прерывание итерации (break/close) отменяет оставшуюся работу.
+        """
+        units = self._work_units()
+        executor = ProcessPoolExecutor(max_workers=self.workers)
+        # Держим в полёте ограниченное число чанков: память постоянна, отмена быстрая
+        max_in_flight = 2 * self.workers
+        pending: set[Future] = set()
+        try:
+            for unit in itertools.islice(units, max_in_flight):
+                pending.add(executor.submit(_run_chunk, *unit))
+
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    chunk = future.result()
+                    report = self.reports[chunk.config_index]
+                    report.merge(chunk)
+                    for unit in itertools.islice(units, 1):
+                        pending.add(executor.submit(_run_chunk, *unit))
+                    yield report
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def run(self) -> list[ConfigReport]:
+        for _ in self.run_iter():
+            pass
+        return self.reports
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    from domain.enums.spell_type import SpellType
+
+    parser = argparse.ArgumentParser(description="Турнир конфигураций спеллов и существ")
+    parser.add_argument("--battles", type=int, default=200_000, help="боёв на конфигурацию")
+    parser.add_argument("--chunk", type=int, default=50_000, help="боёв в одной единице работы")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    grid = build_grid(
+        grimoires={
+            "main": [("Fireball", 30, 3, SpellType.DAMAGE, 20), ("Healing", 20, 2, SpellType.HEAL, 25)],
+            "cheap_fire": [("Fireball", 20, 3, SpellType.DAMAGE, 15), ("Healing", 20, 2, SpellType.HEAL, 25)],
+        },
+        players=[StatLine(100, 60), StatLine(80, 100)],
+        enemies=[StatLine(80, 50), StatLine(100, 100)],
+        enemy_ais=["first_damage", "random", "basic"],
+    )
+
+    tournament = Tournament(grid, args.battles, chunk_size=args.chunk, workers=args.workers)
+    started = time.perf_counter()
+    for report in tournament.run_iter():
+        if report.complete:
+            print(
+                f"{report.config.name:<55} win={report.player_win_rate:6.1%} "
+                f"rounds={report.mean_rounds:5.2f} p90={report.rounds_percentile(90):3d} "
+                f"exhausted P/E={report.player_mana_exhaustion_rate:5.1%}/{report.enemy_mana_exhaustion_rate:5.1%}"
+            )
+    elapsed = time.perf_counter() - started
+    total = len(grid) * args.battles
+    print(f"✅ {total:,} боёв за {elapsed:.2f} c ({total / elapsed:,.0f} боёв/с)")
@@ -0,0 +1,8 @@
+"""Векторный симулятор (simulation/batch.py) против скалярного Battle на общем корпусе"""
+from simulation.corpus import build_corpus, check_corpus
+
+
+def test_batch_matches_scalar_on_corpus():
+    corpus = build_corpus()
+    assert corpus
+    assert check_corpus(corpus) == []
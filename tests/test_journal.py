@@ -0,0 +1,118 @@
+"""Журнал боя: запись → чтение → воспроизведение сходится с живым боем бит в бит"""
+import io
+
+import pytest
+
+from domain.battle.battle import Battle
+from domain.battle.headless import muted_logging
+from domain.battle.journal import (
+    END, BattleJournal, JournalBattle, _RECORD, read_journal, replay, verify,
+)
+from domain.battle.policies import RandomPolicy
+from domain.battle.presenters import SilentPresenter
+from domain.battle.status_effects import ApplyStatus, StatusKind
+from domain.entities.character import Character
+from domain.entities.enemy import Enemy
+from domain.entities.grimoire import Grimoire
+from domain.entities.spell import Spell
+from domain.enums.spell_type import SpellType
+
+PLAIN_SPELLS = [
+    Spell("Fireball", 30, 3, SpellType.DAMAGE, "3d6+2"),
+    Spell("Healing", 20, 2, SpellType.HEAL, "2d8 adv"),
+    Spell("Spark", 10, 1, SpellType.DAMAGE, 8),
+]
+# Статусы: обработчики-объекты в журнал не пишутся, гримуар передаётся в verify
+STATUS_SPELLS = [
+    Spell("Fireball", 30, 3, SpellType.DAMAGE, "3d6+2"),
+    Spell("Poison", 15, 2, SpellType.DAMAGE, 4, effect=ApplyStatus(StatusKind.DOT, 3)),
+    Spell("Ward", 20, 2, SpellType.HEAL, 15, effect=ApplyStatus(StatusKind.SHIELD, 2)),
+    Spell("Spark", 10, 1, SpellType.DAMAGE, 8),
+]
+
+# Индексы полей записи _RECORD: вид и HP игрока
+_KIND, _PLAYER_HP = 0, 5
+
+
+def run_journaled(spells: list[Spell], seeds: range) -> tuple[bytes, list[str]]:
+    """Бои со случайными политиками в журнал в памяти: (байты журнала, победители)"""
+    stream = io.BytesIO()
+    journal = BattleJournal(stream=stream)
+    winners = []
+    with muted_logging():
+        for seed in seeds:
+            grimoire = Grimoire(spells)
+            result = Battle(
+                Character(60, 100, "Артур"),
+                Enemy(50, 80, "Темный маг", grimoire),
+                grimoire,
+                player_policy=RandomPolicy(seed),
+                enemy_policy=RandomPolicy(-seed - 1),
+                presenter=SilentPresenter(),
+                max_rounds=1000,
+                basic_attack="1d8+2",
+                seed=seed,
+                journal=journal,
+            ).run()
+            winners.append(result.winner)
+    journal.flush()
+    return stream.getvalue(), winners
+
+
+@pytest.mark.parametrize("spells, grimoire", [
+    (PLAIN_SPELLS, None),
+    (STATUS_SPELLS, Grimoire(STATUS_SPELLS)),
+])
+def test_replay_matches_recorded_battles(spells, grimoire):
+    data, winners = run_journaled(spells, range(30))
+    battles = list(read_journal(data))
+
+    assert len(battles) == len(winners)
+    assert all(journal_battle.complete for journal_battle in battles)
+    results = [result for _, result in verify(battles, grimoire)]
+    assert [result.mismatches for result in results] == [[] for _ in results]
+    assert [result.winner for result in results] == winners
+
+
+def test_replay_until_round():
+    data, _ = run_journaled(PLAIN_SPELLS, range(1))
+    journal_battle = next(read_journal(data))
+
+    result = replay(journal_battle, until_round=3)
+
+    assert result.ok
+    assert result.battle.round_number == 3
+    assert result.records < len(journal_battle)
+
+
+def test_tampered_record_is_a_mismatch():
+    data, _ = run_journaled(PLAIN_SPELLS, range(1))
+    journal_battle = next(read_journal(data))
+    records = list(_RECORD.iter_unpack(journal_battle.records))
+    # первая запись, после которой HP игрока ещё положителен, — подменяем его на единицу меньше
+    target = next(index for index, record in enumerate(records) if record[_PLAYER_HP] > 0)
+    tampered = list(records[target])
+    tampered[_PLAYER_HP] -= 1
+    records[target] = tuple(tampered)
+    packed = memoryview(b"".join(_RECORD.pack(*record) for record in records))
+
+    result = replay(JournalBattle(journal_battle.header, packed), stop_on_mismatch=True)
+
+    assert len(result.mismatches) == 1
+    mismatch = result.mismatches[0]
+    assert mismatch.record == target
+    assert mismatch.expected[0] == mismatch.actual[0] - 1
+    assert result.records == target + 1
+
+
+def test_torn_tail_yields_incomplete_last_battle():
+    data, _ = run_journaled(PLAIN_SPELLS, range(3))
+    # падение посреди записи последнего боя: обрыв не на границе записи
+    torn = data[:len(data) - 2 * _RECORD.size - 5]
+
+    battles = list(read_journal(torn))
+
+    assert len(battles) == 3
+    assert [journal_battle.complete for journal_battle in battles] == [True, True, False]
+    assert _RECORD.unpack_from(battles[-1].records, (len(battles[-1]) - 1) * _RECORD.size)[_KIND] != END
+    assert replay(battles[-1]).ok
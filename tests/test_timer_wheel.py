@@ -0,0 +1,73 @@
+"""Колесо таймеров против эталона «отсортированный список» на случайных расписаниях"""
+import random
+
+import pytest
+
+from domain.battle.timer_wheel import TimerWheel
+
+
+class ReferenceTimers:
+    """Эталон: все события в одном списке, срабатывание — полный отбор"""
+
+    def __init__(self, start_round: int):
+        self.now = start_round
+        self.pending: list[tuple[int, int, object]] = []
+        self.seq = 0
+
+    def schedule(self, round_number: int, item) -> None:
+        self.pending.append((round_number, self.seq, item))
+        self.seq += 1
+
+    def advance(self, round_number: int) -> list:
+        self.now = max(self.now, round_number)
+        due = sorted(entry for entry in self.pending if entry[0] <= self.now)
+        self.pending = [entry for entry in self.pending if entry[0] > self.now]
+        return [item for _, _, item in due]
+
+    def entries(self) -> list[tuple[int, object]]:
+        return [(round_number, item) for round_number, _, item in sorted(self.pending)]
+
+
+# Маленькие колёса — чтобы часто срабатывали пересыпания уровней и очередь за горизонтом
+@pytest.mark.parametrize("slots, levels", [(2, 1), (3, 2), (4, 2), (8, 3)])
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_reference(slots, levels, seed):
+    rng = random.Random(seed)
+    start = rng.randrange(0, 1000)
+    wheel, reference = TimerWheel(slots, levels, start), ReferenceTimers(start)
+    horizon = slots ** levels
+
+    for step in range(2000):
+        if rng.random() < 0.6:
+            # ближние раунды, дальние (за горизонтом колёс) и несколько событий на один раунд
+            distance = rng.choice([1, 1, 2, rng.randrange(1, slots + 1), rng.randrange(1, 3 * horizon + 2)])
+            round_number = wheel.now + distance
+            if reference.pending and rng.random() < 0.3:
+                # в раунд, где уже ждёт событие (возможно, с дальнего уровня): важен порядок постановки
+                round_number = rng.choice(reference.pending)[0]
+            wheel.schedule(round_number, step)
+            reference.schedule(round_number, step)
+        else:
+            round_number = wheel.now + rng.choice([0, 1, 1, 2, rng.randrange(1, 2 * horizon + 2)])
+            assert wheel.advance(round_number) == reference.advance(round_number)
+            assert wheel.now == reference.now
+        assert len(wheel) == len(reference.pending)
+
+    assert wheel.entries() == reference.entries()
+    final = wheel.now + 4 * horizon
+    assert wheel.advance(final) == reference.advance(final)
+    assert len(wheel) == 0
+
+
+def test_advance_backwards_is_a_noop():
+    wheel = TimerWheel(4, 2, start_round=10)
+    wheel.schedule(12, "a")
+    assert wheel.advance(5) == []
+    assert wheel.now == 10
+    assert wheel.advance(12) == ["a"]
+
+
+def test_schedule_in_the_past_is_rejected():
+    wheel = TimerWheel(4, 2, start_round=10)
+    with pytest.raises(ValueError):
+        wheel.schedule(10, "a")
@@ -0,0 +1,82 @@
+"""
+Бенчмарк бросков костей.
+
+- разбор: строка каждый раз заново против кэша Dice.parse;
+- броски: цикл Dice.roll против одного Dice.sample на весь массив;
+- вопрос «какой шанс выбросить не меньше X»: точное распределение (свёртка) против
+  Монте-Карло на миллион бросков — время и ошибка.
+
+Запуск: python -m tools.bench_dice --rolls 1000000
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from domain.entities import dice as dice_module
+from domain.entities.dice import Dice
+
+EXPRESSIONS = ["3d6+2", "2d8 adv", "8d6", "d20 dis", "2d8-1d4+3"]
+
+
+def bench_parse(expression: str, repeat: int) -> tuple[float, float]:
+    """(мкс на разбор без кэша, мкс на разбор с кэшем)"""
+    uncached = dice_module._parse.__wrapped__
+    started = time.perf_counter()
+    for _ in range(repeat):
+        uncached(expression)
+    raw_us = 1e6 * (time.perf_counter() - started) / repeat
+
+    started = time.perf_counter()
+    for _ in range(repeat):
+        Dice.parse(expression)
+    cached_us = 1e6 * (time.perf_counter() - started) / repeat
+    return raw_us, cached_us
+
+
+def bench_rolls(dice: Dice, rolls: int) -> tuple[float, float]:
+    """(бросков/с циклом roll, бросков/с одним sample)"""
+    scalar_rng = random.Random(0)
+    loop_rolls = min(rolls, 200_000)
+    started = time.perf_counter()
+    for _ in range(loop_rolls):
+        dice.roll(scalar_rng)
+    loop_rate = loop_rolls / (time.perf_counter() - started)
+
+    started = time.perf_counter()
+    dice.sample(np.random.default_rng(0), rolls)
+    bulk_rate = rolls / (time.perf_counter() - started)
+    return loop_rate, bulk_rate
+
+
+def bench_question(dice: Dice, rolls: int) -> tuple[float, float, float]:
+    """(мс на точный ответ, мс на Монте-Карло, |ошибка| Монте-Карло) для P(X >= медианы)"""
+    dice_module._distribution.cache_clear()
+    started = time.perf_counter()
+    distribution = dice.distribution()
+    threshold = distribution.percentile(50)
+    exact = distribution.at_least(threshold)
+    exact_ms = 1000 * (time.perf_counter() - started)
+
+    started = time.perf_counter()
+    estimate = float((dice.sample(np.random.default_rng(1), rolls) >= threshold).mean())
+    monte_carlo_ms = 1000 * (time.perf_counter() - started)
+    return exact_ms, monte_carlo_ms, abs(estimate - exact)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rolls", type=int, default=1_000_000)
+    parser.add_argument("--parse-repeat", type=int, default=20_000)
+    args = parser.parse_args()
+
+    print(f"{'выражение':<12} | {'разбор, мкс':>19} | {'roll, тыс/с':>11} | {'sample, млн/с':>13} "
+          f"| {'точно, мс':>9} | {'МК, мс':>7} | ошибка МК")
+    for expression in EXPRESSIONS:
+        raw_us, cached_us = bench_parse(expression, args.parse_repeat)
+        dice = Dice.parse(expression)
+        loop_rate, bulk_rate = bench_rolls(dice, args.rolls)
+        exact_ms, monte_carlo_ms, error = bench_question(dice, args.rolls)
+        print(f"{expression:<12} | {raw_us:>7.2f} → {cached_us:>5.2f} кэш | {loop_rate / 1e3:>11.0f} "
+              f"| {bulk_rate / 1e6:>13.1f} | {exact_ms:>9.3f} | {monte_carlo_ms:>7.1f} | {error:.5f}")
@@ -0,0 +1,172 @@
+"""
+Бенчмарк полного пути DM офлайн: Battle → DungeonMasterService → PerplexityClient → стенд.
+
+Бои идут параллельно в потоках с общим клиентом (как несколько игроков на одном сервере).
+Замеряется каждый вызов DM целиком — с ретраями, хеджем и парсингом JSON.
+
+Запуск: python -m tools.bench_dm_pipeline --battles 20 --concurrency 8 --p-429 0.05 --p-fenced 0.1
+
+Кассета: --record dm.cassette пишет трафик, --replay dm.cassette гоняет те же бои без сети
+(с --concurrency 1 бои детерминированы и воспроизводятся точь-в-точь). Так сравнивается
+накладной расход движка между релизами: DM отвечает мгновенно, остаётся только наш код.
+
+--cache --speculate --coalesce --memory — та же связка DM, что в main.py: семантический кэш
+поверх DM с памятью, спекулятивный ход врага и совмещённый ход.
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from loguru import logger
+
+from domain import Enemy, Grimoire, Spell, SpellType
+from domain.battle.battle import Battle
+from domain.battle.policies import RandomPolicy
+from domain.battle.presenters import SilentPresenter
+from domain.battle.speculation import EnemyActionSpeculator
+from domain.entities.character import Character
+from services.cassette import Cassette
+from services.dm_cache import CachedDungeonMasterService
+from services.dm_memory import DungeonMemory
+from services.dm_service import DungeonMasterService
+from services.perplexity_client import PerplexityClient
+from services.resilience import CircuitBreaker
+from tools.fake_perplexity import add_fault_arguments, faults_from_args, serve_in_thread
+
+DM_METHODS = ("react_to_action", "react_to_action_stream", "choose_enemy_action", "play_enemy_turn")
+
+
+class TimedDungeonMaster:
+    """Прокси DM: время каждого вызова и доля пустых (None) ответов"""
+
+    def __init__(self, dm: DungeonMasterService):
+        self.dm = dm
+        self.client = dm.client
+        self.calls: list[float] = []
+        self.failed = 0
+
+    def is_available(self) -> bool:
+        return self.dm.is_available()
+
+    def __getattr__(self, name):
+        method = getattr(self.dm, name)
+        if name not in DM_METHODS:
+            return method
+
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            response = None  # отвергнутый ход (InvalidEnemyTurn) тоже считается пустым
+            try:
+                response = method(*args, **kwargs)
+                return response
+            finally:
+                self.calls.append(time.perf_counter() - started)
+                if response is None:
+                    self.failed += 1
+
+        return timed
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+def run_battle(seed: int, dm, coalesce: bool, speculate: bool) -> tuple[str, EnemyActionSpeculator | None]:
+    """Победитель и спекулятор боя (его счётчики попаданий)"""
+    fireball = Spell("Fireball", 30, 3, SpellType.DAMAGE, 20)
+    healing = Spell("Healing", 20, 2, SpellType.HEAL, 25)
+    grimoire = Grimoire([fireball, healing])
+    battle = Battle(
+        Character(60, 100, "Артур"),
+        Enemy(50, 80, "Темный маг", grimoire),
+        grimoire,
+        dm=dm,
+        player_policy=RandomPolicy(seed),
+        presenter=SilentPresenter(),
+        max_rounds=50,
+        coalesce_dm_turn=coalesce,
+        speculate_enemy=speculate,
+    )
+    return battle.run().winner, battle.speculator
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--battles", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--timeout", type=int, default=3, help="потолок таймаута клиента, с")
+    parser.add_argument("--coalesce", action="store_true", help="ход врага одним запросом")
+    parser.add_argument("--hedge", action="store_true")
+    parser.add_argument("--memory", action="store_true", help="память DM: последние раунды + сводка")
+    parser.add_argument("--cache", action="store_true", help="семантический кэш ответов DM")
+    parser.add_argument("--speculate", action="store_true", help="спекулятивный выбор хода врага")
+    cassette_group = parser.add_mutually_exclusive_group()
+    cassette_group.add_argument("--record", metavar="PATH", help="записать ответы DM в кассету")
+    cassette_group.add_argument("--replay", metavar="PATH", help="воспроизвести кассету вместо стенда")
+    parser.add_argument("--replay-latency", action="store_true", help="выдерживать записанные задержки")
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    logger.disable("domain")
+    logger.disable("services")
+
+    cassette = None
+    if args.record:
+        cassette = Cassette(args.record, Cassette.RECORD)
+    elif args.replay:
+        cassette = Cassette(args.replay, Cassette.REPLAY, simulate_latency=args.replay_latency)
+
+    with serve_in_thread(faults_from_args(args)) as stand:
+        client = PerplexityClient(
+            base_url=stand.url,
+            timeout_s=args.timeout,
+            max_connections=args.concurrency,
+            max_keepalive_connections=args.concurrency,
+            hedge=args.hedge,
+            # стенд сам инжектирует ошибки — breaker не должен глушить замер
+            breaker=CircuitBreaker(failure_threshold=10 ** 9),
+            cassette=cassette,
+        )
+        memory = DungeonMemory() if args.memory else None
+        dm = TimedDungeonMaster(DungeonMasterService(client, memory=memory))
+        # замеряются только вызовы, дошедшие до DM: попадания кэша отвечают без него
+        cache = CachedDungeonMasterService(dm, seed=0) if args.cache else None
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            results = list(pool.map(
+                lambda seed: run_battle(seed, cache or dm, args.coalesce, args.speculate), range(args.battles)
+            ))
+        elapsed = time.perf_counter() - started
+        client.close()
+
+    winners = [winner for winner, _ in results]
+    speculators = [speculator for _, speculator in results if speculator is not None]
+    calls = dm.calls
+    http = client.latency_stats.summary()
+    print(f"Боёв: {args.battles} за {elapsed:.2f} c, победы: { {w: winners.count(w) for w in set(winners)} }")
+    print(
+        f"Вызовов DM: {len(calls)} ({len(calls) / elapsed:.1f}/с), пустых ответов: {dm.failed} | "
+        f"p50 {1000 * percentile(calls, 50):.0f} мс, p95 {1000 * percentile(calls, 95):.0f} мс, "
+        f"p99 {1000 * percentile(calls, 99):.0f} мс"
+    )
+    print(
+        f"HTTP: {http['requests']} запросов, ttfb p99 {http.get('ttfb_p99_ms', 0):.0f} мс | "
+        f"хеджей {client.hedged_requests}, выиграл хедж {client.hedge_wins}"
+    )
+    print(f"Стенд: {stand.stats}")
+    if cassette is not None:
+        print(f"Кассета: {cassette.stats()}")
+    if memory is not None:
+        print(f"Память DM: {memory.stats()}")
+    if cache is not None:
+        print(f"Кэш DM: {cache.stats()}")
+    if speculators:
+        launched = sum(s.launched for s in speculators)
+        hits = sum(s.hits for s in speculators)
+        taken = hits + sum(s.misses for s in speculators)
+        print(
+            f"Спекуляция: запущено {launched}, пригодилось {hits} из {taken} ходов врага "
+            f"({hits / max(taken, 1):.0%}), впустую {launched - hits} запросов"
+        )
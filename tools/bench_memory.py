@@ -0,0 +1,87 @@
+"""
+Бенчмарк памяти: байт на существо для разных представлений.
+
+- dict: раскладка Creature до перехода на __slots__ (те же поля в __dict__)
+- slots: текущий Creature
+- pool: CreaturePool (столбцы int32) и дополнительно цена CreatureHandle, если держать его на каждое существо
+
+Имя у всех существ общее, чтобы сравнивалась только раскладка, а не строки.
+Запуск: python -m tools.bench_memory --count 200000
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+from domain.entities.creature import Creature
+from domain.entities.creature_pool import CreaturePool
+
+NAME = "Гоблин"
+
+
+class DictCreature:
+    """Раскладка Creature до __slots__: атрибуты экземпляра в __dict__"""
+
+    def __init__(self, max_mana: int, max_hp: int, name: str):
+        self.max_hp = max_hp
+        self.max_mana = max_mana
+        self._current_mana = max_mana
+        self._current_hp = max_hp
+        self.level = 1
+        self.name = name
+
+
+def measure(build) -> tuple[object, int]:
+    """(результат build, сколько байт он занял по tracemalloc)"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+
+def bench_access(creatures, repeat: int = 5) -> float:
+    """Наносекунд на чтение current_hp"""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for creature in creatures:
+            creature.current_hp
+    return 1e9 * (time.perf_counter() - started) / (repeat * len(creatures))
+
+
+def bench_vector_read(pool: CreaturePool, repeat: int = 5) -> float:
+    """Наносекунд на существо при чтении HP всего пула одной операцией"""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        int(pool.hp[:len(pool)].sum())
+    return 1e9 * (time.perf_counter() - started) / (repeat * len(pool))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=200_000)
+    args = parser.parse_args()
+    n = args.count
+
+    _, dict_bytes = measure(lambda: [DictCreature(100, 100, NAME) for _ in range(n)])
+    slotted, slots_bytes = measure(lambda: [Creature(100, 100, NAME) for _ in range(n)])
+
+    def build_pool():
+        pool = CreaturePool(capacity=n)
+        pool.add_many(n, 100, 100, NAME)
+        return pool
+
+    pool, pool_bytes = measure(build_pool)
+    handles, handle_bytes = measure(lambda: list(pool))
+
+    print(f"Существ: {n:,}")
+    print(f"  dict (как было)   {dict_bytes / n:6.1f} Б/существо")
+    print(f"  __slots__         {slots_bytes / n:6.1f} Б/существо")
+    print(f"  CreaturePool      {pool_bytes / n:6.1f} Б/существо (+{handle_bytes / n:.1f} за удерживаемый handle)")
+    print(
+        f"Чтение current_hp, нс: slots {bench_access(slotted):.0f}, "
+        f"handle {bench_access(handles):.0f}, "
+        f"пул векторно {bench_vector_read(pool):.2f}"
+    )
@@ -0,0 +1,83 @@
+"""
+Бенчмарк боя команд: стоимость хода при росте числа бойцов.
+
+PartyBattle (куча инициативы + индексы целей) сравнивается с тем же боем, где цель
+каждый ход ищется полным проходом по бойцам, — так выглядел бы наивный перенос
+правила Battle._get_target на команды.
+
+Запуск: python -m tools.bench_party --sizes 10 100 1000 10000
+"""
+import argparse
+import time
+
+from domain.battle.headless import muted_logging
+from domain.battle.party_battle import PartyBattle
+from domain.battle.policies import PriorityPolicy
+from domain.entities.character import Character
+from domain.entities.enemy import Enemy
+from domain.entities.grimoire import Grimoire
+from domain.entities.spell import Spell
+from domain.enums.spell_type import SpellType
+
+
+class RescanPartyBattle(PartyBattle):
+    """Цели полным проходом по всем бойцам каждый ход"""
+
+    def _pick_foe(self, combatant):
+        foes = [c for c in self._by_creature.values() if c.team != combatant.team and c.alive]
+        return min(foes, key=lambda c: (c.creature.current_hp, c.id), default=None)
+
+    def _pick_ally(self, combatant):
+        wounded = [
+            c for c in self._by_creature.values()
+            if c.team == combatant.team and c.alive and c.creature.current_hp < c.creature.max_hp
+        ]
+        return min(wounded, key=lambda c: (c.creature.current_hp / c.creature.max_hp, c.id), default=combatant)
+
+
+def build(battle_cls, size: int) -> PartyBattle:
+    grimoire = Grimoire([
+        Spell("Fireball", 30, 3, SpellType.DAMAGE, 20),
+        Spell("Healing", 20, 2, SpellType.HEAL, 25),
+    ])
+    battle = battle_cls(grimoire, max_rounds=None)
+    for i in range(size // 2):
+        battle.add(Character(100, 100, f"Рыцарь {i}"), "party", PriorityPolicy(["Healing", "Fireball"]),
+                   speed=1.0 + (i % 3) * 0.25)
+        battle.add(Enemy(50, 80, f"Гоблин {i}", grimoire), "horde", speed=1.0 + (i % 2) * 0.5)
+    return battle
+
+
+def bench(battle_cls, size: int, max_turns: int) -> tuple[float, int, str]:
+    """(мкс на ход, ходов, победитель) — бой прерывается после max_turns ходов"""
+    battle = build(battle_cls, size)
+    battle.max_rounds = None
+    turns = 0
+    original_act = battle._act
+
+    def counted_act(combatant):
+        nonlocal turns
+        turns += 1
+        if turns >= max_turns:
+            battle.max_rounds = battle.round_number  # следующий раунд уже не начнётся
+        return original_act(combatant)
+
+    battle._act = counted_act
+    started = time.perf_counter()
+    with muted_logging(("domain",)):
+        result = battle.run()
+    elapsed = time.perf_counter() - started
+    return 1e6 * elapsed / turns, turns, result.winner
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("--max-turns", type=int, default=20000, help="ходов на замер (крупные бои не доигрываются)")
+    args = parser.parse_args()
+
+    print(f"{'бойцов':>7} | {'индексы, мкс/ход':>17} | {'перебор, мкс/ход':>17} | ходов")
+    for size in args.sizes:
+        indexed_us, turns, _ = bench(PartyBattle, size, args.max_turns)
+        rescan_us, _, _ = bench(RescanPartyBattle, size, min(args.max_turns, 2000))
+        print(f"{size:>7} | {indexed_us:>17.1f} | {rescan_us:>17.1f} | {turns}")
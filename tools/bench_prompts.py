@@ -0,0 +1,120 @@
+"""
+Бенчмарк промптов DM: старые f-string промпты против компактных с неизменным префиксом.
+
+Сравниваются время сборки messages, токены промпта (оценка и usage стенда), доля
+закэшированного префикса и задержка на стенде с ценой prefill некэшированных токенов.
+
+Запуск: python -m tools.bench_prompts --calls 200 --ms-per-1k-tokens 400
+"""
+import argparse
+import random
+import time
+
+from loguru import logger
+
+from services.dm_prompts import (
+    build_legacy_messages,
+    build_react_messages,
+    build_choose_enemy_action_messages,
+    build_enemy_turn_messages,
+)
+from services.perplexity_client import PerplexityClient
+from services.prompt_templates import estimate_messages_tokens
+from tools.fake_perplexity import FaultConfig, serve_in_thread
+
+KINDS = ("react", "choose", "turn")
+MAX_TOKENS = {"react": 300, "choose": 200, "turn": 350}
+
+
+def random_request(rng: random.Random) -> tuple[dict, str, dict]:
+    """Случайное состояние боя, actor и доступные врагу действия"""
+    def side(name: str) -> dict:
+        max_hp, max_mana = rng.choice((50, 60, 100)), rng.choice((80, 100))
+        return {
+            "name": name,
+            "current_hp": rng.randint(1, max_hp),
+            "max_hp": max_hp,
+            "current_mana": rng.randint(0, max_mana),
+            "max_mana": max_mana,
+        }
+
+    last_action = rng.choice(({"type": "basic_attack"}, {"type": "cast_spell", "spell_name": "Fireball"}))
+    state = {"round": rng.randint(1, 30), "player": side("Артур"), "enemy": side("Темный маг"), "last_action": last_action}
+    allowed = {"basic_attack": {}}
+    if rng.random() < 0.7:
+        allowed["cast_spell"] = {"available_spells": [{"name": "Fireball", "damage": 20, "mana_cost": 30}]}
+    return state, rng.choice(("player", "enemy")), allowed
+
+
+def build_compact(kind: str, state: dict, actor: str, allowed: dict) -> list[dict]:
+    if kind == "react":
+        return build_react_messages(state, actor)
+    if kind == "choose":
+        return build_choose_enemy_action_messages(state, allowed)
+    return build_enemy_turn_messages(state, allowed)
+
+
+def build_legacy(kind: str, state: dict, actor: str, allowed: dict) -> list[dict]:
+    return build_legacy_messages(kind, state, actor, allowed)
+
+
+BUILDERS = {"legacy": build_legacy, "compact": build_compact}
+
+
+def bench_render(requests: list, repeat: int = 20) -> dict[str, float]:
+    """Микросекунд на сборку одного messages"""
+    result = {}
+    for name, build in BUILDERS.items():
+        started = time.perf_counter()
+        for _ in range(repeat):
+            for state, actor, allowed in requests:
+                for kind in KINDS:
+                    build(kind, state, actor, allowed)
+        result[name] = 1e6 * (time.perf_counter() - started) / (repeat * len(requests) * len(KINDS))
+    return result
+
+
+def bench_stand(name: str, requests: list, ms_per_1k_tokens: float, latency_ms: float) -> tuple[dict, dict]:
+    """Прогон через стенд: usage и задержки клиента"""
+    build = BUILDERS[name]
+    faults = FaultConfig(latency="fixed", latency_ms=latency_ms, ms_per_1k_prompt_tokens=ms_per_1k_tokens, seed=1)
+    with serve_in_thread(faults) as stand, PerplexityClient(base_url=stand.url) as client:
+        for state, actor, allowed in requests:
+            for kind in KINDS:
+                client.chat(build(kind, state, actor, allowed), max_tokens=MAX_TOKENS[kind])
+        return client.usage_stats.summary(), client.latency_stats.summary()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=100, help="состояний боя (× 3 вида запросов)")
+    parser.add_argument("--ms-per-1k-tokens", type=float, default=400.0, help="цена prefill на стенде")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="базовая задержка стенда")
+    args = parser.parse_args()
+
+    logger.disable("services")
+    rng = random.Random(0)
+    requests = [random_request(rng) for _ in range(args.calls)]
+
+    render = bench_render(requests)
+    print("Сборка messages, мкс:", {name: round(us, 1) for name, us in render.items()})
+
+    print("Оценка токенов промпта (system + user):")
+    state, actor, allowed = requests[0]
+    for kind in KINDS:
+        row = []
+        for name, build in BUILDERS.items():
+            messages = build(kind, state, actor, allowed)
+            row.append(
+                f"{name} {estimate_messages_tokens(messages):4d} "
+                f"(префикс {estimate_messages_tokens(messages[:1]):3d})"
+            )
+        print(f"  {kind:<7} " + " | ".join(row))
+
+    for name in BUILDERS:
+        usage, latency = bench_stand(name, requests, args.ms_per_1k_tokens, args.latency_ms)
+        print(
+            f"{name:<8} стенд: prompt {usage['prompt_per_call']:.0f} ток/запрос, "
+            f"из кэша {100 * usage['cached_share']:.0f}% | "
+            f"total p50 {latency['total_p50_ms']:.1f} мс, p99 {latency['total_p99_ms']:.1f} мс"
+        )
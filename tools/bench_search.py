@@ -0,0 +1,73 @@
+"""
+Бенчмарк поискового ИИ врага против стратегии «первый доступный damage-спелл».
+
+Враг получает SearchPolicy (только damage-спеллы, как в Battle), игрок — одну из
+скриптовых стратегий. Печатаются доля побед врага, время на решение, узлы/с и
+попадания в таблицу транспозиций.
+
+Запуск: python -m tools.bench_search --battles 200 --budget-ms 5
+"""
+import argparse
+import time
+
+from domain.battle.headless import run_headless
+from domain.battle.policies import FirstDamageSpellPolicy, PriorityPolicy, RandomPolicy
+from domain.battle.search_policy import SearchPolicy
+from domain.entities.character import Character
+from domain.entities.enemy import Enemy
+from domain.entities.grimoire import Grimoire
+from domain.entities.spell import Spell
+from domain.enums.spell_type import SpellType
+
+SPELLS = [
+    ("Fireball", 30, 3, SpellType.DAMAGE, 20),
+    ("Healing", 20, 2, SpellType.HEAL, 25),
+    ("Spark", 5, 1, SpellType.DAMAGE, 6),
+    ("Meteor", 45, 7, SpellType.DAMAGE, 40),
+]
+
+
+def player_policies(seed: int) -> dict:
+    return {
+        "random": RandomPolicy(seed),
+        "healer": PriorityPolicy(["Healing", "Meteor", "Fireball"]),
+        "nuker": PriorityPolicy(["Meteor", "Fireball", "Spark"]),
+    }
+
+
+def play(enemy_policy, player_policy_name: str, battles: int) -> float:
+    """Доля побед врага"""
+    wins = 0
+    for seed in range(battles):
+        grimoire = Grimoire([Spell(*spec) for spec in SPELLS])
+        result = run_headless(
+            Character(100, 100, "Артур"),
+            Enemy(100, 100, "Темный маг", grimoire),
+            grimoire,
+            player_policies(seed)[player_policy_name],
+            enemy_policy,
+            max_rounds=100,
+        )
+        wins += result.winner == "enemy"
+    return wins / battles
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--battles", type=int, default=100)
+    parser.add_argument("--budget-ms", type=float, default=5.0)
+    parser.add_argument("--opponent", choices=("expectimax", "minimax"), default="expectimax")
+    args = parser.parse_args()
+
+    for name in player_policies(0):
+        baseline = play(FirstDamageSpellPolicy(), name, args.battles)
+        search = SearchPolicy(budget_ms=args.budget_ms, opponent=args.opponent, own_types={SpellType.DAMAGE})
+        started = time.perf_counter()
+        searched = play(search, name, args.battles)
+        elapsed = time.perf_counter() - started
+        stats = search.stats()
+        print(
+            f"против {name:<7} побед врага: первый damage {100 * baseline:5.1f}% | поиск {100 * searched:5.1f}% "
+            f"({elapsed:.1f} c) | {stats['mean_ms']:.2f} мс/ход, глубина {stats['mean_depth']:.1f}, "
+            f"{stats['nodes_per_second']:,.0f} узлов/с, попаданий в таблицу {100 * stats['table_hit_rate']:.0f}%"
+        )
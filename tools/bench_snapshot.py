@@ -0,0 +1,107 @@
+"""
+Бенчмарк снимков и веток боя: цена snapshot/restore, размер снимка, цена fork против
+copy.deepcopy и тысячи продолжений из одной позиции («что если»).
+
+Бой доводится до середины (RandomPolicy с фиксированным зерном, яд и щиты в гримуаре),
+дальше из этой позиции разыгрываются продолжения с разными зёрнами — исход родителя
+после них проверяется по снимку.
+
+Запуск: python -m tools.bench_snapshot --continuations 5000
+"""
+import argparse
+import copy
+import time
+
+from domain.battle.battle import Battle
+from domain.battle.headless import muted_logging
+from domain.battle.policies import RandomPolicy
+from domain.battle.presenters import SilentPresenter
+from domain.battle.status_effects import ApplyStatus, StatusKind
+from domain.entities.character import Character
+from domain.entities.enemy import Enemy
+from domain.entities.grimoire import Grimoire
+from domain.entities.spell import Spell
+from domain.enums.spell_type import SpellType
+
+SPELLS = [
+    Spell("Fireball", 30, 3, SpellType.DAMAGE, "3d6+2"),
+    Spell("Poison", 15, 2, SpellType.DAMAGE, 4, effect=ApplyStatus(StatusKind.DOT, 3)),
+    Spell("Ward", 20, 2, SpellType.HEAL, 15, effect=ApplyStatus(StatusKind.SHIELD, 2)),
+    Spell("Healing", 20, 2, SpellType.HEAL, "2d8 adv"),
+    Spell("Spark", 10, 1, SpellType.DAMAGE, 8),
+]
+
+
+def midgame(rounds: int) -> Battle:
+    """Бой, остановленный после rounds раундов"""
+    grimoire = Grimoire(SPELLS)
+    battle = Battle(
+        Character(100, 100, "Артур"),
+        Enemy(100, 100, "Темный маг", grimoire),
+        grimoire,
+        player_policy=RandomPolicy(1),
+        enemy_policy=RandomPolicy(2),
+        presenter=SilentPresenter(),
+        max_rounds=rounds,
+        basic_attack="1d8+2",
+        seed=3,
+    )
+    battle.run()
+    battle.max_rounds = 1000
+    return battle
+
+
+def per_call_us(fn, n: int) -> float:
+    started = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return 1e6 * (time.perf_counter() - started) / n
+
+
+def continuations(battle: Battle, n: int, branch) -> tuple[dict, float]:
+    """n продолжений с разными зёрнами: (исходы, секунд)"""
+    outcomes = {"player": 0, "enemy": 0, "draw": 0}
+    started = time.perf_counter()
+    for seed in range(n):
+        outcomes[branch(battle, seed).run().winner] += 1
+    return outcomes, time.perf_counter() - started
+
+
+def fork_branch(battle: Battle, seed: int) -> Battle:
+    return battle.fork(RandomPolicy(seed), RandomPolicy(-seed - 1), seed=seed)
+
+
+def deepcopy_branch(battle: Battle, seed: int) -> Battle:
+    clone = copy.deepcopy(battle)
+    clone.player_policy, clone.enemy_policy = RandomPolicy(seed), RandomPolicy(-seed - 1)
+    clone.rng.seed(seed)
+    return clone
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=6, help="с какого раунда ветвиться")
+    parser.add_argument("--calls", type=int, default=20000)
+    parser.add_argument("--continuations", type=int, default=5000)
+    args = parser.parse_args()
+
+    with muted_logging():
+        battle = midgame(args.rounds)
+        full, compact = battle.snapshot(), battle.snapshot(include_rng=False)
+        print(f"позиция: раунд {battle.round_number}, таймеров эффектов {battle.statuses.pending()}, "
+              f"снимок {len(full)} Б (без генератора бросков — {len(compact)} Б)")
+        print(f"snapshot: {per_call_us(battle.snapshot, args.calls):.1f} мкс, "
+              f"без генератора {per_call_us(lambda: battle.snapshot(include_rng=False), args.calls):.1f} мкс")
+        print(f"restore:  {per_call_us(lambda: battle.restore(full), args.calls):.1f} мкс, "
+              f"без генератора {per_call_us(lambda: battle.restore(compact), args.calls):.1f} мкс")
+        print(f"fork: {per_call_us(battle.fork, args.calls):.1f} мкс, "
+              f"deepcopy: {per_call_us(lambda: copy.deepcopy(battle), args.calls // 10):.1f} мкс")
+
+        forked, fork_s = continuations(battle, args.continuations, fork_branch)
+        _, copy_s = continuations(battle, args.continuations // 10, deepcopy_branch)
+        unchanged = battle.snapshot() == full
+    share = {winner: count / args.continuations for winner, count in forked.items()}
+    print(f"продолжения через fork: {args.continuations} за {fork_s:.2f} c "
+          f"({1e6 * fork_s / args.continuations:.0f} мкс), исходы {share}")
+    print(f"через deepcopy: {1e6 * copy_s / (args.continuations // 10):.0f} мкс на продолжение; "
+          f"родитель не изменился: {unchanged}")
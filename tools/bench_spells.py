@@ -0,0 +1,79 @@
+"""
+Микробенчмарк кастов: поиск эффекта рефлексией (как было в Spell.apply_effect)
+против обработчика, выбранного один раз при создании заклинания.
+
+Логи loguru отключены, но сообщения всё равно форматируются внутри take_* — поэтому
+отдельно замеряется и чистая диспетчеризация на «немой» цели.
+
+Запуск: python -m tools.bench_spells --casts 200000
+"""
+import argparse
+import time
+
+from loguru import logger
+
+from domain.entities.creature import Creature
+from domain.entities.effects import CompositeEffect, burn_mana, damage
+from domain.entities.spell import Spell
+from domain.enums.spell_type import SpellType
+
+
+def reflective_apply(spell: Spell, target) -> None:
+    """Spell.apply_effect до таблицы эффектов"""
+    if not isinstance(target, Creature):
+        raise TypeError('Цель должна быть экземпляром класса Character')
+    effect_method_name = spell.spell_type.value
+    if hasattr(target, effect_method_name):
+        getattr(target, effect_method_name)(spell.power)
+    else:
+        logger.error(f'Метод {effect_method_name} не найден у цели')
+
+
+class SilentCreature(Creature):
+    """Существо без логов: остаётся только стоимость вызова"""
+
+    __slots__ = ()
+
+    def take_damage(self, damage: int):
+        self.current_hp -= damage
+
+    def take_hp(self, amount: int):
+        self.current_hp += amount
+
+    def take_mana(self, amount: int):
+        self.current_mana += amount
+
+
+def casts_per_second(apply, spells: list[Spell], target, casts: int) -> float:
+    started = time.perf_counter()
+    for i in range(casts):
+        apply(spells[i % len(spells)], target)
+    return casts / (time.perf_counter() - started)
+
+
+def compiled_apply(spell: Spell, target) -> None:
+    spell.apply_effect(target)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--casts", type=int, default=200_000)
+    args = parser.parse_args()
+
+    logger.disable("domain")
+    spells = [
+        Spell("Fireball", 30, 3, SpellType.DAMAGE, 20),
+        Spell("Healing", 20, 2, SpellType.HEAL, 25),
+        Spell("Gift", 10, 1, SpellType.MANA, 15),
+    ]
+    drain = Spell("Drain", 25, 4, SpellType.DAMAGE, 16,
+                  effect=CompositeEffect((damage, 1.0), (burn_mana, 0.5)))
+
+    for label, target in (("Creature", Creature(100, 100, "Цель")), ("без логов", SilentCreature(100, 100, "Цель"))):
+        before = casts_per_second(reflective_apply, spells, target, args.casts)
+        after = casts_per_second(compiled_apply, spells, target, args.casts)
+        composite = casts_per_second(compiled_apply, [drain], target, args.casts)
+        print(
+            f"{label:<10} рефлексия {before:12,.0f} кастов/с | таблица {after:12,.0f} кастов/с "
+            f"(×{after / before:.2f}) | составной {composite:12,.0f} кастов/с"
+        )
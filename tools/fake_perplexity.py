@@ -0,0 +1,413 @@
+"""
+Локальный стенд Perplexity chat completions для офлайн-прогонов DM.
+
+asyncio HTTP/1.1 сервер с keep-alive. По system prompt из dm_prompts.py понимает,
+какой запрос пришёл (реакция, выбор действия врага, совмещённый ход), и отвечает
+валидным по схеме JSON: действие берётся только из "Доступные действия".
+
+Неисправности включаются через FaultConfig: распределение задержки, 429 с Retry-After,
+зависание (клиент ловит таймаут), битый JSON, ответ в ```json ... ``` и SSE-стриминг.
+
+В ответе есть usage (токены по оценке estimate_tokens). Стенд моделирует кэш префикса
+провайдера: уже виденные начальные сообщения идут в cached_tokens и не стоят prefill-времени
+(ms_per_1k_prompt_tokens), так что длина и стабильность промпта видны в задержке.
+
+Запуск отдельным процессом: python -m tools.fake_perplexity --port 8765 --p-429 0.05
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import re
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+from config.settings import settings
+from services.dm_prompts import (
+    REACT_SYSTEM_PROMPT,
+    CHOOSE_ENEMY_ACTION_SYSTEM_PROMPT,
+    ENEMY_TURN_SYSTEM_PROMPT,
+)
+from services.prompt_templates import SYSTEM_PROMPTS, estimate_tokens
+
+ALLOWED_ACTIONS_MARKER = "Доступные действия:\n"
+PREFIX_CACHE_LIMIT = 10_000
+
+# system prompt -> вид запроса (и старые, и компактные промпты)
+PROMPT_KINDS = {
+    REACT_SYSTEM_PROMPT: "react",
+    CHOOSE_ENEMY_ACTION_SYSTEM_PROMPT: "choose",
+    ENEMY_TURN_SYSTEM_PROMPT: "turn",
+    **{prompt: kind for kind, prompt in SYSTEM_PROMPTS.items()},
+}
+
+
+@dataclass
+class FaultConfig:
+    """Поведение стенда: задержки и доли неисправных ответов (0..1)"""
+    latency: str = "lognormal"  # "fixed" | "uniform" | "lognormal"
+    latency_ms: float = 300.0  # fixed: значение; uniform: верхняя граница; lognormal: медиана
+    latency_sigma: float = 0.5  # разброс lognormal (0.5 → p99 ≈ 3.2 × медианы)
+    p_rate_limit: float = 0.0
+    retry_after_s: float = 1.0
+    p_timeout: float = 0.0
+    hang_s: float = 60.0  # сколько держать соединение без ответа при "таймауте"
+    p_malformed: float = 0.0
+    p_fenced: float = 0.0
+    ms_per_1k_prompt_tokens: float = 0.0  # prefill: цена некэшированных токенов промпта
+    stream_chunk_chars: int = 12
+    stream_chunk_delay_ms: float = 15.0
+    seed: int | None = None
+
+    def sample_latency_s(self, rng: random.Random) -> float:
+        if self.latency == "fixed":
+            return self.latency_ms / 1000
+        if self.latency == "uniform":
+            return rng.uniform(0, self.latency_ms) / 1000
+        if self.latency == "lognormal":
+            return rng.lognormvariate(0, self.latency_sigma) * self.latency_ms / 1000
+        raise ValueError(f"Неизвестное распределение задержки: {self.latency}")
+
+
+@dataclass
+class ServerStats:
+    requests: int = 0
+    ok: int = 0
+    streamed: int = 0
+    rate_limited: int = 0
+    timed_out: int = 0
+    malformed: int = 0
+    fenced: int = 0
+    bad_requests: int = 0
+    prompt_tokens: int = 0
+    cached_tokens: int = 0
+    by_kind: dict[str, int] = field(default_factory=dict)
+
+
+# ---------- ответы DM ----------
+
+def _prompt_kind(messages: list[dict]) -> str:
+    system = next((m["content"] for m in messages if m.get("role") == "system"), "")
+    return PROMPT_KINDS.get(system, "chat")
+
+
+def _allowed_actions(prompt: str) -> dict:
+    """Достаёт JSON "Доступные действия" из текста промпта"""
+    start = prompt.find(ALLOWED_ACTIONS_MARKER)
+    if start < 0:
+        return {"basic_attack": {}}
+    try:
+        allowed, _ = json.JSONDecoder().raw_decode(prompt, start + len(ALLOWED_ACTIONS_MARKER))
+        return allowed
+    except json.JSONDecodeError:
+        return {"basic_attack": {}}
+
+
+def _pick_action(allowed: dict, rng: random.Random) -> dict:
+    spells = allowed.get("cast_spell", {}).get("available_spells", [])
+    if spells and (rng.random() < 0.7 or "basic_attack" not in allowed):
+        return {"type": "cast_spell", "spell_name": rng.choice(spells)["name"]}
+    return {"type": "basic_attack"}
+
+
+def _event(target: str, rng: random.Random) -> dict | None:
+    if rng.random() < 0.5:
+        return None
+    return {
+        "type": "modify_stats",
+        "target": target,
+        "hp_delta": rng.randint(-settings.MAX_HP_DELTA, settings.MAX_HP_DELTA),
+        "mana_delta": rng.randint(-settings.MAX_MANA_DELTA, settings.MAX_MANA_DELTA),
+    }
+
+
+def dm_reply(messages: list[dict], rng: random.Random) -> tuple[str, dict]:
+    """
+    Ответ "модели" на промпт из dm_prompts.py.
+
+    Returns:
+        (вид запроса, объект ответа)
+    """
+    kind = _prompt_kind(messages)
+    prompt = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "")
+
+    if kind == "react":
+        target = re.search(r'"target": "(\w+)"|Цель event: (\w+)', prompt)
+        action = re.search(r"Действие: (.+)", prompt)
+        return kind, {
+            "narration": f"{action.group(1) if action else 'Удар'} — и поле боя озаряет вспышка!",
+            "event": _event(target.group(1) or target.group(2) if target else "enemy", rng),
+        }
+
+    if kind in ("choose", "turn"):
+        action = _pick_action(_allowed_actions(prompt), rng)
+        what = action.get("spell_name", "базовую атаку")
+        reply = {"action": action, "narration": f"Враг с рыком пускает в ход {what}."}
+        if kind == "turn":
+            reply["event"] = _event("player", rng)
+        return kind, reply
+
+    return kind, {"narration": "Мастер подземелья задумчиво молчит."}
+
+
+def usage_body(prompt_tokens: int, cached_tokens: int, content: str) -> dict:
+    completion_tokens = estimate_tokens(content)
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+        "prompt_tokens_details": {"cached_tokens": cached_tokens},
+    }
+
+
+def completion_body(content: str, model: str, usage: dict) -> bytes:
+    return json.dumps({
+        "id": "fake",
+        "object": "chat.completion",
+        "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": usage,
+    }, ensure_ascii=False).encode()
+
+
+def sse_chunk(content: str, usage: dict | None = None) -> bytes:
+    chunk = {"choices": [{"index": 0, "delta": {"content": content}}]}
+    if usage is not None:
+        chunk["usage"] = usage
+    data = json.dumps(chunk, ensure_ascii=False)
+    return f"data: {data}\n\n".encode()
+
+
+# ---------- HTTP ----------
+
+class FakePerplexityServer:
+    """asyncio-сервер chat completions с инъекцией задержек и ошибок"""
+
+    def __init__(self, faults: FaultConfig | None = None, host: str = "127.0.0.1", port: int = 0):
+        self.faults = faults or FaultConfig()
+        self.host = host
+        self.port = port
+        self.rng = random.Random(self.faults.seed)
+        self.stats = ServerStats()
+        self._server: asyncio.Server | None = None
+        self._connections: set[asyncio.Task] = set()
+        self._prefix_cache: set[bytes] = set()
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}/chat/completions"
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+        # keep-alive соединения (и "зависшие" запросы) иначе держат wait_closed вечно
+        for task in list(self._connections):
+            task.cancel()
+        await asyncio.gather(*self._connections, return_exceptions=True)
+        if self._server is not None:
+            await self._server.wait_closed()
+
+    async def serve_forever(self) -> None:
+        await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    def _prefill(self, messages: list[dict]) -> tuple[int, int]:
+        """
+        Токены промпта и их закэшированная часть: самый длинный префикс из целых
+        сообщений, который стенд уже видел.
+        """
+        if len(self._prefix_cache) > PREFIX_CACHE_LIMIT:
+            self._prefix_cache.clear()
+
+        prompt_tokens = cached_tokens = 0
+        prefix = hashlib.blake2b(digest_size=16)
+        still_cached = True
+        for message in messages:
+            tokens = estimate_tokens(message["content"])
+            prefix.update(json.dumps(message, ensure_ascii=False, sort_keys=True).encode())
+            digest = prefix.digest()
+            if still_cached and digest in self._prefix_cache:
+                cached_tokens += tokens
+            else:
+                still_cached = False
+                self._prefix_cache.add(digest)
+            prompt_tokens += tokens
+        return prompt_tokens, cached_tokens
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                keep_open = await self._handle_request(body, writer)
+                await writer.drain()
+                if not keep_open or headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except asyncio.CancelledError:
+            # stop(): завершаемся штатно, иначе asyncio.streams ругается на отменённую задачу
+            pass
+        finally:
+            self._connections.discard(task)
+            writer.close()
+
+    async def _handle_request(self, body: bytes, writer: asyncio.StreamWriter) -> bool:
+        """Обрабатывает один запрос; False — закрыть соединение"""
+        faults = self.faults
+        self.stats.requests += 1
+
+        try:
+            payload = json.loads(body)
+            messages = payload["messages"]
+        except (json.JSONDecodeError, KeyError, TypeError):
+            self.stats.bad_requests += 1
+            self._write_response(writer, 400, b'{"error": "bad request"}')
+            return True
+
+        if self.rng.random() < faults.p_rate_limit:
+            self.stats.rate_limited += 1
+            self._write_response(writer, 429, b'{"error": "rate limited"}',
+                                 {"Retry-After": f"{faults.retry_after_s:g}"})
+            return True
+
+        if self.rng.random() < faults.p_timeout:
+            self.stats.timed_out += 1
+            await asyncio.sleep(faults.hang_s)
+            return False
+
+        kind, reply = dm_reply(messages, self.rng)
+        self.stats.by_kind[kind] = self.stats.by_kind.get(kind, 0) + 1
+        content = json.dumps(reply, ensure_ascii=False)
+
+        roll = self.rng.random()
+        if roll < faults.p_malformed:
+            self.stats.malformed += 1
+            content = content[: len(content) // 2]
+        elif roll < faults.p_malformed + faults.p_fenced:
+            self.stats.fenced += 1
+            content = f"```json\n{content}\n```"
+
+        prompt_tokens, cached_tokens = self._prefill(messages)
+        self.stats.prompt_tokens += prompt_tokens
+        self.stats.cached_tokens += cached_tokens
+        usage = usage_body(prompt_tokens, cached_tokens, content)
+
+        prefill_s = faults.ms_per_1k_prompt_tokens * (prompt_tokens - cached_tokens) / 1e6
+        await asyncio.sleep(faults.sample_latency_s(self.rng) + prefill_s)
+
+        if payload.get("stream"):
+            self.stats.streamed += 1
+            await self._write_stream(writer, content, usage)
+        else:
+            self.stats.ok += 1
+            self._write_response(writer, 200, completion_body(content, payload.get("model", "sonar"), usage))
+        return True
+
+    @staticmethod
+    def _write_response(writer: asyncio.StreamWriter, status: int, body: bytes, headers: dict | None = None) -> None:
+        reason = {200: "OK", 400: "Bad Request", 429: "Too Many Requests"}[status]
+        lines = [
+            f"HTTP/1.1 {status} {reason}",
+            "Content-Type: application/json",
+            f"Content-Length: {len(body)}",
+        ]
+        lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode() + body)
+
+    async def _write_stream(self, writer: asyncio.StreamWriter, content: str, usage: dict) -> None:
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nTransfer-Encoding: chunked\r\n\r\n"
+        )
+        step = max(1, self.faults.stream_chunk_chars)
+        for i in range(0, len(content), step):
+            self._write_chunk(writer, sse_chunk(content[i:i + step]))
+            await writer.drain()
+            await asyncio.sleep(self.faults.stream_chunk_delay_ms / 1000)
+        self._write_chunk(writer, sse_chunk("", usage))
+        self._write_chunk(writer, b"data: [DONE]\n\n")
+        writer.write(b"0\r\n\r\n")
+
+    @staticmethod
+    def _write_chunk(writer: asyncio.StreamWriter, data: bytes) -> None:
+        writer.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+
+
+@contextmanager
+def serve_in_thread(faults: FaultConfig | None = None, host: str = "127.0.0.1", port: int = 0):
+    """Поднимает стенд в отдельном потоке со своим event loop (для синхронных клиентов)"""
+    server = FakePerplexityServer(faults, host, port)
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, name="fake-perplexity", daemon=True)
+    thread.start()
+    asyncio.run_coroutine_threadsafe(server.start(), loop).result()
+    try:
+        yield server
+    finally:
+        asyncio.run_coroutine_threadsafe(server.stop(), loop).result(timeout=5)
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=5)
+        loop.close()
+
+
+def add_fault_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--latency", default="lognormal", choices=("fixed", "uniform", "lognormal"))
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--latency-sigma", type=float, default=0.5)
+    parser.add_argument("--p-429", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--p-timeout", type=float, default=0.0)
+    parser.add_argument("--p-malformed", type=float, default=0.0)
+    parser.add_argument("--p-fenced", type=float, default=0.0)
+    parser.add_argument("--ms-per-1k-tokens", type=float, default=0.0, help="prefill некэшированного промпта")
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def faults_from_args(args: argparse.Namespace) -> FaultConfig:
+    return FaultConfig(
+        latency=args.latency,
+        latency_ms=args.latency_ms,
+        latency_sigma=args.latency_sigma,
+        p_rate_limit=args.p_429,
+        retry_after_s=args.retry_after,
+        p_timeout=args.p_timeout,
+        p_malformed=args.p_malformed,
+        p_fenced=args.p_fenced,
+        ms_per_1k_prompt_tokens=args.ms_per_1k_tokens,
+        seed=args.seed,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Локальный стенд Perplexity chat completions")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    stand = FakePerplexityServer(faults_from_args(args), args.host, args.port)
+    print(f"Стенд слушает {stand.url}")
+    try:
+        asyncio.run(stand.serve_forever())
+    except KeyboardInterrupt:
+        print(f"\nСтатистика: {stand.stats}")
@@ -61,6 +61,15 @@ class BattleVisuals:
             f"{'═' * 40}\n"
         )
 
+    @staticmethod
+    def draw_banner() -> str:
+        """Баннер ничьей (бой упёрся в лимит раундов)"""
+        return (
+            f"\n{'═' * 40}\n"
+            f"{'🤝 НИЧЬЯ 🤝':^40}\n"
+            f"{'═' * 40}\n"
+        )
+
     @staticmethod
     def attack_animation(attacker: str, defender: str, damage: int) -> str:
         """Анимация обычной атаки"""